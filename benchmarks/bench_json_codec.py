@@ -0,0 +1,89 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+"""
+Compares the JSON codecs on payloads shaped like Audit search pages and
+redact_structured requests, and checks that every codec produces canonical
+JSON byte for byte identical to the standard library.
+
+Usage:
+    python benchmarks/bench_json_codec.py [--events N] [--repeat N]
+"""
+
+import argparse
+import sys
+import timeit
+
+from pangea.codec import available_codecs, get_codec
+from pangea.services.audit_util import hash_dict
+
+
+def search_page(count: int) -> dict:
+    events = [
+        {
+            "envelope": {
+                "event": {
+                    "actor": f"user-{i}@example.com",
+                    "action": "login",
+                    "status": "success",
+                    "message": f"User logged in from 10.0.{i % 256}.{i % 7} ünïcödé",
+                    "new": '{"session": ' + str(i) + "}",
+                },
+                "received_at": "2022-10-14T22:43:07.166475Z",
+                "signature": "U2lnbmF0dXJl" * 6,
+                "public_key": "UHVibGljIGtleQ==",
+            },
+            "hash": f"{i:064x}",
+            "leaf_index": i // 100,
+            "membership_proof": ",".join(f"l:{j:064x}" for j in range(12)),
+        }
+        for i in range(count)
+    ]
+    return {
+        "request_id": "prq_qrzgklo5yl5ibgsmu5fsjhrrz7asqb6p",
+        "status": "Success",
+        "summary": f"Found {count} event(s)",
+        "result": {
+            "id": "pit_kgr66t3yluqqexahxzdldqatirommhbt",
+            "count": count,
+            "events": events,
+            "root": {"tree_name": "tree", "size": count, "root_hash": "ab" * 32, "url": "https://arweave.net/x"},
+        },
+    }
+
+
+def bench(label: str, func, repeat: int):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"  {label:<12} {best * 1000:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON codec benchmark")
+    parser.add_argument("--events", type=int, default=1000, help="events per search page (default: 1000)")
+    parser.add_argument("--repeat", type=int, default=20, help="repetitions, the best one is reported (default: 20)")
+    args = parser.parse_args()
+
+    page = search_page(args.events)
+    reference = get_codec("json")
+    raw = reference.dumps(page)
+    events = [event["envelope"] for event in page["result"]["events"]]
+
+    mismatches = 0
+    for name in available_codecs():
+        codec = get_codec(name)
+        print(f"{name}:")
+        bench("dumps", lambda: codec.dumps(page), args.repeat)
+        bench("loads", lambda: codec.loads(raw), args.repeat)
+        bench("canonical", lambda: [codec.canonical(event) for event in events], args.repeat)
+        bench("hash", lambda: [hash_dict(event, codec) for event in events], args.repeat)
+
+        mismatches += sum(codec.canonical(event) != reference.canonical(event) for event in events)
+
+    if mismatches:
+        print(f"\nFAILED: {mismatches} canonical encodings differ from the standard library")
+        sys.exit(1)
+
+    print("\nCanonical encodings are byte for byte identical.")
+
+
+if __name__ == "__main__":
+    main()
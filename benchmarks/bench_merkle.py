@@ -0,0 +1,96 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+"""
+Compares the integer Merkle path arithmetic of pangea.merkle with the former
+floating point, string based implementation of deep_verify, and checks that
+both give the same results.
+
+Usage:
+    python benchmarks/bench_merkle.py [--leaves N] [--tree-size N] [--repeat N]
+"""
+
+import argparse
+import math
+import random
+import sys
+import timeit
+
+from pangea import merkle
+
+
+def legacy_tree_size_left(tree_size: int) -> int:
+    if tree_size <= 1:
+        return 0
+    return 2 ** (math.ceil(math.log2(tree_size)) - 1)
+
+
+def legacy_path2index(tree_size: int, path: str) -> int:
+    ans = 0
+    for side in reversed(path):
+        size_left = legacy_tree_size_left(tree_size)
+        size_right = tree_size - size_left
+        if side == "l":
+            ans += size_left
+            tree_size = size_right
+        else:
+            tree_size = size_left
+    return ans
+
+
+def legacy_index2path(tree_size: int, leaf_index: int) -> str:
+    revpath = []
+    while tree_size > 1:
+        size_left = legacy_tree_size_left(tree_size)
+        size_right = tree_size - size_left
+        if leaf_index < size_left:
+            revpath.append("r")
+            tree_size = size_left
+        else:
+            revpath.append("l")
+            tree_size = size_right
+            leaf_index -= size_left
+    return "".join(reversed(revpath))
+
+
+def bench(label: str, func, repeat: int):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print(f"  {label:<24} {best * 1000:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merkle path arithmetic benchmark")
+    parser.add_argument("--leaves", type=int, default=10000, help="leaf indexes converted (default: 10000)")
+    parser.add_argument("--tree-size", type=int, default=10**9, help="number of leaves of the tree (default: 10^9)")
+    parser.add_argument("--repeat", type=int, default=10, help="repetitions, the best one is reported (default: 10)")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    tree_size = args.tree_size
+    indexes = [rnd.randrange(tree_size) for _ in range(args.leaves)]
+    paths = [legacy_index2path(tree_size, leaf_index) for leaf_index in indexes]
+    sides = [merkle.path_to_sides(path) for path in paths]
+
+    print("legacy:")
+    bench("index2path", lambda: [legacy_index2path(tree_size, i) for i in indexes], args.repeat)
+    bench("path2index", lambda: [legacy_path2index(tree_size, path) for path in paths], args.repeat)
+    bench("path size", lambda: [len(legacy_index2path(tree_size, i)) for i in indexes], args.repeat)
+
+    print("merkle:")
+    bench("index_to_sides", lambda: [merkle.index_to_sides(tree_size, i) for i in indexes], args.repeat)
+    bench("sides_to_index", lambda: [merkle.sides_to_index(tree_size, *s) for s in sides], args.repeat)
+    bench("path_length", lambda: [merkle.path_length(tree_size, i) for i in indexes], args.repeat)
+
+    mismatches = sum(
+        merkle.index_to_sides(tree_size, leaf_index) != merkle.path_to_sides(path)
+        or merkle.sides_to_index(tree_size, *merkle.path_to_sides(path)) != legacy_path2index(tree_size, path)
+        for leaf_index, path in zip(indexes, paths)
+    )
+    if mismatches:
+        print(f"\nFAILED: {mismatches} paths differ from the legacy implementation")
+        sys.exit(1)
+
+    print("\nResults are identical.")
+
+
+if __name__ == "__main__":
+    main()
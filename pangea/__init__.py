@@ -2,5 +2,6 @@ __version__ = "0.2.15"
 
 from pangea.client import PangeaClient
 from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaException, PangeaTimeoutError
 from pangea.request import PangeaRequest
 from pangea.response import PangeaResponse
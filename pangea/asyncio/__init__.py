@@ -0,0 +1 @@
+from pangea.asyncio.request import AsyncPangeaRequest
@@ -0,0 +1,195 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import asyncio
+import json
+import logging
+import time
+import typing as t
+
+import aiohttp
+
+from pangea.asyncio.transport import AsyncPangeaTransport
+from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+from pangea.request import PangeaRequestBase, deadline_expiry, time_left
+from pangea.response import PangeaResponse
+from pangea.transport import idempotent, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHTTPResponse(object):
+    """A fully read HTTP response, exposing the subset of the `requests.Response`
+    interface used by PangeaResponse."""
+
+    def __init__(self, status_code: int, reason: t.Optional[str], content: bytes):
+        self.status_code = status_code
+        self.reason = reason
+        self.content = content
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class AsyncPangeaRequest(PangeaRequestBase):
+    """An object that makes non-blocking calls to Pangea Service APIs.
+
+    Asyncio counterpart of PangeaRequest: `post` and `get` are coroutines and
+    queued requests are polled with `asyncio.sleep`, so the event loop is never
+    blocked. Connections are pooled by an AsyncPangeaTransport, which can be
+    shared with other request objects; a private one is created if none is
+    given, and released with `close()`.
+    """
+
+    def __init__(
+        self,
+        config: PangeaConfig,
+        token: str,
+        version: str,
+        service: str,
+        transport: t.Optional[AsyncPangeaTransport] = None,
+    ):
+        super().__init__(config, token, version, service)
+
+        self._owns_transport = transport is None
+        self.transport = transport if transport else AsyncPangeaTransport(config)
+
+    async def post(self, endpoint: str = "", data: dict = {}, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Makes the POST call to a Pangea Service endpoint.
+
+        If queued_support mode is enabled, progress checks will be made for
+        queued requests until processing is completed or until exponential
+        backoff `queued_retries` have been reached.
+
+        Args:
+            endpoint(str): The Pangea Service API endpoint.
+            data(dict): The POST body payload object
+            deadline(float, optional): maximum seconds for the whole call,
+                including retries and queued progress checks
+
+        Raises:
+            PangeaTimeoutError: if a timeout or the deadline is exceeded
+
+        Returns:
+            PangeaResponse which contains the response in its entirety and
+               various properties to retrieve individual fields
+        """
+        expires_at = deadline_expiry(deadline)
+        url = self._url(endpoint)
+
+        http_response = await self._request("POST", url, expires_at, data=self.codec.dumps(data))
+
+        if self._queued_retry_enabled and http_response.status_code == 202:
+            response_json = self.codec.loads(http_response.content)
+            request_id = response_json.get("request_id", None)
+
+            if not request_id:
+                raise Exception("Queue error: response did not include a 'request_id'")
+
+            pangea_response = await self._handle_queued(request_id, expires_at)
+        else:
+            pangea_response = PangeaResponse(http_response, codec=self.codec)
+
+        return pangea_response
+
+    async def get(self, endpoint: str, path: str, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Makes the GET call to a Pangea Service endpoint.
+
+        Args:
+            endpoint(str): The Pangea Service API endpoint.
+            path(str): Additional URL path
+            deadline(float, optional): maximum seconds for the call, including retries
+
+        Raises:
+            PangeaTimeoutError: if a timeout or the deadline is exceeded
+
+        Returns:
+            PangeaResponse which contains the response in its entirety and
+               various properties to retrieve individual fields
+        """
+        url = self._url(f"{endpoint}/{path}")
+
+        http_response = await self._request("GET", url, deadline_expiry(deadline))
+
+        return PangeaResponse(http_response, codec=self.codec)
+
+    async def close(self):
+        """Closes the pooled connections, unless the transport is shared."""
+        if self._owns_transport:
+            await self.transport.close()
+
+    async def _handle_queued(self, request_id: str, expires_at: t.Optional[float] = None) -> PangeaResponse:
+        retry_count = 1
+
+        while True:
+            await asyncio.sleep(self._queued_delay(request_id, retry_count, expires_at))
+            pangea_response = await self.get("request", request_id, deadline=time_left(expires_at))
+
+            if pangea_response.code == 202 and retry_count <= self.queued_retries:
+                retry_count += 1
+            else:
+                return pangea_response
+
+    async def _request(
+        self, method: str, url: str, expires_at: t.Optional[float], data: t.Optional[bytes] = None
+    ) -> AsyncHTTPResponse:
+        session = self.transport.session
+        attempt = 0
+
+        # same retry rules and backoff schedule as PangeaTransport.request()
+        while True:
+            connect, read = self._timeouts(expires_at)
+            timeout = aiohttp.ClientTimeout(total=time_left(expires_at), connect=connect, sock_read=read)
+
+            try:
+                async with session.request(
+                    method, url, headers=self._headers(), data=data, timeout=timeout
+                ) as response:
+                    content = await response.read()
+                    return AsyncHTTPResponse(response.status, response.reason, content)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries or not _retryable(method, e):
+                    _raise_error(method, url, e)
+
+                attempt += 1
+                delay = retry_delay(self.backoff, attempt)
+                if expires_at is not None and time.monotonic() + delay >= expires_at:
+                    _raise_error(method, url, e)
+
+                logger.debug(f"Connection error on {method} {url}, retry {attempt}/{self.retries}")
+                await asyncio.sleep(delay)
+
+
+# aiohttp 3.10+ raises ConnectionTimeoutError for connect timeouts, older versions a ServerTimeoutError
+_ConnectionTimeoutError = getattr(aiohttp, "ConnectionTimeoutError", None)
+
+
+def _connect_failed(error: Exception) -> bool:
+    """True if the request failed before reaching the server (connection refused, DNS, connect timeout)"""
+    if isinstance(error, aiohttp.ClientConnectorError):
+        return True
+
+    if _ConnectionTimeoutError is not None:
+        return isinstance(error, _ConnectionTimeoutError)
+    return isinstance(error, aiohttp.ServerTimeoutError) and str(error).startswith("Connection timeout")
+
+
+def _retryable(method: str, error: Exception) -> bool:
+    # a request that may have reached the server (e.g. a POST whose connection was then
+    # dropped) is only sent again if its method is idempotent
+    return _connect_failed(error) or idempotent(method)
+
+
+def _raise_error(method: str, url: str, error: Exception) -> t.NoReturn:
+    if isinstance(error, asyncio.TimeoutError):
+        raise PangeaTimeoutError(f"Timeout on {method} {url}") from error
+    raise error
@@ -0,0 +1,5 @@
+from .audit import AsyncAudit
+from .redact import AsyncRedact
+from .embargo import AsyncEmbargo
+from .intel import AsyncFileIntel, AsyncIpIntel, AsyncUrlIntel, AsyncDomainIntel
+from .secrets import AsyncSecrets
@@ -0,0 +1,308 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import asyncio
+import typing as t
+from collections import deque
+
+from pangea.request import deadline_expiry, time_left
+from pangea.response import JSONObject, PangeaResponse
+from pangea.services.audit import Audit
+from pangea.services.audit_util import get_arweave_published_roots
+
+from .base import AsyncServiceBase
+
+
+class AsyncAudit(AsyncServiceBase, Audit):
+    """Audit service client for asyncio applications.
+
+    Same API and options as `pangea.services.Audit`, with coroutine methods.
+    Proof verification is shared with the blocking client; published roots
+    are fetched from Arweave on the default executor so the event loop is
+    not blocked.
+
+    Examples:
+        from pangea.asyncio.services import AsyncAudit
+
+        async with AsyncAudit(token=PANGEA_TOKEN, config=audit_config) as audit:
+            response = await audit.log({"message": "hello world"})
+    """
+
+    async def log(
+        self,
+        event: dict,
+        verify: bool = False,
+        signing: bool = False,
+        verbose: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Creates a log entry in the Secure Audit Log. See `Audit.log`."""
+        expires_at = deadline_expiry(deadline)
+        data, prev_buffer_root = self._prepare_log(event, verify=verify, signing=signing, verbose=verbose)
+        response = await self.request.post("log", data=data, deadline=deadline)
+
+        return await self.handle_log_response(
+            response, verify=verify, prev_buffer_root_enc=prev_buffer_root, deadline=time_left(expires_at)
+        )
+
+    async def log_bulk(
+        self, events: t.List[dict], signing: bool = False, verbose: bool = False, deadline: t.Optional[float] = None
+    ) -> PangeaResponse:
+        """Creates several log entries with a single request. See `Audit.log_bulk`."""
+        data = self._prepare_log_bulk(events, signing=signing, verbose=verbose)
+        response = await self.request.post("log", data=data, deadline=deadline)
+
+        return self.handle_log_bulk_response(response, len(events))
+
+    async def handle_log_response(
+        self,
+        response: PangeaResponse,
+        verify: bool,
+        prev_buffer_root_enc: bytes,
+        deadline: t.Optional[float] = None,
+    ):
+        if not response.success:
+            return response
+
+        if verify:
+            new_buffer_root_enc, commit_proofs = self._verify_log_proofs(response, prev_buffer_root_enc)
+            pending_roots: t.List[str] = []
+
+            if commit_proofs:
+                # Get the root from the cold tree...
+                root_response = await self.root(deadline=deadline)
+                if not root_response.success:
+                    return root_response
+
+                pending_roots = self._verify_commit_proofs(root_response, commit_proofs)
+
+            self.set_buffer_data(last_root_enc=new_buffer_root_enc, pending_roots=pending_roots)
+
+        return response
+
+    async def search(
+        self,
+        query: str = "",
+        restriction: dict = {},
+        limit: int = 20,
+        max_results: t.Optional[int] = None,
+        start: str = "",
+        end: str = "",
+        order: str = "",
+        order_by: str = "",
+        verify: bool = False,
+        verify_signatures: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Searches for events that match the provided search criteria. See `Audit.search`."""
+        data = self._prepare_search(
+            query=query,
+            restriction=restriction,
+            limit=limit,
+            max_results=max_results,
+            start=start,
+            end=end,
+            order=order,
+            order_by=order_by,
+            verify=verify,
+        )
+        expires_at = deadline_expiry(deadline)
+        response = await self.request.post("search", data=data, deadline=deadline)
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return await self.handle_search_response(response, deadline=time_left(expires_at))
+
+    async def results(
+        self,
+        id: str,
+        limit: int = 20,
+        offset: int = 0,
+        verify_signatures: bool = False,
+        deadline: t.Optional[float] = None,
+    ):
+        """Returns paginated results of a previous Search. See `Audit.results`."""
+        expires_at = deadline_expiry(deadline)
+        data = self._prepare_results(id, limit=limit, offset=offset)
+        response = await self.request.post("results", data=data, deadline=deadline)
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return await self.handle_search_response(response, deadline=time_left(expires_at))
+
+    async def search_iter(
+        self,
+        query: str = "",
+        restriction: dict = {},
+        page_size: int = 100,
+        max_results: t.Optional[int] = None,
+        start: str = "",
+        end: str = "",
+        order: str = "",
+        order_by: str = "",
+        verify: bool = False,
+        verify_signatures: bool = False,
+        prefetch: int = 2,
+        max_buffered_events: t.Optional[int] = None,
+    ) -> t.AsyncIterator[JSONObject]:
+        """Yields the events matching the search criteria, across all pages. See `Audit.search_iter`."""
+        if not (isinstance(prefetch, int) and prefetch >= 0):
+            raise Exception("The 'prefetch' argument must be a positive integer")
+
+        response = await self.search(
+            query=query,
+            restriction=restriction,
+            limit=page_size,
+            max_results=max_results,
+            start=start,
+            end=end,
+            order=order,
+            order_by=order_by,
+            verify=verify,
+            verify_signatures=verify_signatures,
+        )
+        if not response.success:
+            raise Exception(f"Pangea Audit error: {response.response.text}")
+
+        result = response.result
+        for event in result.events:
+            yield event
+
+        window = prefetch
+        if max_buffered_events is not None:
+            window = min(window, max(1, max_buffered_events // page_size))
+
+        offsets = range(len(result.events), result.count, page_size)
+        async for page in self._results_pages(result.id, page_size, offsets, window, window, verify_signatures):
+            for event in page.result.events:
+                yield event
+
+    async def results_all(
+        self,
+        id: str,
+        count: int,
+        concurrency: int = 4,
+        limit: int = 100,
+        offset: int = 0,
+        verify_signatures: bool = False,
+        max_buffered_pages: t.Optional[int] = None,
+    ) -> t.AsyncIterator[PangeaResponse]:
+        """Yields the result pages of a previous Search in order, fetched in parallel. See `Audit.results_all`."""
+        if not (isinstance(concurrency, int) and concurrency > 0):
+            raise Exception("The 'concurrency' argument must be a positive integer > 0")
+
+        if max_buffered_pages is None:
+            max_buffered_pages = concurrency
+
+        offsets = range(offset, count, limit)
+        window = concurrency + max_buffered_pages
+        async for page in self._results_pages(id, limit, offsets, concurrency, window, verify_signatures):
+            yield page
+
+    async def _results_pages(
+        self,
+        id: str,
+        limit: int,
+        offsets: t.Iterable[int],
+        workers: int,
+        window: int,
+        verify_signatures: bool,
+    ) -> t.AsyncIterator[PangeaResponse]:
+        offsets = iter(offsets)
+
+        if window == 0:
+            for offset in offsets:
+                response = await self._fetch_results(id, limit, offset)
+                yield await self._checked_results_page(response, verify_signatures)
+            return
+
+        # at most `workers` requests in flight, up to `window` pages requested ahead
+        semaphore = asyncio.Semaphore(workers)
+
+        async def fetch(offset: int) -> PangeaResponse:
+            async with semaphore:
+                return await self._fetch_results(id, limit, offset)
+
+        pending: t.Deque[asyncio.Future] = deque()
+        try:
+            for offset in offsets:
+                pending.append(asyncio.ensure_future(fetch(offset)))
+                if len(pending) >= window:
+                    break
+
+            while pending:
+                response = await pending.popleft()
+
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(asyncio.ensure_future(fetch(offset)))
+
+                yield await self._checked_results_page(response, verify_signatures)
+        finally:
+            # the caller may stop iterating early
+            for future in pending:
+                future.cancel()
+
+    async def _fetch_results(self, id: str, limit: int, offset: int) -> PangeaResponse:
+        data = self._prepare_results(id, limit=limit, offset=offset)
+        return await self.request.post("results", data=data)
+
+    async def _checked_results_page(self, response: PangeaResponse, verify_signatures: bool) -> PangeaResponse:
+        if not response.success:
+            raise Exception(f"Pangea Audit error: {response.response.text}")
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return await self.handle_search_response(response)
+
+    async def handle_search_response(self, response: PangeaResponse, deadline: t.Optional[float] = None):
+        if not response.success or not self.verify_response:
+            return response
+
+        # if there is no root, we don't have any record migrated to cold. We cannot verify any proof
+        if not response.result.root:
+            self._set_unverified(response)
+            return response
+
+        await self.update_published_roots(self.pub_roots, response.result, deadline=deadline)
+        self._verify_search_events(response)
+
+        return response
+
+    async def update_published_roots(
+        self,
+        pub_roots: t.Dict[int, t.Optional[JSONObject]],
+        result: JSONObject,
+        deadline: t.Optional[float] = None,
+    ):
+        """Fetches series of published root hashes from Arweave. See `Audit.update_published_roots`."""
+        expires_at = deadline_expiry(deadline)
+        tree_name = result.root.tree_name
+        tree_sizes = self._load_stored_roots(pub_roots, tree_name, self._missing_tree_sizes(pub_roots, result))
+        if tree_sizes:
+            loop = asyncio.get_running_loop()
+            arweave_roots = await loop.run_in_executor(None, get_arweave_published_roots, tree_name, list(tree_sizes))
+        else:
+            arweave_roots = {}
+
+        # fill the missing roots from the server (if allowed)
+        for tree_size in tree_sizes:
+            pub_root = None
+            if tree_size in arweave_roots:
+                pub_root = JSONObject(arweave_roots[tree_size])
+                pub_root.source = "arweave"
+            elif self.allow_server_roots:
+                resp = await self.root(tree_size, deadline=time_left(expires_at))
+                if resp.success:
+                    pub_root = resp.result.data
+                    pub_root.source = "pangea"
+            pub_roots[tree_size] = pub_root
+
+        self._save_roots(pub_roots, tree_name, tree_sizes)
+
+    async def root(self, tree_size: int = 0, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Returns current root hash and consistency proof. See `Audit.root`."""
+        return await super().root(tree_size, deadline=deadline)
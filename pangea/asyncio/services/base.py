@@ -0,0 +1,26 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+from pangea.asyncio.request import AsyncPangeaRequest
+from pangea.services.base import ServiceBase
+
+
+class AsyncServiceBase(ServiceBase):
+    """Base class of the asyncio service clients.
+
+    Service requests are made through an AsyncPangeaRequest, so every API
+    method is a coroutine. Clients can be used as async context managers to
+    release their pooled connections on exit.
+    """
+
+    request_class = AsyncPangeaRequest
+
+    async def close(self):
+        """Closes the client and its pooled HTTP connections."""
+        await self.request.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
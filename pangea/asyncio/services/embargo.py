@@ -0,0 +1,30 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import typing as t
+
+from pangea.response import PangeaResponse
+from pangea.services.embargo import Embargo
+
+from .base import AsyncServiceBase
+
+
+class AsyncEmbargo(AsyncServiceBase, Embargo):
+    """Embargo service client for asyncio applications.
+
+    Same API as `pangea.services.Embargo`, with coroutine methods.
+
+    Examples:
+        from pangea.asyncio.services import AsyncEmbargo
+
+        async with AsyncEmbargo(token=PANGEA_TOKEN, config=embargo_config) as embargo:
+            response = await embargo.ip_check("1.1.1.1")
+    """
+
+    async def ip_check(self, ip: str, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Checks an IP against known sanction and trade embargo lists. See `Embargo.ip_check`."""
+        return await super().ip_check(ip, deadline=deadline)
+
+    async def iso_check(self, iso_code: str, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Checks a country against known sanction and trade embargo lists. See `Embargo.iso_check`."""
+        return await super().iso_check(iso_code, deadline=deadline)
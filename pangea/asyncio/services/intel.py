@@ -0,0 +1,84 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import typing as t
+
+from pangea.response import PangeaResponse
+from pangea.services.intel import DomainIntel, FileIntel, IpIntel, UrlIntel
+
+from .base import AsyncServiceBase
+
+
+class AsyncFileIntel(AsyncServiceBase, FileIntel):
+    """File Intel service client for asyncio applications.
+
+    Same API as `pangea.services.FileIntel`, with coroutine methods.
+    """
+
+    async def lookup(
+        self,
+        file_hash: str,
+        hash_type: str,
+        provider: str = None,
+        verbose: bool = False,
+        raw: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Retrieves file reputation from a provider, using the file's hash. See `FileIntel.lookup`."""
+        return await super().lookup(
+            file_hash, hash_type, provider=provider, verbose=verbose, raw=raw, deadline=deadline
+        )
+
+
+class AsyncIpIntel(AsyncServiceBase, IpIntel):
+    """IP Intel service client for asyncio applications.
+
+    Same API as `pangea.services.IpIntel`, with coroutine methods.
+    """
+
+    async def lookup(
+        self,
+        ip: str,
+        provider: str = None,
+        verbose: bool = False,
+        raw: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Retrieves IP address reputation from a provider. See `IpIntel.lookup`."""
+        return await super().lookup(ip, provider=provider, verbose=verbose, raw=raw, deadline=deadline)
+
+
+class AsyncUrlIntel(AsyncServiceBase, UrlIntel):
+    """URL Intel service client for asyncio applications.
+
+    Same API as `pangea.services.UrlIntel`, with coroutine methods.
+    """
+
+    async def lookup(
+        self,
+        url: str,
+        provider: str = None,
+        verbose: bool = False,
+        raw: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Retrieves URL address reputation from a provider. See `UrlIntel.lookup`."""
+        return await super().lookup(url, provider=provider, verbose=verbose, raw=raw, deadline=deadline)
+
+
+class AsyncDomainIntel(AsyncServiceBase, DomainIntel):
+    """Domain Intel service client for asyncio applications.
+
+    Same API as `pangea.services.DomainIntel`, with coroutine methods.
+    """
+
+    async def lookup(
+        self,
+        domain: str,
+        provider: str = None,
+        verbose: bool = False,
+        raw: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Retrieves Domain reputation from a provider. See `DomainIntel.lookup`."""
+        return await super().lookup(domain, provider=provider, verbose=verbose, raw=raw, deadline=deadline)
@@ -0,0 +1,36 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import typing as t
+
+from pangea.response import PangeaResponse
+from pangea.services.redact import Redact, RedactFormat
+
+from .base import AsyncServiceBase
+
+
+class AsyncRedact(AsyncServiceBase, Redact):
+    """Redact service client for asyncio applications.
+
+    Same API as `pangea.services.Redact`, with coroutine methods.
+
+    Examples:
+        from pangea.asyncio.services import AsyncRedact
+
+        async with AsyncRedact(token=PANGEA_TOKEN, config=redact_config) as redact:
+            response = await redact.redact("Jenny Jenny... 415-867-5309")
+    """
+
+    async def redact(self, text: str, debug=False, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Redacts the content of a single text string. See `Redact.redact`."""
+        return await super().redact(text, debug=debug, deadline=deadline)
+
+    async def redact_structured(
+        self,
+        obj: t.Any,
+        redact_format: RedactFormat = RedactFormat.JSON,
+        debug=False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
+        """Redacts text within a structured object. See `Redact.redact_structured`."""
+        return await super().redact_structured(obj, redact_format=redact_format, debug=debug, deadline=deadline)
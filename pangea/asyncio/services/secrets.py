@@ -0,0 +1,36 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import typing as t
+
+from pangea.response import PangeaResponse
+from pangea.services.secrets import Secrets
+
+from .base import AsyncServiceBase
+
+
+class AsyncSecrets(AsyncServiceBase, Secrets):
+    """Secrets service client for asyncio applications.
+
+    Same API as `pangea.services.Secrets`, with coroutine methods.
+
+    Examples:
+        from pangea.asyncio.services import AsyncSecrets
+
+        async with AsyncSecrets(token, config=config) as secrets:
+            response = await secrets.get("test-a-secret-2")
+    """
+
+    async def get(
+        self, secret_id: str, secret_version: str = None, deadline: t.Optional[float] = None
+    ) -> PangeaResponse:
+        """Gets a Secret from the Secret Store. See `Secrets.get`."""
+        return await super().get(secret_id, secret_version=secret_version, deadline=deadline)
+
+    async def add(self, secret_id: str, secret_value: str, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Adds a Secret in the Secret Store. See `Secrets.add`."""
+        return await super().add(secret_id, secret_value, deadline=deadline)
+
+    async def update(self, secret_id: str, secret_value: str, deadline: t.Optional[float] = None) -> PangeaResponse:
+        """Updates a Secret in the Secret Store. See `Secrets.update`."""
+        return await super().update(secret_id, secret_value, deadline=deadline)
@@ -0,0 +1,53 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import typing as t
+
+import aiohttp
+
+from pangea.config import PangeaConfig
+
+
+class AsyncPangeaTransport(object):
+    """Pooled HTTP connections shared by asyncio Pangea service clients.
+
+    Asyncio counterpart of PangeaTransport: a single `aiohttp.ClientSession`
+    keeping up to `pool_maxsize` kept-alive connections per host (and
+    `pool_connections * pool_maxsize` overall). The session is created on
+    first use, inside the running event loop.
+
+    Examples:
+        from pangea.asyncio.services import AsyncAudit, AsyncRedact
+        from pangea.asyncio.transport import AsyncPangeaTransport
+
+        async with AsyncPangeaTransport(config) as transport:
+            audit = AsyncAudit(token=PANGEA_TOKEN, config=config, transport=transport)
+            redact = AsyncRedact(token=PANGEA_TOKEN, config=config, transport=transport)
+    """
+
+    def __init__(self, config: PangeaConfig = None):
+        self.config = config if config else PangeaConfig()
+        self._session: t.Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_connections * self.config.pool_maxsize,
+                limit_per_host=self.config.pool_maxsize,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    async def close(self):
+        """Closes all the pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -1,7 +1,9 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 import logging
+import typing as t
 
+from pangea.audit_shipper import AuditShipper
 from pangea.services import Audit
 from pangea.config import PangeaConfig
 
@@ -25,6 +27,8 @@ class AuditLogger(logging.Logger):
     """
     def __init__(self, *args, **kwargs):
         super(AuditLogger, self).__init__(*args, **kwargs)
+        self.auditor: t.Optional[Audit] = None
+        self.shipper: t.Optional[AuditShipper] = None
 
     def set_auditor(self, auditor : Audit):
         """Sets the internal Pangea Audit Service client instance
@@ -34,6 +38,45 @@ class AuditLogger(logging.Logger):
         """
         self.auditor = auditor
 
+    def enable_shipping(self, **kwargs) -> AuditShipper:
+        """Sends audit messages from background threads
+
+        Once enabled, `audit()` queues the message and returns at once instead
+        of waiting for the Audit Service. Delivery errors are logged instead of
+        raised.
+
+        Args:
+            kwargs (dict) - AuditShipper options (capacity, workers, batch_size,
+                linger, policy, block_timeout, spool)
+
+        Examples:
+            from pangea.audit_shipper import BackpressurePolicy
+
+            logger.enable_shipping(workers=2, policy=BackpressurePolicy.DROP_OLDEST)
+        """
+        if not self.auditor:
+            raise Exception('Audit instance not set')
+
+        if self.shipper:
+            self.shipper.close()
+
+        self.shipper = AuditShipper(self.auditor, **kwargs)
+        return self.shipper
+
+    def flush(self, timeout: t.Optional[float] = None) -> bool:
+        """Waits until the queued audit messages have been sent
+
+        Args:
+            timeout (float) - maximum seconds to wait
+
+        Returns:
+            bool - True if every queued message was processed
+        """
+        if not self.shipper:
+            return True
+
+        return self.shipper.flush(timeout)
+
     def audit(self, message, *args, **kwargs):
         """Logs a Pangea Audit message
 
@@ -70,6 +113,10 @@ class AuditLogger(logging.Logger):
             if name in kwargs:
                 audit_record[name] = kwargs.pop(name)
 
+        if self.shipper:
+            self.shipper.enqueue(audit_record)
+            return
+
         resp = self.auditor.log(audit_record)
 
         if resp.success:
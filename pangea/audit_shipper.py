@@ -0,0 +1,332 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+import atexit
+import enum
+import logging
+import threading
+import time
+import typing as t
+from collections import deque
+
+from pangea.audit_spool import AuditSpool
+from pangea.services import Audit
+
+logger = logging.getLogger("audit")
+
+
+class BackpressurePolicy(str, enum.Enum):
+    """What AuditShipper.enqueue does when the in-memory queue is full"""
+
+    BLOCK = "block"
+    """Wait until the workers make room (up to `block_timeout`)"""
+
+    DROP_OLDEST = "drop_oldest"
+    """Discard the oldest queued event"""
+
+    SPILL = "spill"
+    """Keep the event only in the spool, read back once the queue drains"""
+
+
+class _Outcome(str, enum.Enum):
+    SENT = "sent"
+    REJECTED = "rejected"
+    RETRY = "retry"
+
+
+# maximum seconds between two attempts to send a batch
+MAX_RETRY_DELAY = 30.0
+
+
+class AuditShipper(object):
+    """Ships audit events to the Audit Service from background worker threads.
+
+    `enqueue()` validates the event, stores it in a bounded in-memory queue and
+    returns at once. Worker threads take up to `batch_size` queued events at a
+    time (waiting at most `linger` seconds for a batch to fill up) and send them
+    with a single bulk `log` request. When the queue is full, `policy` decides
+    whether to block the caller, drop the oldest event or spill to disk.
+
+    A batch that fails with a network error, a 5xx or a 429 response is sent
+    again up to `max_retries` times, with exponential backoff starting at
+    `retry_backoff` seconds, before being counted as failed. Events rejected by
+    the service with other 4xx responses are not retried.
+
+    With a `spool`, every event is written to it before being queued and is
+    acknowledged once delivered (or rejected by the service), so undelivered
+    events are replayed in order when the shipper is restarted. Spooled events
+    are never given up on: a batch still failing after its retries goes back
+    to the front of the queue, and `flush()` waits until it is delivered.
+
+    With `signing`, the workers sign each batch just before sending it
+    (requires `enable_signing` on `audit`).
+
+    Call `flush()` to wait until every queued event has been sent, and
+    `close()` for a clean shutdown (also done automatically at exit).
+
+    Args:
+        audit (Audit): Audit Service client used to send the events
+        capacity (int, optional): maximum number of events kept in memory
+        workers (int, optional): number of sending threads
+        batch_size (int, optional): maximum events per request
+        linger (float, optional): seconds a worker waits for a batch to fill up
+        policy (BackpressurePolicy, optional): behaviour when the queue is full
+        block_timeout (float, optional): with BLOCK, maximum seconds to wait for room
+            before dropping the event (None waits forever)
+        spool (AuditSpool, optional): durable storage of undelivered events, required with SPILL
+        signing (bool, optional): sign the events
+        max_retries (int, optional): extra attempts to send a batch after a transient failure
+        retry_backoff (float, optional): seconds to wait before the first retry, doubled on each retry
+
+    Examples:
+        from pangea.audit_shipper import AuditShipper, BackpressurePolicy
+
+        shipper = AuditShipper(audit, workers=2, policy=BackpressurePolicy.DROP_OLDEST)
+        shipper.enqueue({"message": "hello world"})
+        shipper.flush()
+    """
+
+    def __init__(
+        self,
+        audit: Audit,
+        capacity: int = 10000,
+        workers: int = 1,
+        batch_size: int = 100,
+        linger: float = 0.5,
+        policy: BackpressurePolicy = BackpressurePolicy.BLOCK,
+        block_timeout: t.Optional[float] = None,
+        spool: t.Optional[AuditSpool] = None,
+        signing: bool = False,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ):
+        if not (isinstance(capacity, int) and capacity > 0):
+            raise Exception("The 'capacity' argument must be a positive integer > 0")
+
+        if policy == BackpressurePolicy.SPILL and spool is None:
+            raise Exception("The 'spool' argument is required with the SPILL policy")
+
+        self.audit = audit
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.linger = linger
+        self.policy = BackpressurePolicy(policy)
+        self.block_timeout = block_timeout
+        self.signing = signing
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        # counters, for monitoring
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+        # queued (sequence number, record) pairs, the sequence number is None without spool
+        self._queue: t.Deque[t.Tuple[t.Optional[int], dict]] = deque()
+        self._spool = spool
+
+        # highest spool sequence number loaded into memory, the ones above are only on disk
+        self._cursor = spool.acked_seq if spool is not None else 0
+        self._in_flight = 0
+        self._flush_requests = 0
+        self._closed = False
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f"pangea-audit-shipper-{i}", daemon=True) for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+        atexit.register(self.close)
+
+    def enqueue(self, event: dict) -> bool:
+        """Queues an event to be sent in the background
+
+        Args:
+            event (dict): A structured dict describing an auditable activity, as in `Audit.log`
+
+        Returns:
+            bool: False if the event was dropped because the queue was full
+        """
+        record = self.audit._log_record(event, signing=self.signing)
+
+        with self._lock:
+            if self._closed:
+                raise Exception("Error: the audit shipper is closed")
+
+            if self._spilled():
+                # keep FIFO order while there are events only on disk
+                self._spool.append(record)
+                self._not_empty.notify()
+                return True
+
+            if len(self._queue) >= self.capacity:
+                if self.policy == BackpressurePolicy.DROP_OLDEST:
+                    seq, _ = self._queue.popleft()
+                    self.dropped += 1
+                    if seq is not None:
+                        self._spool.ack([seq])
+                elif self.policy == BackpressurePolicy.SPILL:
+                    self._spool.append(record)
+                    self._not_empty.notify()
+                    return True
+                elif not self._not_full.wait_for(lambda: len(self._queue) < self.capacity, self.block_timeout):
+                    self.dropped += 1
+                    return False
+
+            seq = None
+            if self._spool is not None:
+                seq = self._cursor = self._spool.append(record)
+
+            self._queue.append((seq, record))
+            self._not_empty.notify()
+
+        return True
+
+    def pending(self) -> int:
+        """Returns the number of events not sent yet"""
+        with self._lock:
+            return len(self._queue) + self._spilled() + self._in_flight
+
+    def flush(self, timeout: t.Optional[float] = None) -> bool:
+        """Waits until every queued event has been sent (or has failed)
+
+        Args:
+            timeout (float, optional): maximum seconds to wait
+
+        Returns:
+            bool: True if the queue was drained
+        """
+        with self._lock:
+            self._flush_requests += 1
+            self._not_empty.notify_all()
+            try:
+                return self._idle.wait_for(self._is_idle, timeout)
+            finally:
+                self._flush_requests -= 1
+
+    def close(self, timeout: t.Optional[float] = 30.0):
+        """Sends the queued events and stops the workers"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._not_empty.notify_all()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+        if self._spool is not None:
+            self._spool.sync()
+
+        atexit.unregister(self.close)
+
+    def _spilled(self) -> int:
+        return self._spool.last_seq - self._cursor if self._spool is not None else 0
+
+    def _is_idle(self) -> bool:
+        return not self._queue and not self._spilled() and self._in_flight == 0
+
+    def _refill(self):
+        """Loads spilled events back to the queue. Must be called with `_lock` held"""
+        if self._spilled():
+            room = self.capacity - len(self._queue)
+            if room > 0:
+                records = self._spool.read(self._cursor, room)
+                if records:
+                    self._queue.extend(records)
+                    self._cursor = records[-1][0]
+                else:
+                    # nothing left to read (i.e. acknowledged already), do not spin on it
+                    self._cursor = self._spool.last_seq
+
+    def _next_batch(self) -> t.List[t.Tuple[t.Optional[int], dict]]:
+        with self._lock:
+            while True:
+                self._not_empty.wait_for(lambda: self._queue or self._spilled() or self._closed)
+                self._refill()
+
+                # give the batch a chance to fill up, unless flushing or shutting down
+                if len(self._queue) < self.batch_size and not self._closed and not self._flush_requests:
+                    self._not_empty.wait_for(
+                        lambda: len(self._queue) + self._spilled() >= self.batch_size
+                        or self._closed
+                        or self._flush_requests,
+                        self.linger,
+                    )
+                    self._refill()
+
+                if self._queue:
+                    count = min(len(self._queue), self.batch_size)
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    self._in_flight += len(batch)
+                    self._not_full.notify(len(batch))
+                    return batch
+
+                # another worker took the events, wait for more unless shutting down
+                if self._closed and not self._spilled():
+                    return []
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                # only happens when closed and drained
+                return
+
+            outcome = self._deliver([record for _, record in batch])
+
+            # rejected events are acknowledged too, sending them again would not help
+            if outcome != _Outcome.RETRY and self._spool is not None:
+                self._spool.ack(seq for seq, _ in batch)
+
+            with self._lock:
+                self._in_flight -= len(batch)
+                if outcome == _Outcome.SENT:
+                    self.sent += len(batch)
+                elif outcome == _Outcome.RETRY and self._spool is not None and not self._closed:
+                    # spooled events are not given up on, they go back to the front of the queue
+                    self._queue.extendleft(reversed(batch))
+                    self._not_empty.notify()
+                else:
+                    # when closing, unacknowledged spooled events are replayed by the next shipper
+                    self.failed += len(batch)
+                if self._is_idle():
+                    self._idle.notify_all()
+
+    def _deliver(self, records: t.List[dict]) -> _Outcome:
+        """Sends a batch, retrying transient failures with exponential backoff"""
+        attempt = 0
+        while True:
+            outcome = self._send(records)
+            if outcome != _Outcome.RETRY or attempt >= self.max_retries:
+                return outcome
+
+            time.sleep(min(self.retry_backoff * 2**attempt, MAX_RETRY_DELAY))
+            attempt += 1
+
+    def _send(self, records: t.List[dict]) -> _Outcome:
+        try:
+            if self.signing:
+                self.audit._sign_records(records)
+            data = self.audit._log_bulk_payload(records, verbose=False)
+            response = self.audit.request.post("log", data=data)
+        except Exception as e:
+            logger.error(f"Error sending {len(records)} audit event(s): {str(e)}")
+            return _Outcome.RETRY
+
+        if response.success:
+            return _Outcome.SENT
+
+        logger.error(f"Error sending {len(records)} audit event(s): {response.code} {response.status}")
+
+        # the service rejected the events, retrying would not help
+        if 400 <= response.code < 500 and response.code != 429:
+            return _Outcome.REJECTED
+
+        return _Outcome.RETRY
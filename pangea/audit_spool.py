@@ -0,0 +1,260 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import typing as t
+
+logger = logging.getLogger("audit")
+
+SpoolRecord = t.Tuple[int, dict]
+
+_SEGMENT_SUFFIX = ".seg"
+_ACK_FILENAME = "ack"
+
+
+class AuditSpool(object):
+    """Durable write-ahead log of audit events waiting to be delivered.
+
+    Records are appended, with increasing sequence numbers, to segment files in
+    `directory` (one JSON line per record). Writes reach the OS on every append
+    and are fsync'ed in batches of `fsync_every` records or every
+    `fsync_interval` seconds. Delivered records are acknowledged with `ack()`;
+    the highest contiguously acknowledged sequence number is persisted and the
+    segments fully below it are deleted.
+
+    On restart, `read()` replays the unacknowledged records in order, so events
+    survive crashes and outages of the Audit Service (delivery is at least
+    once).
+
+    Args:
+        directory (str): spool directory, created if missing
+        max_segment_bytes (int, optional): size at which a new segment is started
+        fsync_every (int, optional): records written between fsyncs
+        fsync_interval (float, optional): maximum seconds between fsyncs
+
+    Examples:
+        from pangea.audit_shipper import AuditShipper
+        from pangea.audit_spool import AuditSpool
+
+        shipper = AuditShipper(audit, spool=AuditSpool("/var/spool/pangea-audit"))
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 16 * 1024 * 1024,
+        fsync_every: int = 100,
+        fsync_interval: float = 1.0,
+    ):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._acked = self._load_ack()
+        self._acked_ahead: t.Set[int] = set()
+
+        # first sequence number of each segment, sorted
+        self._segments: t.List[int] = sorted(
+            int(name[: -len(_SEGMENT_SUFFIX)]) for name in os.listdir(directory) if name.endswith(_SEGMENT_SUFFIX)
+        )
+        self._last_seq = self._recover()
+
+        self._file: t.Optional[t.BinaryIO] = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        # position of the last read, to continue sequential reads without rescanning
+        self._read_pos: t.Optional[t.Tuple[int, int, int]] = None
+
+        self._compact()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the last appended record (0 if none)"""
+        return self._last_seq
+
+    @property
+    def acked_seq(self) -> int:
+        """All the records up to this sequence number have been acknowledged"""
+        return self._acked
+
+    def __len__(self):
+        """Number of records not acknowledged yet"""
+        with self._lock:
+            return self._last_seq - self._acked - len(self._acked_ahead)
+
+    def append(self, record: dict) -> int:
+        """Appends a record, returning its sequence number"""
+        with self._lock:
+            seq = self._last_seq + 1
+            line = json.dumps([seq, record]).encode("utf-8") + b"\n"
+
+            if self._file is None or self._file.tell() + len(line) > self.max_segment_bytes:
+                self._rotate(seq)
+
+            self._file.write(line)
+            self._file.flush()
+            self._last_seq = seq
+
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+
+            return seq
+
+    def sync(self):
+        """Forces the written records to disk"""
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                os.fsync(self._file.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def read(self, after_seq: int, count: int) -> t.List[SpoolRecord]:
+        """Returns up to `count` records with sequence number greater than `after_seq`, in order"""
+        with self._lock:
+            records: t.List[SpoolRecord] = []
+            start = max(after_seq, self._acked)
+
+            if self._read_pos is not None and self._read_pos[0] == start:
+                _, segment, offset = self._read_pos
+            else:
+                segment = self._segment_of(start + 1)
+                offset = 0
+
+            while segment is not None and len(records) < count:
+                with open(self._segment_path(segment), "rb") as file:
+                    file.seek(offset)
+                    while len(records) < count:
+                        line = file.readline()
+                        if not line:
+                            break
+                        seq, record = json.loads(line)
+                        if seq > start:
+                            records.append((seq, record))
+                    offset = file.tell()
+
+                if len(records) < count:
+                    segment, offset = self._next_segment(segment), 0
+
+            if records and segment is not None:
+                self._read_pos = (records[-1][0], segment, offset)
+
+            return records
+
+    def ack(self, seqs: t.Iterable[int]):
+        """Acknowledges the delivery of records, compacting the spool when possible"""
+        with self._lock:
+            self._acked_ahead.update(seq for seq in seqs if seq > self._acked)
+
+            acked = self._acked
+            while acked + 1 in self._acked_ahead:
+                acked += 1
+                self._acked_ahead.remove(acked)
+
+            if acked != self._acked:
+                self._acked = acked
+                self._save_ack()
+                self._compact()
+
+    def close(self):
+        """Syncs and closes the active segment, deleting it if fully acknowledged"""
+        with self._lock:
+            self.sync()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._compact()
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}{_SEGMENT_SUFFIX}")
+
+    def _segment_of(self, seq: int) -> t.Optional[int]:
+        idx = bisect.bisect_right(self._segments, seq) - 1
+        if idx < 0:
+            return self._segments[0] if self._segments else None
+        return self._segments[idx]
+
+    def _next_segment(self, segment: int) -> t.Optional[int]:
+        idx = bisect.bisect_right(self._segments, segment)
+        return self._segments[idx] if idx < len(self._segments) else None
+
+    def _rotate(self, first_seq: int):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+
+        self._file = open(self._segment_path(first_seq), "ab")
+        # the last segment is reopened when recovery truncated its only record
+        if not self._segments or self._segments[-1] != first_seq:
+            self._segments.append(first_seq)
+        self._fsync_directory()
+
+    def _recover(self) -> int:
+        """Finds the last sequence number, dropping a record torn by a crash"""
+        if not self._segments:
+            return self._acked
+
+        path = self._segment_path(self._segments[-1])
+        last_seq = self._segments[-1] - 1
+        good_offset = 0
+
+        with open(path, "rb") as file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    last_seq = json.loads(line)[0]
+                    good_offset += len(line)
+                except ValueError:
+                    logger.warning(f"Discarding torn record at the end of {path}")
+                    break
+
+        if good_offset != os.path.getsize(path):
+            with open(path, "r+b") as file:
+                file.truncate(good_offset)
+
+        return max(last_seq, self._acked)
+
+    def _compact(self):
+        """Deletes the segments whose records have all been acknowledged"""
+        while len(self._segments) > 1 and self._segments[1] - 1 <= self._acked:
+            os.remove(self._segment_path(self._segments.pop(0)))
+            self._read_pos = None
+
+        # a fully acknowledged last segment can go too, unless it is being written
+        if self._segments and self._file is None and self._last_seq <= self._acked:
+            os.remove(self._segment_path(self._segments.pop()))
+            self._read_pos = None
+
+    def _load_ack(self) -> int:
+        try:
+            with open(os.path.join(self.directory, _ACK_FILENAME), "r") as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _save_ack(self):
+        path = os.path.join(self.directory, _ACK_FILENAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as file:
+            file.write(str(self._acked))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+
+    def _fsync_directory(self):
+        if hasattr(os, "O_DIRECTORY"):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
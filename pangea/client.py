@@ -1,4 +1,6 @@
-from pangea.services import Audit, Redact
+from pangea.config import PangeaConfig
+from pangea.services import Audit, DomainIntel, Embargo, FileIntel, IpIntel, Redact, Secrets, UrlIntel
+from pangea.transport import PangeaTransport
 
 
 class PangeaClient(object):
@@ -7,22 +9,69 @@ class PangeaClient(object):
 
     Instantiate with a valid PANGEA_TOKEN, see
         [https://docs.dev.pangea.cloud/docs/admin-guide/Services/#tokens](https://docs.dev.pangea.cloud/docs/admin-guide/Services/#tokens).
+
+    All the service clients share a single PangeaTransport, so connections are
+    reused across services and threads.
     """
 
-    def __init__(self, token=""):
+    def __init__(self, token="", config=None, transport=None):
         self.default_token = token
+        self.config = config if config else PangeaConfig()
+        self.transport = transport if transport else PangeaTransport(self.config)
 
         self.__audit = None
         self.__redact = None
+        self.__embargo = None
+        self.__file_intel = None
+        self.__ip_intel = None
+        self.__url_intel = None
+        self.__domain_intel = None
+        self.__secrets = None
 
     @property
     def audit(self):
         if not self.__audit:
-            self.__audit = Audit(token=self.default_token)
+            self.__audit = Audit(token=self.default_token, config=self.config, transport=self.transport)
         return self.__audit
 
     @property
     def redact(self):
         if not self.__redact:
-            self.__redact = Redact(token=self.default_token)
+            self.__redact = Redact(token=self.default_token, config=self.config, transport=self.transport)
         return self.__redact
+
+    @property
+    def embargo(self):
+        if not self.__embargo:
+            self.__embargo = Embargo(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__embargo
+
+    @property
+    def file_intel(self):
+        if not self.__file_intel:
+            self.__file_intel = FileIntel(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__file_intel
+
+    @property
+    def ip_intel(self):
+        if not self.__ip_intel:
+            self.__ip_intel = IpIntel(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__ip_intel
+
+    @property
+    def url_intel(self):
+        if not self.__url_intel:
+            self.__url_intel = UrlIntel(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__url_intel
+
+    @property
+    def domain_intel(self):
+        if not self.__domain_intel:
+            self.__domain_intel = DomainIntel(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__domain_intel
+
+    @property
+    def secrets(self):
+        if not self.__secrets:
+            self.__secrets = Secrets(token=self.default_token, config=self.config, transport=self.transport)
+        return self.__secrets
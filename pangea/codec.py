@@ -0,0 +1,177 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+import json
+import threading
+import typing as t
+
+JSON_TYPES = [int, float, str, bool]
+_JSON_TYPES = tuple(JSON_TYPES)
+
+# range of the integers encoded natively by orjson
+_MIN_INT = -(2**63)
+_MAX_INT = 2**64 - 1
+
+
+def _default(obj):
+    # stringify invalid JSON types before canonicalizing
+    if not isinstance(obj, _JSON_TYPES):
+        return str(obj)
+    else:
+        return obj
+
+
+# json.dumps() builds a new encoder for every call with non default options,
+# this one is shared (encoding keeps no state in the encoder)
+_CANONICAL_ENCODER = json.JSONEncoder(
+    ensure_ascii=False, allow_nan=False, separators=(",", ":"), sort_keys=True, default=_default
+)
+
+
+class JSONCodec(object):
+    """Encodes and decodes JSON documents, using the standard `json` module.
+
+    Base class of the codecs selected with `PangeaConfig.json_codec`. Faster
+    backends override these methods, but must keep `canonical()` byte for byte
+    identical to this implementation since its output is hashed and signed.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: t.Any) -> bytes:
+        """Encodes a request body or a dump record"""
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: t.Union[bytes, str]) -> t.Any:
+        """Decodes a response body or a dump record"""
+        return json.loads(data)
+
+    def canonical(self, obj: t.Any) -> bytes:
+        """Converts to valid JSON types and applies RFC-7159 (Canonical JSON)"""
+        return _CANONICAL_ENCODER.encode(obj).encode("utf-8")
+
+
+class OrjsonCodec(JSONCodec):
+    """JSON codec backed by `orjson`, if installed (`pip3 install orjson`).
+
+    orjson formats floats, datetimes and enums differently from the standard
+    library, so canonical JSON only goes through it for "plain" documents
+    (string keys, strings, 64-bit integers, booleans, nulls and lists) and
+    falls back to the standard library otherwise.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+
+    def dumps(self, obj: t.Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj)
+        except TypeError:
+            # non-string keys, integers over 64 bits...
+            return super().dumps(obj)
+
+    def loads(self, data: t.Union[bytes, str]) -> t.Any:
+        return self._orjson.loads(data)
+
+    def canonical(self, obj: t.Any) -> bytes:
+        if _is_plain(obj):
+            try:
+                return self._orjson.dumps(obj, option=self._orjson.OPT_SORT_KEYS)
+            except self._orjson.JSONEncodeError:
+                # i.e. lone surrogates, let the standard library report them
+                pass
+        return super().canonical(obj)
+
+
+def _is_plain(obj: t.Any) -> bool:
+    """True if `obj` only holds values encoded identically by orjson and the standard library"""
+    try:
+        return _is_plain_value(obj)
+    except RecursionError:
+        return False
+
+
+def _is_plain_value(value: t.Any) -> bool:
+    # recursive, with the common cases (dicts of strings) first: faster than an explicit stack
+    kind = type(value)
+    if kind is str or kind is bool or value is None:
+        return True
+    elif kind is dict:
+        for key, item in value.items():
+            if type(key) is not str or (type(item) is not str and not _is_plain_value(item)):
+                return False
+        return True
+    elif kind is int:
+        return _MIN_INT <= value <= _MAX_INT
+    elif isinstance(value, dict):
+        for key in value:
+            if type(key) is not str:
+                return False
+        return all(_is_plain_value(item) for item in dict.values(value))
+    elif kind is list or kind is tuple:
+        for item in value:
+            if type(item) is not str and not _is_plain_value(item):
+                return False
+        return True
+    else:
+        return False
+
+
+_CODECS: t.Dict[str, t.Type[JSONCodec]] = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+_instances: t.Dict[str, JSONCodec] = {}
+_instances_lock = threading.Lock()
+_default_name = JSONCodec.name
+
+
+def available_codecs() -> t.List[str]:
+    """Returns the names of the codecs whose backend is installed"""
+    names = []
+    for name in _CODECS:
+        try:
+            get_codec(name)
+            names.append(name)
+        except Exception:
+            pass
+    return names
+
+
+def get_codec(name: t.Optional[str] = None) -> JSONCodec:
+    """Returns the codec called `name`, or the default codec
+
+    Raises:
+        Exception: if the codec is unknown or its backend is not installed
+    """
+    name = name or _default_name
+
+    # codecs are never removed, no lock is needed to find an existing one
+    codec = _instances.get(name)
+    if codec is not None:
+        return codec
+
+    with _instances_lock:
+        codec = _instances.get(name)
+        if codec is None:
+            if name not in _CODECS:
+                raise Exception(f"Unknown JSON codec '{name}', expected one of: {', '.join(_CODECS)}")
+
+            try:
+                codec = _instances[name] = _CODECS[name]()
+            except ImportError as e:
+                raise Exception(f"The '{name}' JSON codec is not installed: {str(e)}")
+
+    return codec
+
+
+def set_default_codec(name: str):
+    """Sets the codec used when none is given, such as by `canonicalize_json`"""
+    global _default_name
+
+    get_codec(name)
+    _default_name = name
@@ -23,15 +23,22 @@ class PangeaConfig:
     request_retries: int = 3
 
     """'
-    Backoff strategy passed to 'requests'
+    Backoff factor of the retries: no wait before the first retry, then
+    `request_backoff * 2^(retry - 1)` seconds
     """
     request_backoff: int = 1
 
     """
-    Timeout used on initial request attempts
+    Timeout, in seconds, waiting for the server to respond on each
+    request attempt (read timeout)
     """
     request_timeout: int = 5
 
+    """
+    Timeout, in seconds, to establish a connection to the server
+    """
+    connect_timeout: int = 5
+
     """
     Enable queued request retry support
     """
@@ -43,3 +50,25 @@ class PangeaConfig:
 
     """
     queued_retries: int = 4
+
+    """
+    Number of per-host connection pools kept by the transport
+    """
+    pool_connections: int = 10
+
+    """
+    Maximum number of connections kept alive in each per-host pool
+    """
+    pool_maxsize: int = 10
+
+    """
+    Block when a pool has no free connection, instead of opening a
+    connection that is discarded after use
+    """
+    pool_block: bool = False
+
+    """
+    JSON codec used to encode requests and decode responses: "json" (the
+    standard library) or "orjson" (requires the orjson package)
+    """
+    json_codec: str = "json"
@@ -2,16 +2,31 @@
 # Author: Pangea Cyber Corporation
 
 import argparse
-import io
-import math
+import json
 import os
 import sys
+import time
 import typing as t
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from itertools import groupby
 
+import pangea.merkle as merkle
 import pangea.services.audit_util as audit_util
+from pangea.codec import set_default_codec
 from pangea.services import Audit
-from pangea.tools_util import Event, SequenceFollower, exit_with_error, file_events, init_audit, print_progress_bar
+from pangea.services.root_store import RootStore
+from pangea.tools_util import (
+    Event,
+    InputStream,
+    SequenceFollower,
+    add_json_codec_argument,
+    add_root_store_argument,
+    exit_with_error,
+    file_events,
+    init_audit,
+    print_progress_bar,
+)
 
 
 class Errors(t.TypedDict):
@@ -23,13 +38,33 @@ class Errors(t.TypedDict):
     buffer_missing: int
 
 
+class Position(t.NamedTuple):
+    """Where to resume reading the input: the first `skip` events of the line at `offset` were already read"""
+
+    offset: int
+    line: int
+    skip: int
+
+
+class Checkpoint(t.TypedDict):
+    input_size: t.Optional[int]
+    position: Position
+    events: int
+    errors: Errors
+    cold_indexes: list[tuple[int, int]]
+    root_hashes: dict[int, str]
+
+
+# a buffer job: (first event number, leaf index, events, root hashes, position after the buffer)
+BufferJob = tuple[int, t.Optional[int], list[Event], dict[int, str], Position]
+
 root_hashes: dict[int, str] = {}
 
+# approximate number of events verified by a worker process per task
+BATCH_EVENTS = 2000
 
-def num_lines(f: io.TextIOWrapper) -> int:
-    res = sum(1 for _ in f)
-    f.seek(0)
-    return res
+# minimum number of seconds between two checkpoints
+CHECKPOINT_INTERVAL = 30
 
 
 def path2index(tree_size: int, path: str) -> int:
@@ -37,64 +72,42 @@ def path2index(tree_size: int, path: str) -> int:
     Given a tree size (total number of leaves) and a proof, returns
     the associated leaf index.
     """
-    ans = 0
-    for side in reversed(path):
-        size_left = _tree_size_left(tree_size)
-        size_right = tree_size - size_left
-        if side == "l":
-            ans += size_left
-            tree_size = size_right
-        else:
-            tree_size = size_left
-    return ans
+    return merkle.sides_to_index(tree_size, *merkle.path_to_sides(path))
 
 
 def index2path(tree_size: int, leaf_index: int) -> str:
     """
     Get the proof sides (l/r sequence) for a given leaf index and tree size
     """
-    revpath = []
-    while tree_size > 1:
-        size_left = _tree_size_left(tree_size)
-        size_right = tree_size - size_left
-        if leaf_index < size_left:
-            revpath.append("r")
-            tree_size = size_left
-        else:
-            revpath.append("l")
-            tree_size = size_right
-            leaf_index -= size_left
-    return "".join(reversed(revpath))
+    return merkle.sides_to_path(*merkle.index_to_sides(tree_size, leaf_index))
 
 
 def get_path_size(tree_size: int, leaf_index: int) -> int:
     """
     Return the size of the path for a given tree_size and leaf_number
     """
-    return len(index2path(tree_size, leaf_index))
+    return merkle.path_length(tree_size, leaf_index)
 
 
 def _tree_size_left(tree_size: int) -> int:
     """if the tree has size tree_size, return the size of the left child"""
-    if tree_size <= 1:
-        return 0
-    return 2 ** (math.ceil(math.log2(tree_size)) - 1)
+    return merkle.tree_size_left(tree_size)
 
 
 def get_proof_path(proof: str) -> str:
-    return "".join(elem[0] for elem in proof.split(","))
+    return merkle.sides_to_path(*merkle.proof_sides(proof))
 
 
 def height(size: int) -> int:
-    return int(math.log2(size)) + 1
+    return size.bit_length()
 
 
 def index_number(tree_height: int, membership_proof: str) -> int:
-    decoded_proof = audit_util.decode_membership_proof(membership_proof)
+    sides, length = merkle.proof_sides(membership_proof)
     idx_number: int = 0
-    for idx, proof in enumerate(decoded_proof):
-        if proof.side == "left":
-            idx_number += round(2 ** (tree_height - idx - 1))
+    for idx in range(min(length, tree_height)):
+        if (sides >> idx) & 1:
+            idx_number += 1 << (tree_height - idx - 1)
     return idx_number
 
 
@@ -123,18 +136,33 @@ def verify_membership_proof(node_hash: str, root_hash: str, proof: str) -> bool:
     try:
         root_hash_dec = audit_util.decode_hash(root_hash)
         node_hash_dec = audit_util.decode_hash(node_hash)
-        proof_dec = audit_util.decode_membership_proof(proof)
+        proof_dec = audit_util.decode_compact_membership_proof(proof)
         succeeded = audit_util.verify_membership_proof(node_hash_dec, root_hash_dec, proof_dec)
     except Exception:
         pass
     return succeeded
 
 
-def get_root_hash(audit: Audit, tree_size: int) -> str:
+def get_tree_name(event: Event) -> t.Optional[str]:
+    return event.get("tree_name")
+
+
+def get_root_hash(audit: Audit, tree_name: t.Optional[str], tree_size: int) -> str:
+    """Returns the root hash at `tree_size`, from the root store or from the server"""
+    if tree_name:
+        root = audit.root_store.get(tree_name, tree_size)
+        if root is not None:
+            return root["root_hash"]
+
     resp = audit.root(tree_size)
     if not resp.success:
         raise ValueError(f"Error getting root: {resp.status}")
-    return resp.result.data.root_hash
+
+    root = resp.result.data
+    if root.tree_name:
+        root.source = "pangea"
+        audit.root_store.put(root.tree_name, tree_size, root)
+    return root.root_hash
 
 
 def print_error(msg: str, level: str = "error"):
@@ -145,14 +173,8 @@ def print_error(msg: str, level: str = "error"):
     print(f"{dot} {msg:200s}", end="\r")
 
 
-def deep_verify(audit: Audit, file: io.TextIOWrapper) -> Errors:
-    print("Counting events...", end="\r")
-    total_events = num_lines(file)
-    print(f"Counting events... {total_events}")
-
-    cnt = 1
-
-    errors: Errors = {
+def new_errors() -> Errors:
+    return {
         "hash": 0,
         "membership_proof": 0,
         "buffer_missing": 0,
@@ -161,68 +183,259 @@ def deep_verify(audit: Audit, file: io.TextIOWrapper) -> Errors:
         "wrong_buffer": 0,
     }
 
-    events = file_events(root_hashes, file)
-    events_by_idx: list[Event] | t.Iterator[Event]
-    cold_indexes = SequenceFollower()
-    for leaf_index, events_by_idx in groupby(events, lambda event: event.get("leaf_index")):
-        events_by_idx = list(events_by_idx)
-        buffer_lines = (cnt, cnt + len(events_by_idx) - 1)
-        if leaf_index is None:
-            print_error(
-                f"Lines {buffer_lines[0]}-{buffer_lines[1]} ({buffer_lines[1]-buffer_lines[0]+1}): Buffer was not persisted"
-            )
-            errors["not_persisted"] += len(events_by_idx)
-            cnt += len(events_by_idx)
+
+def verify_buffer(
+    first_line: int, leaf_index: t.Optional[int], events_by_idx: list[Event], root_hashes: dict[int, str]
+) -> tuple[Errors, list[str]]:
+    """
+    Verifies the events of a buffer (consecutive events with the same leaf index),
+    starting at line `first_line` of the input. `root_hashes` must hold the root
+    hash of every tree size used by the events.
+
+    Has no side effects, so it can run in a worker process. Returns the errors
+    found and the messages to report.
+    """
+    errors = new_errors()
+    messages: list[str] = []
+    buffer_lines = (first_line, first_line + len(events_by_idx) - 1)
+
+    if leaf_index is None:
+        messages.append(
+            f"Lines {buffer_lines[0]}-{buffer_lines[1]} ({buffer_lines[1]-buffer_lines[0]+1}): Buffer was not persisted"
+        )
+        errors["not_persisted"] += len(events_by_idx)
+        return errors, messages
+
+    cold_path_size: t.Optional[int] = None
+    hot_out_of_order: set[int] = set()
+    for i, event in enumerate(events_by_idx):
+        tree_size = get_tree_size(event)
+        cold_path_size = cold_path_size or get_path_size(tree_size, leaf_index)
+
+        if not verify_hash(event["envelope"], event["hash"]):
+            errors["hash"] += 1
+
+        elif not verify_membership_proof(event["hash"], root_hashes[tree_size], event.get("membership_proof")):
+            errors["membership_proof"] += 1
+
+        if "membership_proof" not in event:
+            # cannot continue without a membership proof
             continue
 
-        cold_indexes.add(leaf_index)
-
-        cold_path_size: t.Optional[int] = None
-        hot_out_of_order: set[int] = set()
-        for i, event in enumerate(events_by_idx):
-            cnt += 1
-            tree_size = get_tree_size(event)
-            if tree_size not in root_hashes:
-                root_hashes[tree_size] = get_root_hash(audit, tree_size)
-            cold_path_size = cold_path_size or get_path_size(tree_size, leaf_index)
-
-            print_progress_bar(cnt, total_events, "Verifying events...")
-            if not verify_hash(event["envelope"], event["hash"]):
-                errors["hash"] += 1
-
-            elif not verify_membership_proof(event["hash"], root_hashes[tree_size], event.get("membership_proof")):
-                errors["membership_proof"] += 1
-
-            if "membership_proof" not in event:
-                # cannot continue without a membership proof
-                continue
-
-            path = get_proof_path(event["membership_proof"])
-            hot_path = path[:-cold_path_size]
-            cold_path = path[-cold_path_size:]
-
-            cold_idx = path2index(tree_size, cold_path)
-            if cold_idx != leaf_index:
-                errors["wrong_buffer"] += 1
-
-            hot_idx = path2index(len(events_by_idx), hot_path)
-            if hot_idx in hot_out_of_order:
-                hot_out_of_order.remove(hot_idx)
-            elif hot_idx != i:
-                hot_out_of_order.add(hot_idx)
-
-        if hot_out_of_order:
-            errors["missing"] += len(hot_out_of_order)
-            print_error(
-                f"Lines {buffer_lines[0]}-{buffer_lines[1]} ({buffer_lines[1]-buffer_lines[0]}), Buffer #{cold_idx}: {len(hot_out_of_order)} event(s) missing"
-            )
-
-    cold_holes = cold_indexes.holes()
+        sides, length = merkle.proof_sides(event["membership_proof"])
+        hot_path, cold_path = merkle.split_sides(sides, length, min(cold_path_size, length))
+
+        cold_idx = merkle.sides_to_index(tree_size, *cold_path)
+        if cold_idx != leaf_index:
+            errors["wrong_buffer"] += 1
+
+        hot_idx = merkle.sides_to_index(len(events_by_idx), *hot_path)
+        if hot_idx in hot_out_of_order:
+            hot_out_of_order.remove(hot_idx)
+        elif hot_idx != i:
+            hot_out_of_order.add(hot_idx)
+
+    if hot_out_of_order:
+        errors["missing"] += len(hot_out_of_order)
+        messages.append(
+            f"Lines {buffer_lines[0]}-{buffer_lines[1]} ({buffer_lines[1]-buffer_lines[0]}), Buffer #{cold_idx}: {len(hot_out_of_order)} event(s) missing"
+        )
+
+    return errors, messages
+
+
+def positioned_events(file: InputStream, start: Position) -> t.Iterator[tuple[Position, Event]]:
+    """Reads the events from `start`, with the position of each one"""
+    file.seek(start.offset, start.line)
+    offset = start.offset
+    for line in file:
+        line_no = file.lines - 1
+        for event_no, event in enumerate(file_events(root_hashes, [line], line_no)):
+            if line_no > start.line or event_no >= start.skip:
+                yield Position(offset, line_no, event_no), event
+        offset = file.position
+
+
+def buffer_jobs(
+    audit: Audit, file: InputStream, start: Position = Position(0, 0, 0), cnt: int = 1
+) -> t.Iterator[BufferJob]:
+    """
+    Splits the input in buffers, yielding the arguments of verify_buffer() for each one,
+    followed by the position of the next buffer. `cnt` is the number of the first event.
+    The missing root hashes are fetched here, in the calling process.
+    """
+    events = positioned_events(file, start)
+    buffer: t.Optional[tuple[t.Optional[int], list[Event], dict[int, str]]] = None
+    for leaf_index, group in groupby(events, lambda item: item[1].get("leaf_index")):
+        position, first_event = next(group)
+        if buffer is not None:
+            # the buffer ends where this one starts
+            yield (cnt, *buffer, position)
+            cnt += len(buffer[1])
+
+        events_by_idx = [first_event]
+        events_by_idx.extend(event for _, event in group)
+
+        buffer_roots: dict[int, str] = {}
+        if leaf_index is not None:
+            for event in events_by_idx:
+                tree_size = get_tree_size(event)
+                if tree_size not in root_hashes:
+                    root_hashes[tree_size] = get_root_hash(audit, get_tree_name(event), tree_size)
+                buffer_roots[tree_size] = root_hashes[tree_size]
+
+        buffer = (leaf_index, events_by_idx, buffer_roots)
+
+    if buffer is not None:
+        yield (cnt, *buffer, Position(file.position, file.lines, 0))
+
+
+def verify_buffer_batch(jobs: list[BufferJob]) -> list[tuple[Errors, list[str]]]:
+    return [verify_buffer(*job[:4]) for job in jobs]
+
+
+def verify_buffers(
+    jobs: t.Iterator[BufferJob], workers: int
+) -> t.Iterator[tuple[int, t.Optional[int], int, Errors, list[str], Position]]:
+    """
+    Runs verify_buffer() for each job, on `workers` processes if more than one, yielding
+    (first event number, leaf index, event count, errors, messages, next position) in input order.
+    """
+    if workers <= 1:
+        for first_line, leaf_index, events_by_idx, buffer_roots, position in jobs:
+            errors, messages = verify_buffer(first_line, leaf_index, events_by_idx, buffer_roots)
+            yield first_line, leaf_index, len(events_by_idx), errors, messages, position
+        return
+
+    def batches() -> t.Iterator[list[BufferJob]]:
+        # buffers are sent to the workers in batches of about BATCH_EVENTS events
+        batch: list[BufferJob] = []
+        batch_events = 0
+        for job in jobs:
+            batch.append(job)
+            batch_events += len(job[2])
+            if batch_events >= BATCH_EVENTS:
+                yield batch
+                batch, batch_events = [], 0
+        if batch:
+            yield batch
+
+    def results(batch, future: Future):
+        for (first_line, leaf_index, events_by_idx, _, position), (errors, messages) in zip(batch, future.result()):
+            yield first_line, leaf_index, len(events_by_idx), errors, messages, position
+
+    # a few batches queued per worker, the input is not read further ahead
+    window = workers * 2
+    pending: t.Deque[tuple[list, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batches():
+            pending.append((batch, executor.submit(verify_buffer_batch, batch)))
+
+            while len(pending) >= window or (pending and pending[0][1].done()):
+                yield from results(*pending.popleft())
+
+        while pending:
+            yield from results(*pending.popleft())
+
+
+def load_checkpoint(path: str, file: InputStream) -> t.Optional[Checkpoint]:
+    """Loads the checkpoint saved at `path`, or returns None if there is none"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if data["input_size"] is not None and file.size is not None and data["input_size"] != file.size:
+        raise Exception(f"checkpoint {path} was made on a different input ({data['input_size']} bytes)")
+
+    return {
+        "input_size": data["input_size"],
+        "position": Position(*data["position"]),
+        "events": data["events"],
+        "errors": data["errors"],
+        "cold_indexes": [tuple(run) for run in data["cold_indexes"]],
+        "root_hashes": {int(size): root_hash for size, root_hash in data["root_hashes"].items()},
+    }
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint):
+    """Saves the checkpoint atomically, so that an interruption leaves the previous one"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def print_progress(file: InputStream, events: int):
+    """Shows the progress by bytes read, or only the number of events if the input size is unknown"""
+    if file.size:
+        print_progress_bar(file.offset, file.size, "Verifying events...", f"{events} events")
+    else:
+        print(f"Verifying events... {events}", end="\r")
+
+
+def deep_verify(audit: Audit, file: InputStream, workers: int = 1, checkpoint_path: str = "") -> Errors:
+    """
+    Verifies the events of `file`. If `checkpoint_path` is set, the progress is saved
+    there periodically, and the verification resumes from it when it exists.
+    """
+    errors = new_errors()
+    cold_indexes = SequenceFollower()
+    total_events = 0
+    position = Position(0, 0, 0)
+
+    checkpoint = load_checkpoint(checkpoint_path, file) if checkpoint_path else None
+    if checkpoint:
+        errors = checkpoint["errors"]
+        cold_indexes = SequenceFollower.from_runs(checkpoint["cold_indexes"])
+        total_events = checkpoint["events"]
+        position = checkpoint["position"]
+        root_hashes.update(checkpoint["root_hashes"])
+        print(f"Resuming from checkpoint {checkpoint_path}, after {total_events} events")
+
+    def save():
+        save_checkpoint(
+            checkpoint_path,
+            {
+                "input_size": file.size,
+                "position": position,
+                "events": total_events,
+                "errors": errors,
+                "cold_indexes": cold_indexes.runs(),
+                "root_hashes": root_hashes,
+            },
+        )
+
+    last_save = time.monotonic()
+    jobs = buffer_jobs(audit, file, position, total_events + 1)
+    for first_line, leaf_index, count, buffer_errors, messages, next_position in verify_buffers(jobs, workers):
+        for key, val in buffer_errors.items():
+            errors[key] += val
+        for msg in messages:
+            print_error(msg)
+
+        if leaf_index is not None:
+            cold_indexes.add(leaf_index)
+
+        total_events = first_line + count - 1
+        position = next_position
+        print_progress(file, total_events)
+
+        if checkpoint_path and time.monotonic() - last_save >= CHECKPOINT_INTERVAL:
+            save()
+            last_save = time.monotonic()
+
+    if checkpoint_path:
+        # resuming from the end of the input only reports the totals
+        save()
+
+    cold_holes = cold_indexes.hole_count()
     if cold_holes:
-        errors["buffer_missing"] += len(cold_holes)
-        print_error(f"{len(cold_holes)} buffer(s) missing")
+        errors["buffer_missing"] += cold_holes
+        print_error(f"{cold_holes} buffer(s) missing")
 
-    print_progress_bar(total_events, total_events, "Verifying events...")
+    print_progress(file, total_events)
     return errors
 
 
@@ -244,9 +457,24 @@ def create_parser():
         "--file",
         "-f",
         required=True,
-        type=argparse.FileType("r"),
-        help="Event input file. Must be a collection of " "JSON Objects separated by newlines",
+        help="Event input file, or - for standard input. Must be a collection of JSON Objects separated by newlines, "
+        "optionally gzip or zstd compressed",
+    )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Number of processes verifying the events (default: 1)",
     )
+    parser.add_argument(
+        "--checkpoint",
+        default="",
+        metavar="FILE",
+        help="File where the progress is saved periodically. If it exists, the verification resumes from it",
+    )
+    add_json_codec_argument(parser)
+    add_root_store_argument(parser)
     return parser
 
 
@@ -259,6 +487,8 @@ def parse_args(parser):
     if not args.domain:
         raise ValueError("domain missing")
 
+    set_default_codec(args.json_codec)
+
     return args
 
 
@@ -273,8 +503,10 @@ def main():
     print("Pangea Audit Event Deep Verifier\n")
 
     try:
-        audit = init_audit(args.token, args.domain, args.config_id)
-        errors = deep_verify(audit, args.file)
+        root_store = RootStore(args.root_store) if args.root_store else None
+        audit = init_audit(args.token, args.domain, args.config_id, args.json_codec, root_store)
+        with InputStream(args.file) as file:
+            errors = deep_verify(audit, file, args.workers, args.checkpoint)
 
         print("\n\nTotal errors:")
         for key, val in errors.items():
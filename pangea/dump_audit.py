@@ -3,25 +3,37 @@
 
 import argparse
 import io
-import json
+import itertools
 import os
 import sys
 from datetime import datetime
 
 import dateutil.parser
 
+from pangea.codec import get_codec, set_default_codec
 from pangea.response import PangeaResponse
 from pangea.services import Audit
-from pangea.tools_util import get_script_name, init_audit, make_aware_datetime, print_progress_bar
+from pangea.tools_util import (
+    add_json_codec_argument,
+    get_script_name,
+    init_audit,
+    make_aware_datetime,
+    print_progress_bar,
+)
+
+PAGE_SIZE = 1000
+DEFAULT_CONCURRENCY = 4
 
 
 def dump_event(output: io.TextIOWrapper, row: dict, resp: PangeaResponse):
     if "root" in resp.result:
         row.tree_size = resp.result.root.size
-    output.write(json.dumps(row) + "\n")
+    output.write(get_codec().dumps(row).decode("utf-8") + "\n")
 
 
-def dump_audit(audit: Audit, output: io.TextIOWrapper, start: datetime, end: datetime) -> int:
+def dump_audit(
+    audit: Audit, output: io.TextIOWrapper, start: datetime, end: datetime, concurrency: int = DEFAULT_CONCURRENCY
+) -> int:
     """
     Use the /search endpoint to download all the events from a range of time.
     Also extend the range in both directions to cover full buffers.
@@ -30,7 +42,7 @@ def dump_audit(audit: Audit, output: io.TextIOWrapper, start: datetime, end: dat
     page_end = start
     offset = dump_before(audit, output, start)
     while True:
-        page_end, page_size = dump_page(audit, output, page_end, end, first=offset == 0)
+        page_end, page_size = dump_page(audit, output, page_end, end, first=offset == 0, concurrency=concurrency)
         if page_size == 0:
             break
         offset += page_size
@@ -78,12 +90,22 @@ def dump_after(audit: Audit, output: io.TextIOWrapper, start: datetime) -> int:
 
 
 def dump_page(
-    audit: Audit, output: io.TextIOWrapper, start: datetime, end: datetime, first: bool = False
+    audit: Audit,
+    output: io.TextIOWrapper,
+    start: datetime,
+    end: datetime,
+    first: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
 ) -> tuple[datetime, int]:
 
     print("Dumping...", end="\r")
     search_res = audit.search(
-        start=start.isoformat(), end=end.isoformat(), order="asc", order_by="received_at", verify=False, limit=1000
+        start=start.isoformat(),
+        end=end.isoformat(),
+        order="asc",
+        order_by="received_at",
+        verify=False,
+        limit=PAGE_SIZE,
     )
     if not search_res.success:
         raise ValueError(f"Error fetching events: {search_res.result}")
@@ -96,15 +118,19 @@ def dump_page(
     offset = 0
     result_id = search_res.result.id
     count = search_res.result.count
-    while offset < count:
+
+    # the remaining pages are fetched in parallel, and come back in order
+    pages = itertools.chain(
+        [search_res],
+        audit.results_all(
+            result_id, count, concurrency=concurrency, limit=PAGE_SIZE, offset=len(search_res.result.events)
+        ),
+    )
+    for search_res in pages:
         for row in search_res.result.events:
             if first or offset > 0:
                 dump_event(output, row, search_res)
             offset += 1
-        if offset < count:
-            search_res = audit.results(result_id, offset=offset)
-            if not search_res.success:
-                raise ValueError("Error fetching events")
         print_progress_bar(offset, count, prefix=msg, suffix="Complete", length=50)
 
     page_end = dateutil.parser.parse(row.envelope.received_at)
@@ -132,6 +158,14 @@ def create_parser():
     parser.add_argument(
         "end", type=dateutil.parser.parse, help="End timestamp. Supports a variety of formats, including ISO-8601"
     )
+    parser.add_argument(
+        "--concurrency",
+        "-n",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Number of result pages fetched in parallel (default: {DEFAULT_CONCURRENCY})",
+    )
+    add_json_codec_argument(parser)
 
     return parser
 
@@ -154,6 +188,8 @@ def parse_args(parser):
     if args.start > args.end:
         raise ValueError("start_date must be before than end_date")
 
+    set_default_codec(args.json_codec)
+
     return args
 
 
@@ -169,8 +205,8 @@ def main():
     print("Pangea Audit Dump Tool\n")
 
     try:
-        audit = init_audit(args.token, args.domain, args.config_id)
-        cnt = dump_audit(audit, args.output, args.start, args.end)
+        audit = init_audit(args.token, args.domain, args.config_id, args.json_codec)
+        cnt = dump_audit(audit, args.output, args.start, args.end, args.concurrency)
         print(f"\nFile {args.output.name} created with {cnt} events.")
 
     except Exception as e:
@@ -0,0 +1,10 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+
+class PangeaException(Exception):
+    """Base class of the errors raised by the Pangea SDK"""
+
+
+class PangeaTimeoutError(PangeaException, TimeoutError):
+    """A request did not complete within its timeout or deadline"""
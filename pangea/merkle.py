@@ -0,0 +1,102 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+"""
+Exact index arithmetic for the Audit Merkle trees.
+
+A tree of `tree_size` leaves has a left subtree holding the largest power of two
+smaller than `tree_size` leaves, and a right subtree holding the rest. The path
+of a leaf is described by a side bitmask and a length: bit `i` (level `i`,
+counted from the leaf) is set when the sibling at that level is on the left
+("l" in a membership proof). Only integer operations are used, so results are
+exact for any tree size.
+"""
+
+import typing as t
+
+Sides = t.Tuple[int, int]
+"""(bitmask, length) of a path, bit 0 being the leaf level"""
+
+
+def tree_size_left(tree_size: int) -> int:
+    """Returns the size of the left subtree of a tree of `tree_size` leaves"""
+    if tree_size <= 1:
+        return 0
+    return 1 << ((tree_size - 1).bit_length() - 1)
+
+
+def index_to_sides(tree_size: int, leaf_index: int) -> Sides:
+    """Returns the path of the leaf `leaf_index` in a tree of `tree_size` leaves"""
+    sides = 0
+    length = 0
+    # from the root down, the last bit added is the leaf level (tree_size_left() is inlined)
+    while tree_size > 1:
+        size_left = 1 << ((tree_size - 1).bit_length() - 1)
+        sides <<= 1
+        if leaf_index < size_left:
+            tree_size = size_left
+        else:
+            sides |= 1
+            tree_size -= size_left
+            leaf_index -= size_left
+        length += 1
+    return sides, length
+
+
+def sides_to_index(tree_size: int, sides: int, length: int) -> int:
+    """Returns the index of the leaf reached by a path in a tree of `tree_size` leaves"""
+    leaf_index = 0
+    for level in range(length - 1, -1, -1):
+        size_left = 1 << ((tree_size - 1).bit_length() - 1) if tree_size > 1 else 0
+        if (sides >> level) & 1:
+            leaf_index += size_left
+            tree_size -= size_left
+        else:
+            tree_size = size_left
+    return leaf_index
+
+
+def path_length(tree_size: int, leaf_index: int) -> int:
+    """Returns the length of the path of the leaf `leaf_index` in a tree of `tree_size` leaves"""
+    length = 0
+    while tree_size > 1:
+        size_left = 1 << ((tree_size - 1).bit_length() - 1)
+        if leaf_index < size_left:
+            tree_size = size_left
+        else:
+            tree_size -= size_left
+            leaf_index -= size_left
+        length += 1
+    return length
+
+
+def proof_sides(membership_proof: str) -> Sides:
+    """Returns the path of an encoded membership proof ("l:<hash>,r:<hash>,...")"""
+    if not membership_proof:
+        return 0, 0
+
+    sides = 0
+    items = membership_proof.split(",")
+    for level, item in enumerate(items):
+        if item[0] == "l":
+            sides |= 1 << level
+    return sides, len(items)
+
+
+def split_sides(sides: int, length: int, upper_length: int) -> t.Tuple[Sides, Sides]:
+    """Splits a path in its `length - upper_length` lower levels and its `upper_length` upper levels"""
+    lower_length = length - upper_length
+    return (sides & ((1 << lower_length) - 1), lower_length), (sides >> lower_length, upper_length)
+
+
+def sides_to_path(sides: int, length: int) -> str:
+    """Returns the path as a string of "l"/"r" sides, from the leaf level"""
+    return "".join("l" if (sides >> level) & 1 else "r" for level in range(length))
+
+
+def path_to_sides(path: str) -> Sides:
+    """Returns the path of a string of "l"/"r" sides, from the leaf level"""
+    sides = 0
+    for level, side in enumerate(path):
+        if side == "l":
+            sides |= 1 << level
+    return sides, len(path)
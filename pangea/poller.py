@@ -0,0 +1,185 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pangea.exceptions import PangeaTimeoutError
+from pangea.response import PangeaResponse
+
+if t.TYPE_CHECKING:
+    from pangea.request import PangeaRequest
+
+logger = logging.getLogger(__name__)
+
+
+class _QueuedEntry(t.NamedTuple):
+    request_id: str
+    request: "PangeaRequest"
+    future: Future
+    attempt: int
+    expires_at: t.Optional[float]
+
+
+class QueuedRequestPoller(object):
+    """Polls the progress of queued (202) requests on a background thread.
+
+    Requests are registered with `watch()`, which returns a Future at once. The
+    poller wakes up when the earliest registered request is due, polls every due
+    request as one batch on a small thread pool and resolves the futures of the
+    completed ones. Requests still in progress are rescheduled with jittered
+    exponential backoff until their `queued_retries` limit is reached, at which
+    point the future resolves with the last 202 response (as PangeaRequest.post
+    does), or until their deadline, when the future fails with
+    PangeaTimeoutError.
+
+    A single poller is meant to be shared by all the requests of a process, see
+    `get_default_poller()`.
+    """
+
+    def __init__(self, max_workers: int = 4, max_batch: int = 64, max_delay: float = 30.0):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._queue: t.List[t.Tuple[float, int, _QueuedEntry]] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pangea-poller")
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="pangea-poller", daemon=True)
+        self._thread.start()
+
+    def watch(self, request: "PangeaRequest", request_id: str, deadline: t.Optional[float] = None) -> Future:
+        """Registers a queued request, returning a Future that resolves to its final PangeaResponse.
+
+        Args:
+            request (PangeaRequest): request object used to poll the `request/{id}` endpoint
+            request_id (str): the `request_id` of the 202 response
+            deadline (float, optional): maximum seconds to wait for the request to complete
+        """
+        future: Future = Future()
+        expires_at = None if deadline is None else time.monotonic() + deadline
+        self._schedule(_QueuedEntry(request_id, request, future, 1, expires_at))
+        return future
+
+    def pending(self) -> int:
+        """Returns the number of queued requests still being polled"""
+        with self._condition:
+            return len(self._queue)
+
+    def close(self):
+        """Stops the poller, cancelling the futures of the requests still pending"""
+        with self._condition:
+            self._closed = True
+            entries = [entry for _, _, entry in self._queue]
+            self._queue.clear()
+            self._condition.notify_all()
+
+        for entry in entries:
+            entry.future.cancel()
+
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _delay(self, attempt: int) -> float:
+        # same schedule as the blocking poll (1, 4, 9, ...), with "equal jitter" so that
+        # requests queued together do not hit the server in lockstep
+        base = min(attempt * attempt, self.max_delay)
+        return base / 2 + random.uniform(0, base / 2)
+
+    def _schedule(self, entry: _QueuedEntry):
+        due = time.monotonic() + self._delay(entry.attempt)
+
+        # fail now rather than poll past the deadline
+        if entry.expires_at is not None and due >= entry.expires_at:
+            error = PangeaTimeoutError(f"Deadline exceeded waiting for queued request {entry.request_id}")
+            _resolve(entry.future, exception=error)
+            return
+
+        with self._condition:
+            if self._closed:
+                entry.future.cancel()
+                return
+
+            heapq.heappush(self._queue, (due, next(self._counter), entry))
+            self._condition.notify()
+
+    def _next_batch(self) -> t.List[_QueuedEntry]:
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                if self._queue and self._queue[0][0] <= now:
+                    batch = []
+                    while self._queue and self._queue[0][0] <= now and len(batch) < self.max_batch:
+                        batch.append(heapq.heappop(self._queue)[2])
+                    return batch
+
+                timeout = self._queue[0][0] - now if self._queue else None
+                self._condition.wait(timeout)
+
+        return []
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            responses = self._executor.map(self._poll, batch)
+            for entry, response in zip(batch, responses):
+                if response is None:
+                    continue
+
+                if response.code == 202 and entry.attempt <= entry.request.queued_retries:
+                    self._schedule(entry._replace(attempt=entry.attempt + 1))
+                else:
+                    _resolve(entry.future, response)
+
+    def _poll(self, entry: _QueuedEntry) -> t.Optional[PangeaResponse]:
+        # the caller gave up on this request
+        if entry.future.cancelled():
+            return None
+
+        try:
+            deadline = None if entry.expires_at is None else entry.expires_at - time.monotonic()
+            return entry.request.get("request", entry.request_id, deadline=deadline)
+        except Exception as e:
+            logger.debug(f"Error polling queued request {entry.request_id}: {str(e)}")
+            _resolve(entry.future, exception=e)
+            return None
+
+
+def _resolve(future: Future, result: t.Any = None, exception: t.Optional[BaseException] = None):
+    # a future can be cancelled by its owner at any time, ignore those. The state is
+    # checked under the lock of the future, as cancel() does: before Python 3.8,
+    # set_result() overwrites a cancelled future instead of raising InvalidStateError
+    with future._condition:
+        if future.done():
+            return
+
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+
+_default_poller: t.Optional[QueuedRequestPoller] = None
+_default_poller_lock = threading.Lock()
+
+
+def get_default_poller() -> QueuedRequestPoller:
+    """Returns the process-wide QueuedRequestPoller, starting it on first use"""
+    global _default_poller
+
+    with _default_poller_lock:
+        if _default_poller is None:
+            _default_poller = QueuedRequestPoller()
+
+    return _default_poller
@@ -1,27 +1,41 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
-import json
 import logging
 import time
+import typing as t
+from concurrent.futures import Future
 
 import requests
-from requests.adapters import HTTPAdapter, Retry
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError, ReadTimeoutError
 
 import pangea
+from pangea.codec import get_codec
 from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+from pangea.poller import QueuedRequestPoller, get_default_poller
 from pangea.response import PangeaResponse
+from pangea.transport import PangeaTransport, capped_timeouts
 
 logger = logging.getLogger(__name__)
 
 
-class PangeaRequest(object):
-    """An object that makes direct calls to Pangea Service APIs.
+def deadline_expiry(deadline: t.Optional[float]) -> t.Optional[float]:
+    """Converts a deadline in seconds from now into a `time.monotonic()` expiry"""
+    return None if deadline is None else time.monotonic() + deadline
 
-    Wraps Get/Post calls to support both API requests. If `queued_retry_enabled`
-    is enabled, the progress of long running Post requests will queried until
-    completion or until the `queued_retries` limit is reached. Both values can
-    be set in PangeaConfig.
+
+def time_left(expires_at: t.Optional[float]) -> t.Optional[float]:
+    """Seconds left before a `time.monotonic()` expiry (None if there is no expiry)"""
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+class PangeaRequestBase(object):
+    """Transport-independent state and helpers shared by Pangea request objects.
+
+    Holds the service configuration, token and custom headers, and knows how
+    to build endpoint URLs and request headers. Subclasses provide the actual
+    HTTP calls.
     """
 
     def __init__(
@@ -40,6 +54,7 @@ class PangeaRequest(object):
         self.retries = config.request_retries
         self.backoff = config.request_backoff
         self.timeout = config.request_timeout
+        self.connect_timeout = config.connect_timeout
 
         # number of queued retry fetch attempts, with exponential backoff (4 -> 1 + 4 + 9 + 16  = 30 seconds of sleep)
         self.queued_retries = config.queued_retries
@@ -50,7 +65,7 @@ class PangeaRequest(object):
         # Custom headers
         self._extra_headers = {}
 
-        self.request = self._init_request()
+        self.codec = get_codec(config.json_codec)
 
     def set_extra_headers(self, headers: dict):
         """Sets any additional headers in the request.
@@ -73,7 +88,71 @@ class PangeaRequest(object):
 
         return self._queued_retry_enabled
 
-    def post(self, endpoint: str = "", data: dict = {}) -> PangeaResponse:
+    def _url(self, path: str) -> str:
+        protocol = "http://" if self.config.insecure else "https://"
+        domain = (
+            self.config.domain
+            if self.config.environment == "local"
+            else f"{self.service}.{self.config.domain}"
+        )
+
+        url = f"{protocol}{domain}/{ str(self.version) + '/' if self.version else '' }{path}"
+        return url
+
+    def _timeouts(self, expires_at: t.Optional[float]) -> t.Tuple[float, float]:
+        """Returns the (connect, read) timeouts of the next attempt, capped to the time left"""
+        return capped_timeouts((self.connect_timeout, self.timeout), expires_at)
+
+    def _queued_delay(self, request_id: str, retry_count: int, expires_at: t.Optional[float]) -> int:
+        """Returns the seconds to wait before the next progress check of a queued request"""
+        delay = retry_count * retry_count
+
+        # fail now rather than sleep past the deadline
+        left = time_left(expires_at)
+        if left is not None and delay >= left:
+            raise PangeaTimeoutError(f"Deadline exceeded waiting for queued request {request_id}")
+
+        return delay
+
+    def _headers(self) -> dict:
+        headers = {
+            "Content-Type": "application/json",
+            "User-Agent": f"Pangea Python v{pangea.__version__}",
+            "Authorization": f"Bearer {self.token}",
+        }
+
+        if self._extra_headers:
+            headers.update(self._extra_headers)
+
+        return headers
+
+
+class PangeaRequest(PangeaRequestBase):
+    """An object that makes direct calls to Pangea Service APIs.
+
+    Wraps Get/Post calls to support both API requests. If `queued_retry_enabled`
+    is enabled, the progress of long running Post requests will queried until
+    completion or until the `queued_retries` limit is reached. Both values can
+    be set in PangeaConfig.
+
+    Connections come from a PangeaTransport, which can be shared with other
+    requests objects; a private one is created if none is given.
+    """
+
+    def __init__(
+        self,
+        config: PangeaConfig,
+        token: str,
+        version: str,
+        service: str,
+        transport: t.Optional[PangeaTransport] = None,
+    ):
+        super().__init__(config, token, version, service)
+
+        self.transport = transport if transport else PangeaTransport(config)
+        self.request = self.transport.session
+
+    def post(self, endpoint: str = "", data: dict = {}, deadline: t.Optional[float] = None) -> PangeaResponse:
         """Makes the POST call to a Pangea Service endpoint.
 
         If queued_support mode is enabled, progress checks will be made for
@@ -83,36 +162,88 @@ class PangeaRequest(object):
         Args:
             endpoint(str): The Pangea Service API endpoint.
             data(dict): The POST body payload object
+            deadline(float, optional): maximum seconds for the whole call,
+                including retries and queued progress checks
+
+        Raises:
+            PangeaTimeoutError: if a timeout or the deadline is exceeded
 
         Returns:
             PangeaResponse which contains the response in its entirety and
                various properties to retrieve individual fields
         """
+        expires_at = deadline_expiry(deadline)
         url = self._url(endpoint)
 
-        requests_response = self.request.post(
-            url, headers=self._headers(), data=json.dumps(data)
-        )
+        requests_response = self._send("POST", url, expires_at, data=self.codec.dumps(data))
 
         if self._queued_retry_enabled and requests_response.status_code == 202:
-            response_json = requests_response.json()
+            response_json = self.codec.loads(requests_response.content)
             request_id = response_json.get("request_id", None)
 
             if not request_id:
                 raise Exception("Queue error: response did not include a 'request_id'")
 
-            pangea_response = self._handle_queued(request_id)
+            pangea_response = self._handle_queued(request_id, expires_at)
         else:
-            pangea_response = PangeaResponse(requests_response)
+            pangea_response = PangeaResponse(requests_response, codec=self.codec)
 
         return pangea_response
 
-    def get(self, endpoint: str, path: str) -> PangeaResponse:
+    def post_queued(
+        self,
+        endpoint: str = "",
+        data: dict = {},
+        poller: t.Optional[QueuedRequestPoller] = None,
+        deadline: t.Optional[float] = None,
+    ) -> Future:
+        """Makes the POST call to a Pangea Service endpoint without waiting for queued requests.
+
+        If the server queues the request (202), its progress is handed to a
+        shared background poller and a Future is returned at once, so the
+        calling thread is not held while the request is processed. Otherwise
+        the returned Future is already resolved.
+
+        Args:
+            endpoint(str): The Pangea Service API endpoint.
+            data(dict): The POST body payload object
+            poller(QueuedRequestPoller, optional): poller for queued requests,
+                the process-wide poller by default
+            deadline(float, optional): maximum seconds for the whole call, the
+                Future fails with PangeaTimeoutError once exceeded
+
+        Returns:
+            A concurrent.futures.Future resolving to the PangeaResponse
+        """
+        expires_at = deadline_expiry(deadline)
+        url = self._url(endpoint)
+
+        requests_response = self._send("POST", url, expires_at, data=self.codec.dumps(data))
+
+        if requests_response.status_code == 202:
+            response_json = self.codec.loads(requests_response.content)
+            request_id = response_json.get("request_id", None)
+
+            if not request_id:
+                raise Exception("Queue error: response did not include a 'request_id'")
+
+            poller = poller or get_default_poller()
+            return poller.watch(self, request_id, deadline=time_left(expires_at))
+
+        future: Future = Future()
+        future.set_result(PangeaResponse(requests_response, codec=self.codec))
+        return future
+
+    def get(self, endpoint: str, path: str, deadline: t.Optional[float] = None) -> PangeaResponse:
         """Makes the GET call to a Pangea Service endpoint.
 
         Args:
             endpoint(str): The Pangea Service API endpoint.
             path(str): Additional URL path
+            deadline(float, optional): maximum seconds for the call, including retries
+
+        Raises:
+            PangeaTimeoutError: if a timeout or the deadline is exceeded
 
         Returns:
             PangeaResponse which contains the response in its entirety and
@@ -120,59 +251,42 @@ class PangeaRequest(object):
         """
         url = self._url(f"{endpoint}/{path}")
 
-        requests_response = self.request.get(url, headers=self._headers())
+        requests_response = self._send("GET", url, deadline_expiry(deadline))
 
-        pangea_response = PangeaResponse(requests_response)
+        pangea_response = PangeaResponse(requests_response, codec=self.codec)
 
         return pangea_response
 
-    def _handle_queued(self, request_id: str) -> PangeaResponse:
+    def _send(self, method: str, url: str, expires_at: t.Optional[float], **kwargs) -> requests.Response:
+        # the transport retries failed attempts, each one with the timeouts capped to the time left
+        try:
+            return self.transport.request(
+                method,
+                url,
+                timeout=(self.connect_timeout, self.timeout),
+                expires_at=expires_at,
+                headers=self._headers(),
+                **kwargs,
+            )
+        except requests.exceptions.Timeout as e:
+            raise PangeaTimeoutError(f"Timeout on {method} {url}: {str(e)}") from e
+        except requests.exceptions.ConnectionError as e:
+            reason = getattr(e.args[0], "reason", None) if e.args else None
+            # NewConnectionError (i.e. connection refused) is a subclass of ConnectTimeoutError
+            if isinstance(reason, NewConnectionError):
+                raise
+            if isinstance(reason, (ConnectTimeoutError, ReadTimeoutError)):
+                raise PangeaTimeoutError(f"Timeout on {method} {url}: {str(e)}") from e
+            raise
+
+    def _handle_queued(self, request_id: str, expires_at: t.Optional[float] = None) -> PangeaResponse:
         retry_count = 1
 
         while True:
-            time.sleep(retry_count * retry_count)
-            pangea_response = self.get("request", request_id)
+            time.sleep(self._queued_delay(request_id, retry_count, expires_at))
+            pangea_response = self.get("request", request_id, deadline=time_left(expires_at))
 
             if pangea_response.code == 202 and retry_count <= self.queued_retries:
                 retry_count += 1
             else:
                 return pangea_response
-
-    def _init_request(self) -> requests.Session:
-        retry_config = Retry(
-            total=self.retries,
-            backoff_factor=self.backoff,
-        )
-
-        adapter = HTTPAdapter(max_retries=retry_config)
-        session = requests.Session()
-
-        if self.config.insecure:
-            session.mount("http://", adapter)
-        else:
-            session.mount("https://", adapter)
-
-        return session
-
-    def _url(self, path: str) -> str:
-        protocol = "http://" if self.config.insecure else "https://"
-        domain = (
-            self.config.domain
-            if self.config.environment == "local"
-            else f"{self.service}.{self.config.domain}"
-        )
-
-        url = f"{protocol}{domain}/{ str(self.version) + '/' if self.version else '' }{path}"
-        return url
-
-    def _headers(self) -> dict:
-        headers = {
-            "Content-Type": "application/json",
-            "User-Agent": f"Pangea Python v{pangea.__version__}",
-            "Authorization": f"Bearer {self.token}",
-        }
-
-        if self._extra_headers:
-            headers.update(self._extra_headers)
-
-        return headers
@@ -1,25 +1,69 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
+import typing as t
 
+from pangea.codec import JSONCodec, get_codec
+
+
+class _JSONList(list):
+    """A list whose dict and list items have already been wrapped"""
 
-class JSONObject(dict):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
 
-        for k, v in self.items():
-            k = k.replace(".", "_")
-            setattr(self, k, self.compute_attr_value(v))
+class JSONObject(dict):
+    """A dict whose keys can also be read as attributes.
+
+    Nested dicts and lists are wrapped on first access (by attribute, item or
+    iteration over the values) and cached back in place, so large payloads are
+    not walked or copied up front. Keys containing dots can be read as
+    attributes with the dots replaced by underscores; these aliases are not
+    added as keys, so iterating, copying or serializing the object gives the
+    keys as received.
+    """
 
     def compute_attr_value(self, value):
-        if isinstance(value, list):
-            return [self.compute_attr_value(x) for x in value]
+        if isinstance(value, (JSONObject, _JSONList)):
+            return value
+        elif isinstance(value, list):
+            return _JSONList(self.compute_attr_value(x) for x in value)
         elif isinstance(value, dict):
             return JSONObject(value)
         else:
             return value
 
+    def _wrapped(self, key):
+        value = dict.__getitem__(self, key)
+        wrapped = self.compute_attr_value(value)
+        if wrapped is not value:
+            dict.__setitem__(self, key, wrapped)
+        return wrapped
+
+    def __getitem__(self, key):
+        return self._wrapped(key)
+
+    def get(self, key, default=None):
+        return self._wrapped(key) if key in self else default
+
+    def values(self):
+        for key in self:
+            self._wrapped(key)
+        return super().values()
+
+    def items(self):
+        for key in self:
+            self._wrapped(key)
+        return super().items()
+
     def __getattr__(self, name: str):
-        return self.get(name)
+        if name in self:
+            return self._wrapped(name)
+
+        # keys with dots are available with underscores, i.e. "ip.address" as `ip_address`
+        if "_" in name:
+            for key in self:
+                if "." in key and key.replace(".", "_") == name:
+                    return self._wrapped(key)
+
+        return None
 
     def __setattr__(self, name: str, value) -> None:
         self[name] = value
@@ -28,6 +72,10 @@ class JSONObject(dict):
 class PangeaResponse(object):
     """An object containing Pangea Service API response.
 
+    The response body is kept as received and only decoded the first time one
+    of its fields is read; callers that just forward the payload can use
+    `raw_bytes` without decoding it at all.
+
     Properties:
         result (obj): "result" field of the API response as documented at:
             [https://docs.dev.pangea.cloud/docs/api/#responses](https://docs.dev.pangea.cloud/docs/api/#responses)
@@ -36,25 +84,33 @@ class PangeaResponse(object):
         success (bool): true if call was successful
         request_id (str): the ID of the request as tracked by Pangea
         response (obj): the entire API response payload
+        raw_bytes (bytes): the undecoded API response body
 
     """
 
-    _data = JSONObject()
+    _data: t.Optional[JSONObject] = None
     _raw = None
     _code = None
     _status = None
     _success = False
 
-    def __init__(self, requests_response):
+    def __init__(self, requests_response, codec: t.Optional[JSONCodec] = None):
+        self._codec = codec
         self._code = requests_response.status_code
         self._status = requests_response.reason
-        self._data = JSONObject(requests_response.json())
+        self._raw = requests_response.content
         self._success = requests_response.ok
         self._response = requests_response
 
+    def _json(self) -> JSONObject:
+        if self._data is None:
+            codec = self._codec or get_codec()
+            self._data = JSONObject(codec.loads(self._raw))
+        return self._data
+
     @property
     def result(self):
-        return self._data.result
+        return self._json().result
 
     @property
     def status(self):
@@ -70,8 +126,12 @@ class PangeaResponse(object):
 
     @property
     def request_id(self):
-        return self._data.get("request_id", None)
+        return self._json().get("request_id", None)
 
     @property
     def response(self):
         return self._response
+
+    @property
+    def raw_bytes(self) -> bytes:
+        return self._raw
@@ -0,0 +1,213 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import json
+import logging
+import threading
+import typing as t
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from pangea.config import PangeaConfig
+from pangea.transport import PangeaTransport
+
+logger = logging.getLogger("audit")
+
+
+ARWEAVE_BASE_URL = "https://arweave.net"
+
+# maximum number of results per page accepted by the Arweave GraphQL API
+_MAX_PAGE_SIZE = 100
+
+
+class ArweaveClient(object):
+    """Fetches the Audit roots published on [Arweave](https://arweave.net).
+
+    Tree sizes are looked up with GraphQL queries of at most `sizes_per_query`
+    sizes each, following the pagination cursors, and the matching transactions
+    are downloaded concurrently by up to `max_workers` threads over pooled
+    keep-alive connections. A client is safe to share across threads.
+
+    Args:
+        base_url (str): Arweave gateway.
+        max_workers (int): maximum number of concurrent requests.
+        sizes_per_query (int): maximum number of tree sizes per GraphQL query.
+        transport (PangeaTransport, optional): pooled connections to use.
+            A private one, with `max_workers` connections, is created if not given.
+
+    Examples:
+        from pangea.services.arweave import ArweaveClient
+
+        arweave = ArweaveClient(max_workers=16)
+        roots = arweave.published_roots("tree_name", [1, 2, 10])
+    """
+
+    def __init__(
+        self,
+        base_url: str = ARWEAVE_BASE_URL,
+        max_workers: int = 8,
+        sizes_per_query: int = 100,
+        transport: t.Optional[PangeaTransport] = None,
+    ):
+        if max_workers <= 0:
+            raise Exception("The 'max_workers' argument must be a positive integer > 0")
+        if sizes_per_query <= 0:
+            raise Exception("The 'sizes_per_query' argument must be a positive integer > 0")
+
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.sizes_per_query = sizes_per_query
+        self.transport = transport if transport else PangeaTransport(PangeaConfig(pool_maxsize=max_workers))
+
+    def transaction_url(self, trans_id: str) -> str:
+        return f"{self.base_url}/{trans_id}/"
+
+    def graphql_url(self) -> str:
+        return f"{self.base_url}/graphql"
+
+    def published_roots(self, tree_name: str, tree_sizes: t.Iterable[int]) -> t.Dict[int, dict]:
+        """Returns the published roots of `tree_name` for the given sizes, keyed by tree size
+
+        Roots that are not published yet, or that could not be fetched, are
+        left out (and logged).
+        """
+        tree_sizes = sorted(set(tree_sizes))
+        if not tree_sizes:
+            return {}
+
+        logger.debug(f"Querying Arweave for published roots of sizes: {', '.join(map(str, tree_sizes))}")
+
+        chunks = [tree_sizes[i : i + self.sizes_per_query] for i in range(0, len(tree_sizes), self.sizes_per_query)]
+        ans: t.Dict[int, dict] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            queries = [executor.submit(self.transactions, tree_name, chunk) for chunk in chunks]
+
+            # start downloading the transactions of a chunk as soon as it is known
+            fetches: t.Dict[int, Future] = {}
+            for query in queries:
+                for tree_size, trans_ids in query.result().items():
+                    fetches[tree_size] = executor.submit(self._fetch_root, tree_size, trans_ids)
+
+            for tree_size, fetch in fetches.items():
+                root = fetch.result()
+                if root is not None:
+                    ans[tree_size] = root
+
+        return ans
+
+    def transactions(self, tree_name: str, tree_sizes: t.List[int]) -> t.Dict[int, t.List[str]]:
+        """Returns the ids of the transactions publishing the given tree sizes, keyed by tree size"""
+        ans: t.Dict[int, t.List[str]] = {}
+        cursor: t.Optional[str] = None
+
+        while True:
+            try:
+                resp = self.transport.request(
+                    "POST",
+                    self.graphql_url(),
+                    timeout=self._timeout(),
+                    json={"query": self._query(tree_name, tree_sizes, cursor)},
+                )
+                if resp.status_code != 200:
+                    logger.error(f"Error querying Arweave: {resp.reason}")
+                    return ans
+
+                transactions = resp.json().get("data", {}).get("transactions", {})
+            except Exception as e:
+                logger.error(f"Error querying Arweave: {str(e)}")
+                return ans
+
+            edges = transactions.get("edges", [])
+            for edge in edges:
+                node = edge.get("node", {})
+                tree_size = next(
+                    (tag.get("value") for tag in node.get("tags", []) if tag.get("name") == "tree_size"), None
+                )
+                if tree_size is None or node.get("id") is None:
+                    logger.error(f"Error decoding Arweave transaction: {node}")
+                    continue
+
+                ans.setdefault(int(tree_size), []).append(node["id"])
+
+            cursor = edges[-1].get("cursor") if edges else None
+            if not cursor or not transactions.get("pageInfo", {}).get("hasNextPage"):
+                return ans
+
+    def close(self):
+        """Closes the pooled connections"""
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _fetch_root(self, tree_size: int, trans_ids: t.List[str]) -> t.Optional[dict]:
+        # a root may have been published more than once, the first valid one is used
+        for trans_id in trans_ids:
+            try:
+                resp = self.transport.request("GET", self.transaction_url(trans_id), timeout=self._timeout())
+                if resp.status_code != 200:
+                    logger.error(f"Error fetching published root for size {tree_size}: {resp.reason}")
+                elif resp.text == "Pending":
+                    logger.warning(f"Published root for size {tree_size} is pending")
+                else:
+                    return json.loads(resp.text)
+            except Exception as e:
+                logger.error(f"Error decoding published root for size {tree_size}: {str(e)}")
+
+        return None
+
+    def _query(self, tree_name: str, tree_sizes: t.List[int], cursor: t.Optional[str]) -> str:
+        after = f", after: {json.dumps(cursor)}" if cursor else ""
+        values = ", ".join(f'"{tree_size}"' for tree_size in tree_sizes)
+        return f"""
+        {{
+            transactions(
+                first: {_MAX_PAGE_SIZE}{after}
+                tags: [
+                    {{
+                        name: "tree_size"
+                        values: [{values}]
+                    }},
+                    {{
+                        name: "tree_name"
+                        values: [{json.dumps(tree_name)}]
+                    }}
+                ]
+            ) {{
+                pageInfo {{
+                    hasNextPage
+                }}
+                edges {{
+                    cursor
+                    node {{
+                        id
+                        tags {{
+                            name
+                            value
+                        }}
+                    }}
+                }}
+            }}
+        }}
+        """
+
+    def _timeout(self) -> t.Tuple[int, int]:
+        config = self.transport.config
+        return (config.connect_timeout, config.request_timeout)
+
+
+_default_client: t.Optional[ArweaveClient] = None
+_default_lock = threading.Lock()
+
+
+def default_arweave_client() -> ArweaveClient:
+    """Returns the client shared by `get_arweave_published_roots` and the Audit clients"""
+    global _default_client
+
+    with _default_lock:
+        if _default_client is None:
+            _default_client = ArweaveClient()
+        return _default_client
@@ -2,28 +2,34 @@
 # Author: Pangea Cyber Corporation
 import os
 import json
+import threading
 import typing as t
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from typing import List, Dict, Optional
+from pangea.request import deadline_expiry, time_left
 from pangea.response import JSONObject, PangeaResponse
-from pangea.signing import Signing
+from pangea.signing import Signing, SignedItem, verify_message, verify_messages
 
 from .audit_util import (
-    decode_consistency_proof,
+    decode_compact_consistency_proof,
     encode_hash,
     decode_hash,
     hash_dict,
     b64encode_ascii,
     b64decode,
-    decode_membership_proof,
+    decode_compact_membership_proof,
     get_arweave_published_roots,
     verify_consistency_proof,
     verify_membership_proof,
+    verify_membership_proofs,
     verify_hash,
     decode_buffer_root,
     get_root_filename
 )
 from .base import ServiceBase
+from .root_store import RootStore, default_root_store
 
 SupportedFields = [
     "actor",
@@ -71,30 +77,76 @@ class Audit(ServiceBase):
     version: str = "v1"
     config_id_header: str = "X-Pangea-Audit-Config-ID"
 
-    def __init__(self, token, config=None, **kwargs):
-        super().__init__(token, config)
+    def __init__(self, token, config=None, transport=None, **kwargs):
+        super().__init__(token, config, transport=transport)
 
+        # published roots are also kept in a store shared with other clients/processes
         self.pub_roots: dict = {}
+        self.root_store: RootStore = kwargs.get("root_store") or default_root_store()
         self.buffer_data: Optional[str] = None
         self.root_id_filename: str = get_root_filename()
 
         # TODO: Document signing options
         self.verify_response: bool = kwargs.get("verify_response", False)
-        self.enable_signing: bool = kwargs.get("enable_signing", False)
-
-        if self.enable_signing:
+        # a `signer` (i.e. Signing with in memory keys) enables signing, with its own keys and settings
+        signer: t.Optional[Signing] = kwargs.get("signer")
+        self.enable_signing: bool = kwargs.get("enable_signing", signer is not None)
+        # the signer and the verification of signatures must agree on hashing the messages
+        hash_message: t.Optional[bool] = kwargs.get("hash_message")
+        if signer is not None and signer.hash_message is not None:
+            if hash_message is not None and hash_message != signer.hash_message:
+                raise Exception("The 'hash_message' argument does not match the one of the signer")
+            hash_message = signer.hash_message
+        self.hash_message: bool = True if hash_message is None else hash_message
+        # threads signing a batch of events or verifying the signatures of a page of results
+        self.signature_workers: int = kwargs.get("signature_workers", min(4, os.cpu_count() or 1))
+        # their pool, created on first use and reused by the later calls
+        self._signature_executor: t.Optional[ThreadPoolExecutor] = None
+        self._signature_lock = threading.Lock()
+
+        if signer is not None:
+            if signer.hash_message is None:
+                signer.hash_message = self.hash_message
+            self.sign = signer
+        elif self.enable_signing:
             overwrite_keys_if_exists = kwargs.get("overwrite_keys_if_exists", False)
-            hash_message = kwargs.get("hash_message", True)
 
             self.sign = Signing(
                 overwrite_keys_if_exists=overwrite_keys_if_exists,
-                hash_message=hash_message,
+                hash_message=self.hash_message,
             )
 
         # In case of Arweave failure, ask the server for the roots
         self.allow_server_roots = True
 
-    def log(self, event: dict, verify: bool = False, signing: bool = False, verbose: bool = False) -> PangeaResponse:
+    def close(self):
+        """Shuts down the threads signing and verifying the signatures of events"""
+        with self._signature_lock:
+            executor, self._signature_executor = self._signature_executor, None
+
+        if executor is not None:
+            executor.shutdown()
+
+    def _signature_pool(self) -> t.Optional[ThreadPoolExecutor]:
+        """Returns the pool of `signature_workers` threads, or None if there is a single worker"""
+        if self.signature_workers <= 1:
+            return None
+
+        with self._signature_lock:
+            if self._signature_executor is None:
+                self._signature_executor = ThreadPoolExecutor(
+                    max_workers=self.signature_workers, thread_name_prefix="pangea-audit-signatures"
+                )
+            return self._signature_executor
+
+    def log(
+        self,
+        event: dict,
+        verify: bool = False,
+        signing: bool = False,
+        verbose: bool = False,
+        deadline: t.Optional[float] = None,
+    ) -> PangeaResponse:
         """
         Log an entry
 
@@ -105,6 +157,7 @@ class Audit(ServiceBase):
             verify (bool, optional):
             signing (bool, optional):
             verbose (bool, optional):
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse where the hash of event data and optional verbose
@@ -140,41 +193,124 @@ class Audit(ServiceBase):
             \"\"\"
         """
 
-        endpoint_name = "log"
+        expires_at = deadline_expiry(deadline)
+        data, prev_buffer_root = self._prepare_log(event, verify=verify, signing=signing, verbose=verbose)
+        response = self.request.post("log", data=data, deadline=deadline)
+
+        return self.handle_log_response(
+            response, verify=verify, prev_buffer_root_enc=prev_buffer_root, deadline=time_left(expires_at)
+        )
+
+    def log_bulk(
+        self, events: t.List[dict], signing: bool = False, verbose: bool = False, deadline: t.Optional[float] = None
+    ) -> PangeaResponse:
+        """
+        Log multiple entries
+
+        Create several log entries in the Secure Audit Log with a single request.
+
+        Args:
+            events (list[dict]): A list of structured dicts describing auditable activities.
+            signing (bool, optional): Sign each event with the configured keys.
+            verbose (bool, optional): Return the full events in the results.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+
+        Returns:
+            A PangeaResponse where the per-event results (hash and optional verbose
+                fields) are returned in the response.result.results field, in the
+                same order as `events`.
+
+        Examples:
+            response = audit.log_bulk([{"message": "first"}, {"message": "second"}])
+
+            for event_result in response.result.results:
+                print(event_result.hash)
+        """
+        data = self._prepare_log_bulk(events, signing=signing, verbose=verbose)
+        response = self.request.post("log", data=data, deadline=deadline)
+
+        return self.handle_log_bulk_response(response, len(events))
 
+    def handle_log_bulk_response(self, response: PangeaResponse, count: int) -> PangeaResponse:
+        if response.success:
+            results = response.result.get("results") or []
+            if len(results) != count:
+                raise Exception(f"Error: expected {count} results, got {len(results)}")
+
+        return response
+
+    def _prepare_log_bulk(self, events: t.List[dict], signing: bool, verbose: bool) -> t.Dict[str, t.Any]:
+        """Builds the `log` request payload for several events"""
+        if not events:
+            raise Exception("Error: no `events` provided")
+
+        records = [self._log_record(event, signing=signing) for event in events]
+        if signing:
+            self._sign_records(records)
+        return self._log_bulk_payload(records, verbose=verbose)
+
+    def _log_bulk_payload(self, records: t.List[t.Dict[str, t.Any]], verbose: bool) -> t.Dict[str, t.Any]:
+        data: t.Dict[str, t.Any] = {"events": records, "return_hash": True}
+
+        if verbose:
+            data["verbose"] = True
+
+        return data
+
+    def _process_log_event(self, event: dict, signing: bool) -> t.Dict[str, t.Any]:
+        """Builds the log record of a single event: the event fields plus the optional signature"""
+        record = self._log_record(event, signing=signing)
+        if signing:
+            self._sign_records([record])
+        return record
+
+    def _log_record(self, event: dict, signing: bool) -> t.Dict[str, t.Any]:
+        """Builds the log record of a single event, to be signed by _sign_records() if `signing` is set"""
         if signing and not self.enable_signing:
             raise Exception("Error: the `signing` parameter set, but `enable_signing` is not set to True")
 
-        data: t.Dict[str, t.Any] = {"event": {}, "return_hash": True}
+        record: t.Dict[str, t.Any] = {"event": {}}
 
         for name in SupportedFields:
             if name in event:
-                data["event"][name] = event[name]
+                record["event"][name] = event[name]
 
         for name in SupportedJSONFields:
             if name in event:
                 if isinstance(event[name], dict):
-                    data["event"][name] = json.dumps(event[name])
+                    record["event"][name] = json.dumps(event[name])
                 else:
-                    data["event"][name] = event[name]
+                    record["event"][name] = event[name]
 
-        if "message" not in data["event"]:
+        if "message" not in record["event"]:
             raise Exception(f"Error: missing required field, no `message` provided")
 
-        if verbose:
-            data["verbose"] = True
+        return record
 
-        if signing:
-            sign_envelope = self.create_signed_envelope(data["event"])
-            signature = self.sign.signMessage(sign_envelope)
-            if signature is not None:
-                data["signature"] = signature
-            else:
+    def _sign_records(self, records: t.List[t.Dict[str, t.Any]]):
+        """Signs log records built by _log_record(), on `signature_workers` threads"""
+        sign_envelopes = [self.create_signed_envelope(record["event"]) for record in records]
+        signatures = self.sign.sign_many(
+            sign_envelopes, workers=self.signature_workers, executor=self._signature_pool()
+        )
+        public_key = b64encode_ascii(self.sign.getPublicKeyBytes())
 
+        for record, signature in zip(records, signatures):
+            if signature is None:
                 raise Exception("Error: failure signing message")
 
-            public_bytes = self.sign.getPublicKeyBytes()
-            data["public_key"] = b64encode_ascii(public_bytes)
+            record["signature"] = signature
+            record["public_key"] = public_key
+
+    def _prepare_log(
+        self, event: dict, verify: bool, signing: bool, verbose: bool
+    ) -> t.Tuple[t.Dict[str, t.Any], t.Optional[str]]:
+        """Builds the `log` request payload, returning it along with the previous buffer root (if any)"""
+        data: t.Dict[str, t.Any] = self._process_log_event(event, signing=signing)
+        data["return_hash"] = True
+
+        if verbose:
+            data["verbose"] = True
 
         prev_buffer_root = None
         if verify:
@@ -194,67 +330,88 @@ class Audit(ServiceBase):
                 if return_commit_proofs:
                     data["return_commit_proofs"] = return_commit_proofs
 
-        response = self.request.post(endpoint_name, data=data)
-
-        return self.handle_log_response(response, verify=verify, prev_buffer_root_enc=prev_buffer_root)
+        return data, prev_buffer_root
 
-    def handle_log_response(self, response: PangeaResponse, verify: bool, prev_buffer_root_enc: bytes):
+    def handle_log_response(
+        self,
+        response: PangeaResponse,
+        verify: bool,
+        prev_buffer_root_enc: bytes,
+        deadline: t.Optional[float] = None,
+    ):
         if not response.success:
             return response
 
         if verify:
-            new_buffer_root_enc = response.result.get("buffer_root")
-            membership_proof_enc = response.result.get("buffer_membership_proof")
-            consistency_proof_enc = response.result.get("buffer_consistency_proof")
-            commit_proofs = response.result.get("buffer_commit_proofs")
-            event = response.result.get("event")
-            event_hash_enc = response.result.get("hash")
-
-            new_buffer_root = decode_buffer_root(new_buffer_root_enc)
-            event_hash = decode_hash(event_hash_enc)
-            membership_proof = decode_membership_proof(membership_proof_enc)
-            pending_roots = []
-
-            # verify event hash
-            if not verify_hash(hash_dict(event), event_hash):
-                raise Exception(f"Error: Event hash failed.")
-
-            # verify membership proofs
-            if not verify_membership_proof(node_hash=event_hash, root_hash=new_buffer_root.root_hash, proof=membership_proof):
-                raise Exception(f"Error: Membership proof failed.")
-
-            # verify consistency proofs (following events)
-            if consistency_proof_enc:
-                prev_buffer_root = decode_buffer_root(prev_buffer_root_enc)
-                consistency_proof = decode_consistency_proof(consistency_proof_enc)
-
-                if not verify_consistency_proof(new_root=new_buffer_root.root_hash, prev_root=prev_buffer_root.root_hash, proof=consistency_proof):
-                    raise Exception(f"Error: Consistency proof failed.")
+            new_buffer_root_enc, commit_proofs = self._verify_log_proofs(response, prev_buffer_root_enc)
+            pending_roots: t.List[str] = []
 
             if commit_proofs:
                 # Get the root from the cold tree...
-                root_response = self.root()
+                root_response = self.root(deadline=deadline)
                 if not root_response.success:
                     return root_response
 
-                cold_root_hash_enc = root_response.result.data.get("root_hash")
-                if cold_root_hash_enc:
-                    cold_root_hash = decode_hash(cold_root_hash_enc)
-
-                    for buffer_root_enc, commit_proof_enc in commit_proofs.items():
-                        if commit_proof_enc is None:
-                            pending_roots.append(buffer_root_enc)
-                        else:
-                            buffer_root = decode_buffer_root(buffer_root_enc)
-                            commit_proof = decode_consistency_proof(commit_proof_enc)
-
-                            if not verify_consistency_proof(new_root=cold_root_hash, prev_root=buffer_root.root_hash, proof=commit_proof):
-                                raise Exception(f"Error: Consistency proof failed.")
+                pending_roots = self._verify_commit_proofs(root_response, commit_proofs)
 
             self.set_buffer_data(last_root_enc=new_buffer_root_enc, pending_roots=pending_roots)
 
         return response
 
+    def _verify_log_proofs(self, response: PangeaResponse, prev_buffer_root_enc: bytes) -> t.Tuple[str, dict]:
+        """Verifies the hash, membership and consistency proofs of a `log` response
+
+        Returns the new buffer root and the commit proofs still to be checked against the cold tree.
+        """
+        new_buffer_root_enc = response.result.get("buffer_root")
+        membership_proof_enc = response.result.get("buffer_membership_proof")
+        consistency_proof_enc = response.result.get("buffer_consistency_proof")
+        commit_proofs = response.result.get("buffer_commit_proofs")
+        event = response.result.get("event")
+        event_hash_enc = response.result.get("hash")
+
+        new_buffer_root = decode_buffer_root(new_buffer_root_enc)
+        event_hash = decode_hash(event_hash_enc)
+        membership_proof = decode_compact_membership_proof(membership_proof_enc)
+
+        # verify event hash
+        if not verify_hash(hash_dict(event, self.request.codec), event_hash):
+            raise Exception(f"Error: Event hash failed.")
+
+        # verify membership proofs
+        if not verify_membership_proof(node_hash=event_hash, root_hash=new_buffer_root.root_hash, proof=membership_proof):
+            raise Exception(f"Error: Membership proof failed.")
+
+        # verify consistency proofs (following events)
+        if consistency_proof_enc:
+            prev_buffer_root = decode_buffer_root(prev_buffer_root_enc)
+            consistency_proof = decode_compact_consistency_proof(consistency_proof_enc)
+
+            if not verify_consistency_proof(new_root=new_buffer_root.root_hash, prev_root=prev_buffer_root.root_hash, proof=consistency_proof):
+                raise Exception(f"Error: Consistency proof failed.")
+
+        return new_buffer_root_enc, commit_proofs
+
+    def _verify_commit_proofs(self, root_response: PangeaResponse, commit_proofs: dict) -> t.List[str]:
+        """Verifies buffer commit proofs against the cold tree root, returning the roots still pending"""
+        pending_roots = []
+
+        cold_root_hash_enc = root_response.result.data.get("root_hash")
+        if cold_root_hash_enc:
+            cold_root_hash = decode_hash(cold_root_hash_enc)
+
+            for buffer_root_enc, commit_proof_enc in commit_proofs.items():
+                if commit_proof_enc is None:
+                    pending_roots.append(buffer_root_enc)
+                else:
+                    buffer_root = decode_buffer_root(buffer_root_enc)
+                    commit_proof = decode_compact_consistency_proof(commit_proof_enc)
+
+                    if not verify_consistency_proof(new_root=cold_root_hash, prev_root=buffer_root.root_hash, proof=commit_proof):
+                        raise Exception(f"Error: Consistency proof failed.")
+
+        return pending_roots
+
     def search(
         self,
         query: str = "",
@@ -267,6 +424,7 @@ class Audit(ServiceBase):
         order_by: str = "",
         verify: bool = False,
         verify_signatures: bool = False,
+        deadline: t.Optional[float] = None,
     ) -> PangeaResponse:
         """
         Search for events
@@ -294,7 +452,10 @@ class Audit(ServiceBase):
             verify (bool, optional): If set, the consistency and membership proofs are validated for all
                 events returned by `search` and `results`. The fields `consistency_proof_verification` and
                 `membership_proof_verification` are added to each event, with the value `pass`, `fail` or `none`.
-            verify_signatures (bool, optional):
+            verify_signatures (bool, optional): If set, the signatures of all events are verified, the field
+                `signature_verification` is added to each event with the value `pass`, `fail` or `none` (not
+                signed), and an exception is raised if any event fails.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse where the first page of matched events is returned in the
@@ -345,8 +506,38 @@ class Audit(ServiceBase):
             \"\"\"
         """
 
-        endpoint_name = "search"
+        data = self._prepare_search(
+            query=query,
+            restriction=restriction,
+            limit=limit,
+            max_results=max_results,
+            start=start,
+            end=end,
+            order=order,
+            order_by=order_by,
+            verify=verify,
+        )
+        expires_at = deadline_expiry(deadline)
+        response = self.request.post("search", data=data, deadline=deadline)
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return self.handle_search_response(response, deadline=time_left(expires_at))
 
+    def _prepare_search(
+        self,
+        query: str,
+        restriction: dict,
+        limit: int,
+        max_results: t.Optional[int],
+        start: str,
+        end: str,
+        order: str,
+        order_by: str,
+        verify: bool,
+    ) -> t.Dict[str, t.Any]:
+        """Builds the `search` request payload"""
         if not (isinstance(limit, int) and limit > 0):
             raise Exception("The 'limit' argument must be a positive integer > 0")
 
@@ -379,16 +570,16 @@ class Audit(ServiceBase):
         if max_results:
             data["max_results"] = max_results
 
-        response = self.request.post(endpoint_name, data=data)
+        return data
 
-        if verify_signatures:
-            for audit_envelope in response.result.events:
-                if not self.verify_signature(audit_envelope):
-                    raise Exception("signature failed")
-
-        return self.handle_search_response(response)
-
-    def results(self, id: str, limit: int = 20, offset: int = 0, verify_signatures: bool = False):
+    def results(
+        self,
+        id: str,
+        limit: int = 20,
+        offset: int = 0,
+        verify_signatures: bool = False,
+        deadline: t.Optional[float] = None,
+    ):
         """
         Results of a Search
 
@@ -399,11 +590,191 @@ class Audit(ServiceBase):
             limit (integer, optional): the maximum number of results to return, default is 20
             offset (integer, optional): the position of the first result to return, default is 0
             verify_signatures (bool, optional):
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+
+        """
+
+        expires_at = deadline_expiry(deadline)
+        data = self._prepare_results(id, limit=limit, offset=offset)
+        response = self.request.post("results", data=data, deadline=deadline)
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return self.handle_search_response(response, deadline=time_left(expires_at))
+
+    def search_iter(
+        self,
+        query: str = "",
+        restriction: dict = {},
+        page_size: int = 100,
+        max_results: t.Optional[int] = None,
+        start: str = "",
+        end: str = "",
+        order: str = "",
+        order_by: str = "",
+        verify: bool = False,
+        verify_signatures: bool = False,
+        prefetch: int = 2,
+        max_buffered_events: t.Optional[int] = None,
+    ) -> t.Iterator[JSONObject]:
+        """
+        Iterate over search results
+
+        Searches for events like `search` and yields them one by one, across all the
+        result pages. While the caller processes a page, the following `prefetch`
+        pages are fetched in the background.
+
+        Args:
+            query, restriction, max_results, start, end, order, order_by, verify, verify_signatures:
+                as in `search`
+            page_size (int, optional): Number of events fetched per request. Default is 100.
+            prefetch (int, optional): Number of pages fetched ahead, in parallel. 0 fetches
+                them one at a time when needed. Default is 2.
+            max_buffered_events (int, optional): Maximum number of events fetched ahead of the
+                caller, limits `prefetch` to keep memory bounded. Default is no limit.
+
+        Raises:
+            Exception: if a page cannot be fetched or fails signature verification
+
+        Examples:
+            for event in audit.search_iter("message:login", start="2022-10-01T00:00:00Z", page_size=1000):
+                print(event.envelope.event.actor)
+        """
+        if not (isinstance(prefetch, int) and prefetch >= 0):
+            raise Exception("The 'prefetch' argument must be a positive integer")
+
+        response = self.search(
+            query=query,
+            restriction=restriction,
+            limit=page_size,
+            max_results=max_results,
+            start=start,
+            end=end,
+            order=order,
+            order_by=order_by,
+            verify=verify,
+            verify_signatures=verify_signatures,
+        )
+        if not response.success:
+            raise Exception(f"Pangea Audit error: {response.response.text}")
+
+        result = response.result
+        yield from result.events
+
+        window = prefetch
+        if max_buffered_events is not None:
+            window = min(window, max(1, max_buffered_events // page_size))
+
+        offsets = range(len(result.events), result.count, page_size)
+        for page in self._results_pages(result.id, page_size, offsets, window, window, verify_signatures):
+            yield from page.result.events
+
+    def results_all(
+        self,
+        id: str,
+        count: int,
+        concurrency: int = 4,
+        limit: int = 100,
+        offset: int = 0,
+        verify_signatures: bool = False,
+        max_buffered_pages: t.Optional[int] = None,
+    ) -> t.Iterator[PangeaResponse]:
+        """
+        Results of a Search, all pages
+
+        Fetches the result pages of a previous Search from `offset` up to `count`,
+        `concurrency` pages at a time, and yields them in order. Pages that arrive
+        early wait in a reordering buffer of up to `max_buffered_pages` pages.
+
+        Args:
+            id (string, required): the id of a search action, found in `response.result.id`
+            count (int, required): the number of results, found in `response.result.count`
+            concurrency (int, optional): number of pages fetched in parallel, default is 4
+            limit (int, optional): the number of results per page, default is 100
+            offset (int, optional): the position of the first result to return, default is 0
+            verify_signatures (bool, optional):
+            max_buffered_pages (int, optional): pages fetched ahead of the one being
+                yielded, besides the ones in flight. Default is `concurrency`.
+
+        Raises:
+            Exception: if a page cannot be fetched or fails signature verification
 
+        Examples:
+            response = audit.search("message:login", limit=1000)
+
+            for page in audit.results_all(response.result.id, response.result.count, offset=1000, limit=1000):
+                for event in page.result.events:
+                    print(event.envelope.event.message)
         """
+        if not (isinstance(concurrency, int) and concurrency > 0):
+            raise Exception("The 'concurrency' argument must be a positive integer > 0")
+
+        if max_buffered_pages is None:
+            max_buffered_pages = concurrency
 
-        endpoint_name = "results"
+        offsets = range(offset, count, limit)
+        return self._results_pages(id, limit, offsets, concurrency, concurrency + max_buffered_pages, verify_signatures)
 
+    def _results_pages(
+        self,
+        id: str,
+        limit: int,
+        offsets: t.Iterable[int],
+        workers: int,
+        window: int,
+        verify_signatures: bool,
+    ) -> t.Iterator[PangeaResponse]:
+        """Yields the `results` pages at `offsets` in order.
+
+        Up to `window` pages are requested ahead on `workers` threads; the pending
+        futures, in offset order, act as the reordering buffer.
+        """
+        offsets = iter(offsets)
+
+        if window == 0:
+            for offset in offsets:
+                yield self._checked_results_page(self._fetch_results(id, limit, offset), verify_signatures)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pangea-audit-results")
+        pending: t.Deque[Future] = deque()
+        try:
+            for offset in offsets:
+                pending.append(executor.submit(self._fetch_results, id, limit, offset))
+                if len(pending) >= window:
+                    break
+
+            while pending:
+                response = pending.popleft().result()
+
+                offset = next(offsets, None)
+                if offset is not None:
+                    pending.append(executor.submit(self._fetch_results, id, limit, offset))
+
+                yield self._checked_results_page(response, verify_signatures)
+        finally:
+            # the caller may stop iterating early
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _fetch_results(self, id: str, limit: int, offset: int) -> PangeaResponse:
+        data = self._prepare_results(id, limit=limit, offset=offset)
+        return self.request.post("results", data=data)
+
+    def _checked_results_page(self, response: PangeaResponse, verify_signatures: bool) -> PangeaResponse:
+        # verification runs in the caller's thread, it updates the published roots
+        if not response.success:
+            raise Exception(f"Pangea Audit error: {response.response.text}")
+
+        if verify_signatures:
+            self._verify_signatures(response)
+
+        return self.handle_search_response(response)
+
+    def _prepare_results(self, id: str, limit: int, offset: int) -> t.Dict[str, t.Any]:
+        """Builds the `results` request payload"""
         if not id:
             raise Exception("An 'id' parameter is required")
 
@@ -413,65 +784,89 @@ class Audit(ServiceBase):
         if not (isinstance(offset, int) and offset >= 0):
             raise Exception("The 'offset' argument must be a positive integer")
 
-        data = {
+        return {
             "id": id,
             "limit": limit,
             "offset": offset,
         }
 
-        response = self.request.post(endpoint_name, data=data)
-
-        if verify_signatures:
-            for audit_envelope in response.result.events:
-                if not self.verify_signature(audit_envelope):
-                    raise Exception("signature failed")
-
-        return self.handle_search_response(response)
+    def _verify_signatures(self, response: PangeaResponse):
+        """
+        Verifies the signatures of all the events of a page, on `signature_workers` threads,
+        setting their `signature_verification` to `pass`, `fail` or `none` (not signed).
+        Raises an exception if any signature fails; events that are not signed do not.
+        """
+        events = response.result.events
+        signed = [audit for audit in events if audit.envelope.signature]
+        items = [self._signed_item(audit) for audit in signed]
+        results = verify_messages(
+            items, hash_message=self.hash_message, workers=self.signature_workers, executor=self._signature_pool()
+        )
+
+        for audit in events:
+            audit.envelope.signature_verification = "none"
+        for audit, ok in zip(signed, results):
+            audit.envelope.signature_verification = "pass" if ok else "fail"
+
+        failed = results.count(False)
+        if failed:
+            raise Exception(f"signature failed for {failed} of {len(events)} event(s)")
+
+    def _signed_item(self, audit_envelope: JSONObject) -> SignedItem:
+        """Returns the (signature, signed envelope, public key) of a signed event"""
+        try:
+            public_key_bytes = b64decode(audit_envelope.envelope.public_key) or b""
+        except ValueError:
+            # not base64, the verification fails
+            public_key_bytes = b""
+        sign_envelope = self.create_signed_envelope(audit_envelope.envelope.event)
+        return audit_envelope.envelope.signature, sign_envelope, public_key_bytes
 
-    def handle_search_response(self, response: PangeaResponse):
-        if not response.success:
+    def handle_search_response(self, response: PangeaResponse, deadline: t.Optional[float] = None):
+        if not response.success or not self.verify_response:
             return response
 
-        root = response.result.root
-
-        if self.verify_response:
-            # if there is no root, we don't have any record migrated to cold. We cannot verify any proof
-            if not root:
-                response.result.root = {}
+        # if there is no root, we don't have any record migrated to cold. We cannot verify any proof
+        if not response.result.root:
+            self._set_unverified(response)
+            return response
 
-                # set verification flags for all events to `none`
-                for audit in response.result.events:
-                    audit.envelope.membership_verification = "none"
-                    audit.envelope.consistency_verification = "none"
+        self.update_published_roots(self.pub_roots, response.result, deadline=deadline)
+        self._verify_search_events(response)
 
-                return response
+        return response
 
-            self.update_published_roots(self.pub_roots, response.result)
+    def _set_unverified(self, response: PangeaResponse):
+        response.result.root = {}
 
-            for audit in response.result.events:
-                # verify membership proofs
-                membership_verification = "none"
-                if self.can_verify_membership_proof(audit):
-                    if self.verify_membership_proof(response.result.root, audit):
-                        membership_verification = "pass"
-                    else:
-                        membership_verification = "fail"
+        # set verification flags for all events to `none`
+        for audit in response.result.events:
+            audit.envelope.membership_verification = "none"
+            audit.envelope.consistency_verification = "none"
 
-                audit.envelope.membership_verification = membership_verification
+    def _verify_search_events(self, response: PangeaResponse):
+        events = response.result.events
+        memberships = self._verify_membership_proofs(response.result.root, events)
 
-                # verify consistency proofs
-                consistency_verification = "none"
-                if self.can_verify_consistency_proof(audit):
-                    if self.verify_consistency_proof(self.pub_roots, audit):
-                        consistency_verification = "pass"
-                    else:
-                        consistency_verification = "fail"
+        for audit, membership_verification in zip(events, memberships):
+            audit.envelope.membership_verification = membership_verification
 
-                audit.envelope.consistency_verification = consistency_verification
+            # verify consistency proofs
+            consistency_verification = "none"
+            if self.can_verify_consistency_proof(audit):
+                if self.verify_consistency_proof(self.pub_roots, audit):
+                    consistency_verification = "pass"
+                else:
+                    consistency_verification = "fail"
 
-        return response
+            audit.envelope.consistency_verification = consistency_verification
 
-    def update_published_roots(self, pub_roots: t.Dict[int, t.Optional[JSONObject]], result: JSONObject):
+    def update_published_roots(
+        self,
+        pub_roots: t.Dict[int, t.Optional[JSONObject]],
+        result: JSONObject,
+        deadline: t.Optional[float] = None,
+    ):
         """Fetches series of published root hashes from Arweave
 
         This is used for subsequent calls to verify_consistency_proof(). Root hashes
@@ -480,21 +875,13 @@ class Audit(ServiceBase):
         Args:
             pub_roots (dict): series of published root hashes.
             result (obj): PangeaResponse object from previous call to audit.search()
+            deadline (float, optional): maximum seconds for the root requests made to the server
         """
-        tree_sizes = set()
-        for audit in result.events:
-            leaf_index = audit.get("leaf_index")
-            if leaf_index is not None:
-                tree_sizes.add(leaf_index + 1)
-                if leaf_index > 0:
-                    tree_sizes.add(leaf_index)
-
-        if result.root:
-            tree_sizes.add(result.root.size)
-
-        tree_sizes.difference_update(pub_roots.keys())
+        expires_at = deadline_expiry(deadline)
+        tree_name = result.root.tree_name
+        tree_sizes = self._load_stored_roots(pub_roots, tree_name, self._missing_tree_sizes(pub_roots, result))
         if tree_sizes:
-            arweave_roots = get_arweave_published_roots(result.root.tree_name, list(tree_sizes))  # + [result.count])
+            arweave_roots = get_arweave_published_roots(tree_name, list(tree_sizes))  # + [result.count])
         else:
             arweave_roots = {}
 
@@ -505,12 +892,81 @@ class Audit(ServiceBase):
                 pub_root = JSONObject(arweave_roots[tree_size])
                 pub_root.source = "arweave"
             elif self.allow_server_roots:
-                resp = self.root(tree_size)
+                resp = self.root(tree_size, deadline=time_left(expires_at))
                 if resp.success:
                     pub_root = resp.result.data
                     pub_root.source = "pangea"
             pub_roots[tree_size] = pub_root
 
+        self._save_roots(pub_roots, tree_name, tree_sizes)
+
+    def _load_stored_roots(
+        self, pub_roots: t.Dict[int, t.Optional[JSONObject]], tree_name: str, tree_sizes: t.Set[int]
+    ) -> t.Set[int]:
+        """Fills `pub_roots` from the root store and returns the tree sizes still missing"""
+        if not tree_sizes:
+            return tree_sizes
+
+        for tree_size, root in self.root_store.get_many(tree_name, tree_sizes).items():
+            # roots given by the server are only usable if allowed
+            if root.get("source") == "arweave" or self.allow_server_roots:
+                pub_roots[tree_size] = JSONObject(root)
+
+        return tree_sizes.difference(pub_roots.keys())
+
+    def _save_roots(self, pub_roots: t.Dict[int, t.Optional[JSONObject]], tree_name: str, tree_sizes: t.Set[int]):
+        """Adds the roots just fetched to the root store (pending/unavailable ones are not stored)"""
+        roots = {tree_size: pub_roots[tree_size] for tree_size in tree_sizes if pub_roots.get(tree_size)}
+        self.root_store.put_many(tree_name, roots)
+
+    def _missing_tree_sizes(self, pub_roots: t.Dict[int, t.Optional[JSONObject]], result: JSONObject) -> t.Set[int]:
+        """Returns the tree sizes needed to verify the `result` events that are not in `pub_roots` yet"""
+        tree_sizes = set()
+        for audit in result.events:
+            leaf_index = audit.get("leaf_index")
+            if leaf_index is not None:
+                tree_sizes.add(leaf_index + 1)
+                if leaf_index > 0:
+                    tree_sizes.add(leaf_index)
+
+        if result.root:
+            tree_sizes.add(result.root.size)
+
+        tree_sizes.difference_update(pub_roots.keys())
+        return tree_sizes
+
+    def _verify_membership_proofs(self, root: JSONObject, events: t.List[JSONObject]) -> t.List[str]:
+        """Verifies the membership proofs of all the events of a page against the same root, in a batch
+
+        Returns the `membership_verification` value of each event, as verify_membership_proof() would
+        """
+        verifications = ["none"] * len(events)
+        indexes = [i for i, event in enumerate(events) if self.can_verify_membership_proof(event)]
+        if not indexes:
+            return verifications
+
+        if not self.allow_server_roots and root.source != "arweave":
+            for i in indexes:
+                verifications[i] = "fail"
+            return verifications
+
+        # a malformed hash or proof fails its own event only
+        decoded = []
+        proofs = []
+        for i in indexes:
+            try:
+                proof = decode_compact_membership_proof(events[i].membership_proof)
+                proofs.append((decode_hash(events[i].hash), proof))
+                decoded.append(i)
+            except ValueError:
+                verifications[i] = "fail"
+
+        passed = verify_membership_proofs(decode_hash(root.root_hash), proofs)
+        for i, succeeded in zip(decoded, passed):
+            verifications[i] = "pass" if succeeded else "fail"
+
+        return verifications
+
     def can_verify_membership_proof(self, event: JSONObject) -> bool:
         """
         Can verify membership proof
@@ -549,10 +1005,13 @@ class Audit(ServiceBase):
         # canon = canonicalize_json(event.event)
         # node_hash_enc = hash_data(canon)
         node_hash_enc = event.hash
-        node_hash = decode_hash(node_hash_enc)
         root_hash = decode_hash(root.root_hash)
 
-        proof = decode_membership_proof(event.membership_proof)
+        try:
+            node_hash = decode_hash(node_hash_enc)
+            proof = decode_compact_membership_proof(event.membership_proof)
+        except ValueError:
+            return False
 
         return verify_membership_proof(node_hash, root_hash, proof)
 
@@ -601,7 +1060,7 @@ class Audit(ServiceBase):
 
         curr_root_hash = decode_hash(curr_root.root_hash)
         prev_root_hash = decode_hash(prev_root.root_hash)
-        proof = decode_consistency_proof(curr_root.consistency_proof)
+        proof = decode_compact_consistency_proof(curr_root.consistency_proof)
 
         return verify_consistency_proof(curr_root_hash, prev_root_hash, proof)
 
@@ -609,6 +1068,9 @@ class Audit(ServiceBase):
         """
         Verify signature
 
+        Verifies the signature with the public key of the envelope, signing does
+        not need to be enabled.
+
         Args:
             audit_envelope (obj):
 
@@ -618,9 +1080,9 @@ class Audit(ServiceBase):
         sign_envelope = self.create_signed_envelope(audit_envelope.envelope.event)
         public_key_b64 = audit_envelope.envelope.public_key
         public_key_bytes = b64decode(public_key_b64)
-        return self.sign.verifyMessage(audit_envelope.envelope.signature, sign_envelope, public_key_bytes)
+        return verify_message(audit_envelope.envelope.signature, sign_envelope, public_key_bytes, self.hash_message)
 
-    def root(self, tree_size: int = 0) -> PangeaResponse:
+    def root(self, tree_size: int = 0, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         Retrieve tamperproof verification
 
@@ -628,6 +1090,7 @@ class Audit(ServiceBase):
 
         Args:
             tree_size (int): The size of the tree (the number of records)
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             An PangeaResponse.
@@ -635,14 +1098,12 @@ class Audit(ServiceBase):
         Examples:
             response = audit.root(tree_size=7)
         """
-        endpoint_name = "root"
-
         data = {}
 
         if tree_size > 0:
             data["tree_size"] = tree_size
 
-        return self.request.post(endpoint_name, data=data)
+        return self.request.post("root", data=data, deadline=deadline)
 
     def create_signed_envelope(self, event: dict) -> dict:
         return {key: val for key, val in event.items() if val is not None}
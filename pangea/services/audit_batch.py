@@ -0,0 +1,198 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+import logging
+import threading
+import typing as t
+from concurrent.futures import Future
+
+from .audit import Audit
+
+logger = logging.getLogger("audit")
+
+# approximate size of the signature and public key fields added to a signed record
+SIGNATURE_SIZE = 200
+
+
+class AuditBatcher(object):
+    """Buffers audit events and sends them with `Audit.log_bulk` requests.
+
+    Events are validated when added and, if `signing` is set, signed as a batch
+    just before it is sent. The batch is sent as soon as it reaches `max_events`
+    events, `max_bytes` of estimated payload size, or `max_age` seconds since
+    its first event. Each call to `add()` returns a Future that resolves to the
+    event's own result (hash and optional verbose fields), so results are
+    matched to events no matter how they were batched.
+
+    Args:
+        audit (Audit): Audit Service client used to send the batches
+        max_events (int, optional): events per request
+        max_bytes (int, optional): approximate payload size per request
+        max_age (float, optional): seconds a buffered event can wait before being sent,
+            None to only send on size, count or explicit `flush()`
+        signing (bool, optional): sign the events (requires `enable_signing` on `audit`)
+        verbose (bool, optional): request verbose results
+
+    Examples:
+        from pangea.services.audit_batch import AuditBatcher
+
+        with AuditBatcher(audit, max_events=500, max_age=0.5) as batcher:
+            futures = [batcher.add({"message": f"event {i}"}) for i in range(10000)]
+
+        hashes = [future.result().hash for future in futures]
+    """
+
+    def __init__(
+        self,
+        audit: Audit,
+        max_events: int = 100,
+        max_bytes: int = 1024 * 1024,
+        max_age: t.Optional[float] = 1.0,
+        signing: bool = False,
+        verbose: bool = False,
+    ):
+        if not (isinstance(max_events, int) and max_events > 0):
+            raise Exception("The 'max_events' argument must be a positive integer > 0")
+
+        self.audit = audit
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.signing = signing
+        self.verbose = verbose
+
+        self._records: t.List[dict] = []
+        self._futures: t.List[Future] = []
+        self._size = 0
+        self._generation = 0
+        self._timer: t.Optional[threading.Timer] = None
+        self._closed = False
+
+        # `_lock` protects the buffer, `_send_lock` sends one batch at a time
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+
+    def add(self, event: dict) -> Future:
+        """Adds an event to the current batch
+
+        Args:
+            event (dict): A structured dict describing an auditable activity, as in `Audit.log`
+
+        Returns:
+            A concurrent.futures.Future resolving to the event result once its batch is sent
+        """
+        record = self.audit._log_record(event, signing=self.signing)
+        size = _record_size(record) + (SIGNATURE_SIZE if self.signing else 0)
+        future: Future = Future()
+        batches = []
+
+        with self._lock:
+            if self._closed:
+                raise Exception("Error: the batcher is closed")
+
+            if self._records and self._size + size > self.max_bytes:
+                batches.append(self._take())
+
+            self._records.append(record)
+            self._futures.append(future)
+            self._size += size
+
+            if len(self._records) >= self.max_events or self._size >= self.max_bytes:
+                batches.append(self._take())
+            elif len(self._records) == 1 and self.max_age is not None:
+                self._start_timer()
+
+        for records, futures in batches:
+            self._send(records, futures)
+
+        return future
+
+    def flush(self):
+        """Sends the buffered events, waiting for the request to complete"""
+        with self._lock:
+            records, futures = self._take()
+
+        self._send(records, futures)
+
+    def close(self):
+        """Sends the buffered events and rejects any further ones"""
+        with self._lock:
+            self._closed = True
+
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _take(self) -> t.Tuple[t.List[dict], t.List[Future]]:
+        """Detaches the current batch. Must be called with `_lock` held"""
+        records, futures = self._records, self._futures
+        self._records, self._futures, self._size = [], [], 0
+        self._generation += 1
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        return records, futures
+
+    def _start_timer(self):
+        generation = self._generation
+        self._timer = threading.Timer(self.max_age, self._on_timer, args=(generation,))
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self, generation: int):
+        with self._lock:
+            # the batch was already sent for another reason
+            if generation != self._generation:
+                return
+            records, futures = self._take()
+
+        self._send(records, futures)
+
+    def _send(self, records: t.List[dict], futures: t.List[Future]):
+        if not records:
+            return
+
+        if self.signing:
+            # signed outside of `_send_lock`, while the previous batch is being sent
+            try:
+                self.audit._sign_records(records)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+
+        with self._send_lock:
+            try:
+                data = self.audit._log_bulk_payload(records, verbose=self.verbose)
+                response = self.audit.request.post("log", data=data)
+                response = self.audit.handle_log_bulk_response(response, len(records))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+
+        if not response.success:
+            logger.error(f"Error sending {len(records)} audit event(s): {response.status}")
+            error = Exception(f"Pangea Audit error: {response.response.text}")
+            for future in futures:
+                future.set_exception(error)
+            return
+
+        for future, result in zip(futures, response.result.results):
+            future.set_result(result)
+
+
+def _record_size(record: dict) -> int:
+    """Cheap estimate of the JSON size of a log record, without serializing it"""
+    size = 16
+    for key, value in record.items():
+        if isinstance(value, dict):
+            size += _record_size(value)
+        else:
+            size += len(key) + len(str(value)) + 6
+    return size
@@ -1,28 +1,25 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 import base64
-import json
 import logging
 import os
 from binascii import hexlify, unhexlify
 from dataclasses import dataclass
 from hashlib import sha256
-from typing import Dict, List
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
-import requests
+from pangea.codec import JSON_TYPES, JSONCodec, get_codec
+from pangea.services.arweave import ARWEAVE_BASE_URL, default_arweave_client
 
 Hash = bytes
 
-
-JSON_TYPES = [int, float, str, bool]
+# size of the SHA-256 hashes of the Merkle trees
+HASH_SIZE = 32
 
 
 logger = logging.getLogger("audit")
 
 
-ARWEAVE_BASE_URL = "https://arweave.net"
-
-
 @dataclass
 class MembershipProofItem:
     side: str
@@ -118,26 +115,146 @@ def decode_consistency_proof(data: List[str]) -> ConsistencyProof:
     return root_proof
 
 
-def verify_membership_proof(node_hash: Hash, root_hash: Hash, proof: MembershipProof) -> bool:
+class CompactProof(NamedTuple):
+    """Membership proof as a single buffer of the sibling hashes, from the leaf level
+
+    Bit i of `sides` is set if the sibling at level i is on the left.
+    """
+
+    hashes: bytes
+    sides: int
+    length: int
+
+    def to_membership_proof(self) -> MembershipProof:
+        return [
+            MembershipProofItem(
+                side="left" if (self.sides >> level) & 1 else "right",
+                node_hash=self.hashes[level * HASH_SIZE : (level + 1) * HASH_SIZE],
+            )
+            for level in range(self.length)
+        ]
+
+
+class CompactConsistencyProof(NamedTuple):
+    """Consistency proof as a single buffer of the node hashes and their compact membership proofs"""
+
+    hashes: bytes
+    proofs: Tuple[CompactProof, ...]
+
+
+# the sides and separators of an encoded proof, ignored by bytes.fromhex()
+_PROOF_SEPARATORS = str.maketrans("lr:,", "    ")
+
+# length of an encoded proof item: "l:" + hex hash + ","
+_PROOF_ITEM_SIZE = 2 + 2 * HASH_SIZE + 1
+
+
+def decode_compact_membership_proof(data: str) -> CompactProof:
+    """Decodes an encoded membership proof ("l:<hash>,r:<hash>,...") as a CompactProof
+
+    Raises:
+        ValueError: if the proof is malformed or its hashes are not SHA-256 hashes
+    """
+    if not data:
+        return CompactProof(b"", 0, 0)
+
+    length = data.count(",") + 1
+    hashes = bytes.fromhex(data.translate(_PROOF_SEPARATORS))
+    if len(hashes) != length * HASH_SIZE or len(data) != length * _PROOF_ITEM_SIZE - 1:
+        raise ValueError(f"Invalid membership proof: {data}")
+
+    sides = 0
+    for level in range(length):
+        if data[level * _PROOF_ITEM_SIZE] == "l":
+            sides |= 1 << level
+
+    return CompactProof(hashes, sides, length)
+
+
+def decode_compact_consistency_proof(data: List[str]) -> CompactConsistencyProof:
+    """Decodes an encoded consistency proof as a CompactConsistencyProof"""
+    hashes = []
+    proofs = []
+
+    if data:
+        for item in data:
+            ndx = item.index(",")
+            hashes.append(item[item.index(":", 0, ndx) + 1 : ndx])
+            proofs.append(decode_compact_membership_proof(item[ndx + 1 :]))
+
+    node_hashes = bytes.fromhex("".join(hashes))
+    if len(node_hashes) != len(proofs) * HASH_SIZE:
+        raise ValueError("Invalid consistency proof")
+
+    return CompactConsistencyProof(node_hashes, tuple(proofs))
+
+
+def verify_membership_proof(node_hash: Hash, root_hash: Hash, proof: Union[MembershipProof, CompactProof]) -> bool:
+    if isinstance(proof, CompactProof):
+        hashes, sides, _ = proof
+        for start in range(0, len(hashes), HASH_SIZE):
+            proof_hash = hashes[start : start + HASH_SIZE]
+            node_hash = sha256(proof_hash + node_hash if sides & 1 else node_hash + proof_hash).digest()
+            sides >>= 1
+        return root_hash == node_hash
+
     for proof_item in proof:
         proof_hash = proof_item.node_hash
         node_hash = hash_pair(proof_hash, node_hash) if proof_item.side == "left" else hash_pair(node_hash, proof_hash)
     return root_hash == node_hash
 
 
-def canonicalize_json(message: dict) -> bytes:
-    """Convert log to valid JSON types and apply RFC-7159 (Canonical JSON)"""
+def verify_membership_proofs(
+    root_hash: Hash, items: Iterable[Tuple[Hash, Union[MembershipProof, CompactProof]]]
+) -> List[bool]:
+    """Verifies the membership proofs of several nodes of the same tree
+
+    Same results as calling verify_membership_proof() for each (node_hash, proof)
+    item, but the internal nodes shared by several proofs are hashed only once:
+    they are memoized by proof depth, level and position, and reused when the
+    child and sibling hashes are the same.
+    """
+    memo: Dict[Tuple[int, int, int], Tuple[Hash, bytes, Hash]] = {}
+    results: List[bool] = []
+
+    for node_hash, proof in items:
+        if not isinstance(proof, CompactProof):
+            proof = compact_membership_proof(proof)
+
+        hashes = proof.hashes
+        position = proof.sides
+        depth = proof.length
+
+        for level in range(depth):
+            key = (depth, level, position >> level)
+            proof_hash = hashes[level * HASH_SIZE : (level + 1) * HASH_SIZE]
+            cached = memo.get(key)
+            if cached is not None and cached[0] == node_hash and cached[1] == proof_hash:
+                node_hash = cached[2]
+            else:
+                parent_hash = (
+                    hash_pair(proof_hash, node_hash) if (position >> level) & 1 else hash_pair(node_hash, proof_hash)
+                )
+                memo[key] = (node_hash, proof_hash, parent_hash)
+                node_hash = parent_hash
 
-    def _default(obj):
-        if not any(isinstance(obj, typ) for typ in JSON_TYPES):
-            return str(obj)
-        else:
-            return obj
+        results.append(root_hash == node_hash)
 
-    # stringify invalid JSON types before canonicalizing
-    return json.dumps(
-        message, ensure_ascii=False, allow_nan=False, separators=(",", ":"), sort_keys=True, default=_default
-    ).encode("utf-8")
+    return results
+
+
+def compact_membership_proof(proof: MembershipProof) -> CompactProof:
+    """Converts a list of MembershipProofItem to a CompactProof"""
+    sides = 0
+    for level, proof_item in enumerate(proof):
+        if proof_item.side == "left":
+            sides |= 1 << level
+    return CompactProof(b"".join(proof_item.node_hash for proof_item in proof), sides, len(proof))
+
+
+def canonicalize_json(message: dict, codec: Optional[JSONCodec] = None) -> bytes:
+    """Convert log to valid JSON types and apply RFC-7159 (Canonical JSON)"""
+    return (codec or get_codec()).canonical(message)
 
 
 def hash_bytes(data: bytes) -> bytes:
@@ -148,8 +265,8 @@ def hash_str(data: str) -> str:
     return sha256(bytes(data, "utf8")).hexdigest()
 
 
-def hash_dict(data: dict) -> bytes:
-    return sha256(canonicalize_json(data)).digest()
+def hash_dict(data: dict, codec: Optional[JSONCodec] = None) -> bytes:
+    return sha256(canonicalize_json(data, codec)).digest()
 
 
 def base64url_decode(input_parameter):
@@ -168,89 +285,32 @@ def arweave_graphql_url():
 
 
 def get_arweave_published_roots(tree_name: str, tree_sizes: List[int]) -> Dict[int, dict]:
-    if len(tree_sizes) == 0:
-        return {}
-
-    logger.debug(f"Querying Arweave for published roots of sizes: {', '.join(map(str, tree_sizes))}")
-
-    query = """
-    {
-        transactions(
-          tags: [
-                {
-                    name: "tree_size"
-                    values: [{tree_sizes}]
-                },
-                {
-                    name: "tree_name"
-                    values: ["{tree_name}"]
-                }
-            ]
-        ) {
-            edges {
-                node {
-                    id
-                    tags {
-                        name
-                        value
-                    }
-                }
-            }
-        }
-    }
-    """.replace(
-        "{tree_sizes}", ", ".join(f'"{tree_size}"' for tree_size in tree_sizes)
-    ).replace(
-        "{tree_name}", tree_name
-    )
-
-    resp = requests.post(arweave_graphql_url(), json={"query": query})
-    if resp.status_code != 200:
-        logger.error(f"Error querying Arweave: {resp.reason}")
-        return {}
-
-    ans: Dict[int, dict] = {}
-    data = resp.json()
-    tree_size = None
-
-    for edge in data.get("data", {}).get("transactions", {}).get("edges", []):
-        try:
-            node_id = edge.get("node").get("id")
-            tree_size = next(
-                tag.get("value") for tag in edge.get("node").get("tags", []) if tag.get("name") == "tree_size"
-            )
-
-            url = arweave_transaction_url(node_id)
-
-            # TODO: do all the requests concurrently
-            resp2 = requests.get(url)
-            if resp2.status_code != 200:
-                logger.error(f"Error fetching published root for size {tree_size}: {resp2.reason}")
-            elif resp2.text == "Pending":
-                logger.warning(f"Published root for size {tree_size} is pending")
-            else:
-                ans[int(tree_size)] = json.loads(resp2.text)
-        except Exception as e:
-            logger.error(f"Error decoding published root for size {tree_size}: {str(e)}")
-
-    return ans
+    """Returns the published roots of `tree_name` for the given sizes, using the shared ArweaveClient"""
+    return default_arweave_client().published_roots(tree_name, tree_sizes)
 
 
-def verify_consistency_proof(new_root: Hash, prev_root: Hash, proof: ConsistencyProof) -> bool:
+def verify_consistency_proof(
+    new_root: Hash, prev_root: Hash, proof: Union[ConsistencyProof, CompactConsistencyProof]
+) -> bool:
+    if isinstance(proof, CompactConsistencyProof):
+        node_hashes = [proof.hashes[i * HASH_SIZE : (i + 1) * HASH_SIZE] for i in range(len(proof.proofs))]
+        items = list(zip(node_hashes, proof.proofs))
+    else:
+        items = [(item.node_hash, item.proof) for item in proof]
 
     # check the prev_root
     logger.debug("Calculating the proof for the old root")
-    root_hash = proof[0].node_hash
-    for item in proof[1:]:
-        root_hash = hash_pair(item.node_hash, root_hash)
+    root_hash = items[0][0]
+    for node_hash, _ in items[1:]:
+        root_hash = hash_pair(node_hash, root_hash)
 
     logger.debug("Comparing the old root with the hash generated from the proof")
     if root_hash != prev_root:
         return False
 
     logger.debug("Verifying the proofs for the new root")
-    for item in proof:
-        if not verify_membership_proof(item.node_hash, new_root, item.proof):
+    for node_hash, membership_proof in items:
+        if not verify_membership_proof(node_hash, new_root, membership_proof):
             return False
 
     return True
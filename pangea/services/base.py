@@ -1,26 +1,32 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
+import typing as t
+from concurrent.futures import Future
+
 from pangea.config import PangeaConfig
-from pangea.request import PangeaRequest
+from pangea.request import PangeaRequest, PangeaRequestBase
+from pangea.response import PangeaResponse
 
 
 class ServiceBase(object):
     service_name: str = "base"
     version: str = "v1"
     config_id_header: str = ""
+    request_class: t.Type[PangeaRequestBase] = PangeaRequest
 
-    def __init__(self, token, config=None):
+    def __init__(self, token, config=None, transport=None):
         if not token:
             raise Exception("No token provided")
 
         self.config = config if config else PangeaConfig()
 
-        self.request = PangeaRequest(
+        self.request = self.request_class(
             self.config,
             token,
             self.version,
             self.service_name,
+            transport=transport,
         )
 
         if self.config.config_id and self.config_id_header:
@@ -33,3 +39,12 @@ class ServiceBase(object):
     @token.setter
     def token(self, value):
         self.request.token = value
+
+    def _post(
+        self, endpoint: str, data: dict, deadline: t.Optional[float] = None, queued: bool = False
+    ) -> t.Union[PangeaResponse, Future]:
+        # queued calls return a Future resolved by the shared poller instead of blocking on a 202
+        if queued:
+            return self.request.post_queued(endpoint, data=data, deadline=deadline)
+
+        return self.request.post(endpoint, data=data, deadline=deadline)
@@ -1,5 +1,7 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
+import typing as t
+
 from pangea.response import PangeaResponse
 
 from .base import ServiceBase
@@ -37,7 +39,7 @@ class Embargo(ServiceBase):
     service_name = "embargo"
     version = "v1"
 
-    def ip_check(self, ip: str) -> PangeaResponse:
+    def ip_check(self, ip: str, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         Check IP
 
@@ -46,6 +48,7 @@ class Embargo(ServiceBase):
         Args:
             ip (str): Geolocate this IP and check the corresponding country
                 against the enabled embargo lists.  Accepts both IPV4 and IPV6 strings.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -86,9 +89,9 @@ class Embargo(ServiceBase):
             \"\"\"
         """
 
-        return self.request.post("ip/check", data={"ip": ip})
+        return self.request.post("ip/check", data={"ip": ip}, deadline=deadline)
 
-    def iso_check(self, iso_code: str) -> PangeaResponse:
+    def iso_check(self, iso_code: str, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         ISO Code Check
 
@@ -97,6 +100,7 @@ class Embargo(ServiceBase):
         Args:
             iso_code (str): Check this two character country ISO-code against
                 the enabled embargo lists.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -123,4 +127,4 @@ class Embargo(ServiceBase):
             \"\"\"
         """
 
-        return self.request.post("iso/check", data={"iso_code": iso_code})
+        return self.request.post("iso/check", data={"iso_code": iso_code}, deadline=deadline)
@@ -1,5 +1,8 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
+import typing as t
+from concurrent.futures import Future
+
 from pangea.response import PangeaResponse
 
 from .base import ServiceBase
@@ -37,7 +40,7 @@ class FileIntel(ServiceBase):
     service_name = "file-intel"
     version = "v1"
 
-    def lookup(self, file_hash: str, hash_type: str, provider: str = None, verbose: bool = False, raw: bool = False) -> PangeaResponse:
+    def lookup(self, file_hash: str, hash_type: str, provider: str = None, verbose: bool = False, raw: bool = False, deadline: t.Optional[float] = None, queued: bool = False) -> t.Union[PangeaResponse, Future]:
         """
         Lookup file reputation by hash.
 
@@ -49,6 +52,9 @@ class FileIntel(ServiceBase):
             provider (str, optional): Provider of the reputation information. ("reversinglabs" or "crowdstrike"). Default provider defined by the configuration.
             verbose (bool, optional): Echo back the parameters of the API in the response
             raw (bool, optional): Return additional details from the provider.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -92,7 +98,7 @@ class FileIntel(ServiceBase):
         if raw:
             data["raw"] = raw
 
-        return self.request.post("lookup", data=data)
+        return self._post("lookup", data=data, deadline=deadline, queued=queued)
 
 class IpIntel(ServiceBase):
     """IP Intel service client.
@@ -126,7 +132,7 @@ class IpIntel(ServiceBase):
     service_name = "ip-intel"
     version = "v1"
 
-    def lookup(self, ip: str, provider: str = None, verbose: bool = False, raw: bool = False) -> PangeaResponse:
+    def lookup(self, ip: str, provider: str = None, verbose: bool = False, raw: bool = False, deadline: t.Optional[float] = None, queued: bool = False) -> t.Union[PangeaResponse, Future]:
         """
         Retrieve IP address reputation from a provider.
 
@@ -135,6 +141,9 @@ class IpIntel(ServiceBase):
             provider (str, optional): Provider of the reputation information. ("crowdstrike"). Default provider defined by the configuration.
             verbose (bool, optional): Echo back the parameters of the API in the response
             raw (bool, optional): Return additional details from the provider.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -176,7 +185,7 @@ class IpIntel(ServiceBase):
         if raw:
             data["raw"] = raw
 
-        return self.request.post("lookup", data=data)
+        return self._post("lookup", data=data, deadline=deadline, queued=queued)
 
 class UrlIntel(ServiceBase):
     """URL Intel service client.
@@ -210,7 +219,7 @@ class UrlIntel(ServiceBase):
     service_name = "url-intel"
     version = "v1"
 
-    def lookup(self, url: str, provider: str = None, verbose: bool = False, raw: bool = False) -> PangeaResponse:
+    def lookup(self, url: str, provider: str = None, verbose: bool = False, raw: bool = False, deadline: t.Optional[float] = None, queued: bool = False) -> t.Union[PangeaResponse, Future]:
         """
         Retrieve URL address reputation from a provider.
 
@@ -219,6 +228,9 @@ class UrlIntel(ServiceBase):
             provider (str, optional): Provider of the reputation information. ("crowdstrike"). Default provider defined by the configuration.
             verbose (bool, optional): Echo back the parameters of the API in the response
             raw (bool, optional): Return additional details from the provider.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -260,7 +272,7 @@ class UrlIntel(ServiceBase):
         if raw:
             data["raw"] = raw
 
-        return self.request.post("lookup", data=data)
+        return self._post("lookup", data=data, deadline=deadline, queued=queued)
 
 class DomainIntel(ServiceBase):
     """Domain Intel service client.
@@ -294,7 +306,7 @@ class DomainIntel(ServiceBase):
     service_name = "domain-intel"
     version = "v1"
 
-    def lookup(self, domain: str, provider: str = None, verbose: bool = False, raw: bool = False) -> PangeaResponse:
+    def lookup(self, domain: str, provider: str = None, verbose: bool = False, raw: bool = False, deadline: t.Optional[float] = None, queued: bool = False) -> t.Union[PangeaResponse, Future]:
         """
         Retrieve Domain reputation from a provider.
 
@@ -303,6 +315,9 @@ class DomainIntel(ServiceBase):
             provider (str, optional): Provider of the reputation information. ("crowdstrike"). Default provider defined by the configuration.
             verbose (bool, optional): Echo back the parameters of the API in the response
             raw (bool, optional): Return additional details from the provider.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             A PangeaResponse where the sanctioned source(s) are in the
@@ -327,5 +342,5 @@ class DomainIntel(ServiceBase):
         if raw:
             data["raw"] = raw
 
-        return self.request.post("lookup", data=data)
+        return self._post("lookup", data=data, deadline=deadline, queued=queued)
 
@@ -3,6 +3,7 @@
 
 import enum
 import typing as t
+from concurrent.futures import Future
 
 from pangea.response import PangeaResponse
 
@@ -47,13 +48,15 @@ class Redact(ServiceBase):
     version = "v1"
     config_id_header = "X-Pangea-Redact-Config-ID"
 
-    def __init__(self, token, config=None):
-        super().__init__(token, config)
+    def __init__(self, token, config=None, transport=None):
+        super().__init__(token, config, transport=transport)
 
         if self.config.config_id:
             self.request.set_extra_headers({ConfigIDHeaderName: self.config.config_id})
 
-    def redact(self, text: str, debug=False) -> PangeaResponse:
+    def redact(
+        self, text: str, debug=False, deadline: t.Optional[float] = None, queued: bool = False
+    ) -> t.Union[PangeaResponse, Future]:
         """
         Redact
         
@@ -62,6 +65,9 @@ class Redact(ServiceBase):
         Args:
             text (str): The text to be redacted
             debug (bool, optional): Return debug output
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             Pangea Response with redacted text in the response.result property,
@@ -86,11 +92,16 @@ class Redact(ServiceBase):
             }
             \"\"\"
         """
-        return self.request.post("redact", data={"text": text, "debug": debug})
+        return self._post("redact", data={"text": text, "debug": debug}, deadline=deadline, queued=queued)
 
     def redact_structured(
-        self, obj: t.Any, redact_format: RedactFormat = RedactFormat.JSON, debug=False
-    ) -> PangeaResponse:
+        self,
+        obj: t.Any,
+        redact_format: RedactFormat = RedactFormat.JSON,
+        debug=False,
+        deadline: t.Optional[float] = None,
+        queued: bool = False,
+    ) -> t.Union[PangeaResponse, Future]:
         """
         Redact structured
 
@@ -100,6 +111,9 @@ class Redact(ServiceBase):
             obj (obj): The object that should be redacted
             redact_format (RedactFormat, optional): The format of the passed data
             debug (bool, optional): Return debug output
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
+            queued (bool, optional): return a concurrent.futures.Future at once and let the shared
+                poller wait for a queued (202) request, instead of blocking on it
 
         Returns:
             Pangea Response with redacted data in the response.result field,
@@ -127,7 +141,9 @@ class Redact(ServiceBase):
             }
             \"\"\"
         """
-        return self.request.post(
+        return self._post(
             "redact_structured",
             data={"data": obj, "format": redact_format, "debug": debug},
+            deadline=deadline,
+            queued=queued,
         )
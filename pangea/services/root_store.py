@@ -0,0 +1,155 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import json
+import sqlite3
+import threading
+import typing as t
+from collections import OrderedDict
+
+RootKey = t.Tuple[str, int]
+
+# sqlite's default limit of host parameters per statement is 999
+_SQL_BATCH = 500
+
+
+class RootStore(object):
+    """Cache of the published roots used to verify Audit consistency proofs.
+
+    Roots are keyed by `(tree_name, tree_size)` and never change once
+    published, so they are kept in an in-memory LRU and, if `path` is given,
+    in a sqlite database that is shared by every process using the same file.
+    Roots keep their `source` ("arweave" or "pangea"); a root published on
+    Arweave takes precedence over the same root given by the server. A store
+    is safe to share between threads and Audit clients.
+
+    Args:
+        path (str, optional): sqlite database file. In-memory only if empty.
+        max_size (int): maximum number of roots kept in memory.
+
+    Examples:
+        from pangea.services.root_store import RootStore
+
+        audit = Audit(token=PANGEA_TOKEN, config=audit_config, root_store=RootStore("roots.db"))
+    """
+
+    def __init__(self, path: str = "", max_size: int = 4096):
+        if max_size <= 0:
+            raise Exception("The 'max_size' argument must be a positive integer > 0")
+
+        self.path = path
+        self.max_size = max_size
+        self._cache: "OrderedDict[RootKey, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: t.Optional[sqlite3.Connection] = None
+
+    def get(self, tree_name: str, tree_size: int) -> t.Optional[dict]:
+        """Returns the root of `tree_name` at `tree_size`, or None if it is not stored"""
+        return self.get_many(tree_name, [tree_size]).get(tree_size)
+
+    def get_many(self, tree_name: str, tree_sizes: t.Iterable[int]) -> t.Dict[int, dict]:
+        """Returns the stored roots of `tree_name` for the given sizes, keyed by tree size"""
+        found: t.Dict[int, dict] = {}
+        missing: t.List[int] = []
+
+        with self._lock:
+            for tree_size in tree_sizes:
+                key = (tree_name, tree_size)
+                root = self._cache.get(key)
+                if root is None:
+                    missing.append(tree_size)
+                else:
+                    self._cache.move_to_end(key)
+                    found[tree_size] = root
+
+            if missing and self.path:
+                for tree_size, root in self._load(tree_name, missing):
+                    self._remember((tree_name, tree_size), root)
+                    found[tree_size] = root
+
+        return found
+
+    def put(self, tree_name: str, tree_size: int, root: dict):
+        """Stores the root of `tree_name` at `tree_size`"""
+        self.put_many(tree_name, {tree_size: root})
+
+    def put_many(self, tree_name: str, roots: t.Dict[int, dict]):
+        """Stores several roots of `tree_name`, keyed by tree size"""
+        if not roots:
+            return
+
+        with self._lock:
+            for tree_size, root in roots.items():
+                self._remember((tree_name, tree_size), dict(root))
+
+            if self.path:
+                db = self._connection()
+                with db:
+                    db.executemany(
+                        "INSERT INTO roots (tree_name, tree_size, source, root) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (tree_name, tree_size) "
+                        "DO UPDATE SET source = excluded.source, root = excluded.root "
+                        "WHERE roots.source IS NOT 'arweave'",
+                        [
+                            (tree_name, tree_size, root.get("source"), json.dumps(root))
+                            for tree_size, root in roots.items()
+                        ],
+                    )
+
+    def close(self):
+        """Closes the database, if any. The store can still be used afterwards."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def _remember(self, key: RootKey, root: dict):
+        # a root published on Arweave is never replaced by the same root given by the server
+        cached = self._cache.get(key)
+        if cached is None or cached.get("source") != "arweave":
+            self._cache[key] = root
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def _load(self, tree_name: str, tree_sizes: t.List[int]) -> t.Iterator[t.Tuple[int, dict]]:
+        db = self._connection()
+        for i in range(0, len(tree_sizes), _SQL_BATCH):
+            batch = tree_sizes[i : i + _SQL_BATCH]
+            rows = db.execute(
+                "SELECT tree_size, root FROM roots WHERE tree_name = ? AND tree_size IN "
+                f"({', '.join('?' * len(batch))})",
+                [tree_name, *batch],
+            )
+            for tree_size, root in rows:
+                yield tree_size, json.loads(root)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            # used from any thread, always under self._lock
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            with db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS roots ("
+                    "tree_name TEXT NOT NULL, tree_size INTEGER NOT NULL, source TEXT, root TEXT NOT NULL, "
+                    "PRIMARY KEY (tree_name, tree_size))"
+                )
+            self._db = db
+        return self._db
+
+
+_default_store: t.Optional[RootStore] = None
+_default_lock = threading.Lock()
+
+
+def default_root_store() -> RootStore:
+    """Returns the in-memory store shared by the Audit clients created without a `root_store`"""
+    global _default_store
+
+    with _default_lock:
+        if _default_store is None:
+            _default_store = RootStore()
+        return _default_store
@@ -39,7 +39,7 @@ class Secrets(ServiceBase):
     version = "v1"
 
 
-    def get(self, secret_id: str, secret_version: str = None) -> PangeaResponse:
+    def get(self, secret_id: str, secret_version: str = None, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         Secrets
 
@@ -48,6 +48,7 @@ class Secrets(ServiceBase):
         Args:
             secret_id (str): Secret Id.
             secret_version (str) - (Optional): Secret Version.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse.
@@ -79,10 +80,10 @@ class Secrets(ServiceBase):
             \"\"\"
         """
 
-        return self.request.post("get", data={"secret_id": secret_id, "secret_version": secret_version})
+        return self.request.post("get", data={"secret_id": secret_id, "secret_version": secret_version}, deadline=deadline)
 
 
-    def add(self, secret_id: str, secret_value: str) -> PangeaResponse:
+    def add(self, secret_id: str, secret_value: str, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         Secrets
 
@@ -91,6 +92,7 @@ class Secrets(ServiceBase):
         Args:
             secret_id (str): Secret Id.
             secret_value (str): Secret Value.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse.
@@ -121,10 +123,10 @@ class Secrets(ServiceBase):
             \"\"\"
         """
 
-        return self.request.post("add", data={"secret_id": secret_id, "secret_value": secret_value})
+        return self.request.post("add", data={"secret_id": secret_id, "secret_value": secret_value}, deadline=deadline)
 
 
-    def update(self, secret_id: str, secret_value: str) -> PangeaResponse:
+    def update(self, secret_id: str, secret_value: str, deadline: t.Optional[float] = None) -> PangeaResponse:
         """
         Secrets
 
@@ -133,6 +135,7 @@ class Secrets(ServiceBase):
         Args:
             secret_id (str): Secret Id.
             secret_value (str): Secret Value.
+            deadline (float, optional): maximum seconds for the call, including retries and queued polling
 
         Returns:
             A PangeaResponse.
@@ -162,4 +165,4 @@ class Secrets(ServiceBase):
             \"\"\"
         """
 
-        return self.request.post("update", data={"secret_id": secret_id, "secret_value": secret_value})
+        return self.request.post("update", data={"secret_id": secret_id, "secret_value": secret_value}, deadline=deadline)
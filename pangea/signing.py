@@ -1,7 +1,10 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
+import functools
 import os
+import threading
 import typing as t
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from base64 import b64encode, b64decode
 
 from os.path import exists
@@ -12,17 +15,179 @@ from cryptography.hazmat.primitives.asymmetric import ed25519
 from .services.audit_util import canonicalize_json
 
 
+# number of parsed public keys kept by load_public_key()
+PUBLIC_KEY_CACHE_SIZE = 256
+
+# returns the private key, as an Ed25519 key object or PEM bytes
+KeyProvider = t.Callable[[], t.Union[ed25519.Ed25519PrivateKey, bytes]]
+
+# a (signature in base64, message, public key in OpenSSH format) item to verify
+SignedItem = t.Tuple[t.Union[str, bytes], t.Any, bytes]
+
+# below this number of items, verify_messages() and Signing.sign_many() do not use a pool
+MIN_PARALLEL_ITEMS = 32
+
+
+@functools.lru_cache(maxsize=PUBLIC_KEY_CACHE_SIZE)
+def load_public_key(public_key_bytes: bytes) -> ed25519.Ed25519PublicKey:
+    """
+    Parses an Ed25519 public key in OpenSSH format. The parsed keys are cached,
+    so events signed by the same key parse it only once.
+    """
+    try:
+        public_key = serialization.load_ssh_public_key(public_key_bytes)
+    except Exception:
+        raise Exception("Error: Failed loading public key.")
+
+    if not isinstance(public_key, ed25519.Ed25519PublicKey):
+        raise Exception("Public key is not using Ed25519 algorithm.")
+
+    return public_key
+
+
+def load_private_key(private_key_bytes: bytes) -> ed25519.Ed25519PrivateKey:
+    """Parses an Ed25519 private key in PEM (PKCS8) format"""
+    try:
+        private_key = serialization.load_pem_private_key(private_key_bytes, None)
+    except Exception:
+        raise Exception("Error: Failed loading private key.")
+
+    if not isinstance(private_key, ed25519.Ed25519PrivateKey):
+        raise Exception("Private key is not using Ed25519 algorithm.")
+
+    return private_key
+
+
+def signed_bytes(message: t.Any, hash_message: bool = False) -> bytes:
+    """Returns the bytes signed for a str, dict (canonical JSON) or bytes message"""
+    if isinstance(message, str):
+        data = bytes(message, "utf8")
+    elif isinstance(message, dict):
+        data = canonicalize_json(message)
+    elif isinstance(message, bytes):
+        data = message
+    else:
+        raise TypeError(f"Cannot sign a {type(message).__name__} message")
+
+    if hash_message:
+        digest = hashes.Hash(hashes.SHA256())
+        digest.update(data)
+        data = digest.finalize()
+    return data
+
+
+def verify_message(
+    signature_b64: t.Union[str, bytes], message: t.Any, public_key_bytes: bytes, hash_message: bool = False
+) -> bool:
+    """
+    Verifies the Ed25519 signature of a message (see signed_bytes()) with a public
+    key in OpenSSH format. Has no side effects and needs no key files.
+    """
+    try:
+        public_key = load_public_key(public_key_bytes)
+        public_key.verify(b64decode(signature_b64), signed_bytes(message, hash_message))
+    except Exception:
+        return False
+
+    return True
+
+
+def _verify_chunk(items: t.List[SignedItem], hash_message: bool) -> t.List[bool]:
+    return [
+        verify_message(signature_b64, message, public_key_bytes, hash_message)
+        for signature_b64, message, public_key_bytes in items
+    ]
+
+
+def verify_messages(
+    items: t.Iterable[SignedItem],
+    hash_message: bool = False,
+    workers: int = 1,
+    processes: bool = False,
+    executor: t.Optional[Executor] = None,
+) -> t.List[bool]:
+    """
+    Verifies the signatures of several messages, returning the result of each item
+    in order, as verify_message() would. With more than one worker, the items are
+    verified in chunks on `executor`, or else on a thread pool (a process pool if
+    `processes` is set) created for this call.
+    """
+    func = functools.partial(_verify_chunk, hash_message=hash_message)
+    return _map_chunks(func, list(items), workers, processes, executor)
+
+
+def _map_chunks(
+    func: t.Callable[[list], list],
+    items: list,
+    workers: int,
+    processes: bool = False,
+    executor: t.Optional[Executor] = None,
+) -> list:
+    """
+    Returns func(items), computed in chunks on `executor` (a pool of `workers` created
+    for the call if not given) if there are enough items
+    """
+    if workers <= 1 or len(items) < MIN_PARALLEL_ITEMS:
+        return func(items)
+
+    # a few chunks per worker, so that they finish at about the same time
+    chunk_size = -(-len(items) // (workers * 4))
+    chunks = [items[start : start + chunk_size] for start in range(0, len(items), chunk_size)]
+    if executor is not None:
+        return [result for chunk_results in executor.map(func, chunks) for result in chunk_results]
+
+    with ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers) as executor:
+        return [result for chunk_results in executor.map(func, chunks) for result in chunk_results]
+
+
 class Signing:
+    """
+    Signs messages with an Ed25519 key pair and verifies signatures.
+
+    By default the keys are read from the files named by the PRIVATE_KEY and
+    PUBLIC_KEY environment variables, and generated if missing. They can be given
+    in memory instead, with `private_key` (an Ed25519 key object or PEM bytes) or
+    a `key_provider` callable returning it, in which case no file is used and the
+    public key is derived from the private key. The keys are loaded on first use
+    and kept for the lifetime of the instance, which can be shared between threads.
+
+    The pools used by sign_many() and verify_many() are also created on first use
+    and reused by the later calls, until close().
+
+    Messages are hashed with SHA-256 before signing if `hash_message` is set. Left
+    to None, they are not, unless the instance is the `signer` of an Audit client,
+    which then sets it to its own `hash_message` (True by default).
+    """
+
     _private_key_filename = ""
     _public_key_filename = ""
     _private_key = None
     _public_key = None
+    _public_key_bytes = None
     _overwrite_keys_if_exists = False
-    _hash_message = False
-
-    def __init__(self, overwrite_keys_if_exists: bool =  False, hash_message: bool = False) -> None:
+    _hash_message: t.Optional[bool] = None
+
+    def __init__(
+        self,
+        overwrite_keys_if_exists: bool = False,
+        hash_message: t.Optional[bool] = None,
+        private_key: t.Optional[t.Union[ed25519.Ed25519PrivateKey, bytes]] = None,
+        key_provider: t.Optional[KeyProvider] = None,
+    ) -> None:
         self._hash_message = hash_message
         self._overwrite_keys_if_exists = overwrite_keys_if_exists
+        # guards the loading of the keys (and the key files) and the pools
+        self._lock = threading.RLock()
+        # pools of sign_many() and verify_many(), by (processes, workers)
+        self._executors: t.Dict[t.Tuple[bool, int], Executor] = {}
+
+        if private_key is not None:
+            self._key_provider: t.Optional[KeyProvider] = lambda: private_key
+        else:
+            self._key_provider = key_provider
+
+        if self._key_provider is not None:
+            return
 
         self._private_key_filename = os.getenv("PRIVATE_KEY")
         self._public_key_filename = os.getenv("PUBLIC_KEY")
@@ -33,6 +198,15 @@ class Signing:
         if not self._public_key_filename:
             raise Exception("No PUBLIC_KEY environment variable provided")
 
+    @property
+    def hash_message(self) -> t.Optional[bool]:
+        """Whether messages are hashed with SHA-256 before signing, None if not chosen yet"""
+        return self._hash_message
+
+    @hash_message.setter
+    def hash_message(self, hash_message: bool):
+        self._hash_message = hash_message
+
     # Generates key pairs, storing in local disk.
     def generateKeys(self, overwrite_if_exists: bool):
         if not exists(self._private_key_filename) or not exists(self._public_key_filename) or overwrite_if_exists:
@@ -64,45 +238,56 @@ class Signing:
 
     # Returns the private key
     def getPrivateKey(self, private_bytes: bytes = None):
-        if self._private_key is None and private_bytes is None:
-            try:
-                self.generateKeys(self._overwrite_keys_if_exists)
-                with open(self._private_key_filename, "rb") as file:
-                    private_bytes = file.read()
-            except Exception:
-                raise Exception("Error: Failed loading private key.")
-
         if private_bytes is not None:
-            try:        
-                self._private_key = serialization.load_pem_private_key(private_bytes, None)
-            except Exception:
-                raise Exception("Error: Failed loading private key.")
-
-            if not isinstance(self._private_key, ed25519.Ed25519PrivateKey):
-                raise Exception("Private key is not using Ed25519 algorithm.")
+            self._private_key = load_private_key(private_bytes)
+        elif self._private_key is None:
+            with self._lock:
+                if self._private_key is None:
+                    self._private_key = self._load_private_key()
 
         return self._private_key
 
+    def _load_private_key(self) -> ed25519.Ed25519PrivateKey:
+        if self._key_provider is not None:
+            key = self._key_provider()
+            if isinstance(key, ed25519.Ed25519PrivateKey):
+                return key
+            return load_private_key(key)
+
+        try:
+            self.generateKeys(self._overwrite_keys_if_exists)
+            with open(self._private_key_filename, "rb") as file:
+                private_bytes = file.read()
+        except Exception:
+            raise Exception("Error: Failed loading private key.")
+
+        return load_private_key(private_bytes)
+
     # Returns the public key
     def getPublicKey(self, public_bytes: bytes = None):
-        if self._public_key is None and public_bytes is None:
-            try:
-                self.generateKeys(self._overwrite_keys_if_exists)
-                with open(self._public_key_filename, "rb") as file:
-                    public_bytes = file.read()
-            except Exception:
-                raise Exception("Error: Failed loading public key.") 
-
         if public_bytes is not None:
-            try:
-                self._public_key = serialization.load_ssh_public_key(public_bytes)
-            except Exception:
-                raise Exception("Error: Failed loading public key.")
+            self._public_key = load_public_key(public_bytes)
+            self._public_key_bytes = None
+        elif self._public_key is None:
+            with self._lock:
+                if self._public_key is None:
+                    self._public_key = self._load_public_key()
+
+        return self._public_key
+
+    def _load_public_key(self) -> ed25519.Ed25519PublicKey:
+        if self._key_provider is not None:
+            # in memory keys: derived from the private key
+            return self.getPrivateKey().public_key()
 
-            if not isinstance(self._public_key, ed25519.Ed25519PublicKey):
-                raise Exception("Public key is not using Ed25519 algorithm.")
+        try:
+            self.generateKeys(self._overwrite_keys_if_exists)
+            with open(self._public_key_filename, "rb") as file:
+                public_bytes = file.read()
+        except Exception:
+            raise Exception("Error: Failed loading public key.")
 
-        return self._public_key     
+        return load_public_key(public_bytes)
 
     # Returns the private key bytes
     def getPrivateKeyBytes(self):
@@ -111,12 +296,16 @@ class Signing:
 
         return self._private_key.private_bytes(encoding=serialization.Encoding.PEM, format=serialization.PrivateFormat.PKCS8, encryption_algorithm=serialization.NoEncryption())
 
-    # Returns the public key bytes
+    # Returns the public key bytes, encoded once
     def getPublicKeyBytes(self):
-        if self._public_key is None:
-            self._public_key = self.getPublicKey()
+        public_key_bytes = self._public_key_bytes
+        if public_key_bytes is None:
+            public_key_bytes = self.getPublicKey().public_bytes(
+                encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH
+            )
+            self._public_key_bytes = public_key_bytes
 
-        return self._public_key.public_bytes(encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH)
+        return public_key_bytes
 
     # Signs a string message using Ed25519 algorithm
     def signMessageStr(self, message: str, private_key_bytes: bytes = None):
@@ -125,7 +314,10 @@ class Signing:
 
     # Signs a message in bytes using Ed25519 algorithm
     def signMessageBytes(self, message_bytes: bytes, private_key_bytes: bytes = None):
-        private_key = self.getPrivateKey(private_key_bytes)
+        if private_key_bytes is not None:
+            private_key = load_private_key(private_key_bytes)
+        else:
+            private_key = self._private_key or self.getPrivateKey()
         try:
             if self._hash_message:
                 digest = hashes.Hash(hashes.SHA256())
@@ -160,7 +352,11 @@ class Signing:
 
     # Verify a message in bytes using Ed25519 algorithm
     def verifyMessageBytes(self, signature_b64: bytes, message_bytes: bytes, public_key_bytes: bytes = None) -> bool:
-        public_key = self.getPublicKey(public_key_bytes)
+        if public_key_bytes is not None:
+            # keys of other signers are parsed (and cached) without replacing our own
+            return verify_message(signature_b64, message_bytes, public_key_bytes, self._hash_message)
+
+        public_key = self.getPublicKey()
         try:
             if self._hash_message:
                 digest = hashes.Hash(hashes.SHA256())
@@ -178,6 +374,45 @@ class Signing:
         message_bytes = canonicalize_json(messageJSON)
         return self.verifyMessageBytes(signature_b64, message_bytes, public_key_bytes)
 
+    def sign_many(
+        self, messages: t.Iterable[t.Any], workers: int = 1, executor: t.Optional[Executor] = None
+    ) -> t.List[t.Optional[str]]:
+        """
+        Signs several messages, as signMessage() would, on `executor` or a pool of
+        `workers` threads if there are enough of them. Returns the signatures in order.
+        """
+        # loaded once, before the threads use it
+        self.getPrivateKey()
+        if executor is None and workers > 1:
+            executor = self._executor(workers)
+        return _map_chunks(self._sign_chunk, list(messages), workers, executor=executor)
+
+    def _sign_chunk(self, messages: t.List[t.Any]) -> t.List[t.Optional[str]]:
+        return [self.signMessage(message) for message in messages]
+
+    def verify_many(self, items: t.Iterable[SignedItem], workers: int = 1, processes: bool = False) -> t.List[bool]:
+        """Verifies several (signature, message, public key) items, see verify_messages()"""
+        executor = self._executor(workers, processes) if workers > 1 else None
+        return verify_messages(items, self._hash_message, workers, processes, executor)
+
+    def _executor(self, workers: int, processes: bool = False) -> Executor:
+        """Returns the pool of `workers` threads (or processes), created on first use"""
+        with self._lock:
+            executor = self._executors.get((processes, workers))
+            if executor is None:
+                executor = ProcessPoolExecutor(workers) if processes else ThreadPoolExecutor(workers)
+                self._executors[(processes, workers)] = executor
+            return executor
+
+    def close(self):
+        """Shuts down the pools of sign_many() and verify_many()"""
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors.clear()
+
+        for executor in executors:
+            executor.shutdown()
+
     def verifyMessage(self, signature_b64: bytes, message: t.Any, public_key_bytes: bytes = None) -> bool:
         if isinstance(message, str):
             return self.verifyMessageStr(signature_b64, message, public_key_bytes)
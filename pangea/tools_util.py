@@ -1,15 +1,21 @@
 # Copyright 2022 Pangea Cyber Corporation
 # Author: Pangea Cyber Corporation
 
+import argparse
+import gzip
+import heapq
 import io
 import json
 import os
+import stat
 import sys
 import typing as t
 from datetime import datetime, timezone
 
+from pangea.codec import available_codecs, get_codec
 from pangea.config import PangeaConfig
 from pangea.services import Audit
+from pangea.services.root_store import RootStore
 
 
 class Root(t.TypedDict):
@@ -23,6 +29,7 @@ class Event(t.TypedDict):
     event: dict
     hash: str
     tree_size: t.Optional[int]
+    tree_name: t.Optional[str]
 
 
 def print_progress_bar(iteration, total, prefix="", suffix="", decimals=1, length=100):
@@ -52,15 +59,16 @@ def exit_with_error(message: str):
     sys.exit(1)
 
 
-def file_events(root_hashes: dict[int, str], f: io.TextIOWrapper) -> t.Iterator[Event]:
+def file_events(root_hashes: dict[int, str], f: t.Iterable[str], first_line: int = 0) -> t.Iterator[Event]:
     """
     Reads a file containing Events in JSON format with the following fields:
     - membership_proof: str
     - leaf_index: int
     """
-    for idx, line in enumerate(f):
+    codec = get_codec()
+    for idx, line in enumerate(f, first_line):
         try:
-            data = json.loads(line)
+            data = codec.loads(line)
             if "envelope" in data:
                 # single event (from PUC or dump file in jsonl format)
                 if "root" in data:
@@ -68,6 +76,7 @@ def file_events(root_hashes: dict[int, str], f: io.TextIOWrapper) -> t.Iterator[
                     root = data["root"]
                     root_hashes[root["size"]] = root["root_hash"]
                     data["tree_size"] = root["size"]
+                    data["tree_name"] = root.get("tree_name")
                 yield data
             elif "request_id" in data:
                 # result from a search
@@ -75,6 +84,7 @@ def file_events(root_hashes: dict[int, str], f: io.TextIOWrapper) -> t.Iterator[
                 root_hashes[root["size"]] = root["root_hash"]
                 for event in data["result"]["events"]:
                     event["tree_size"] = root["size"]
+                    event["tree_name"] = root.get("tree_name")
                     yield event
             else:
                 raise ValueError("invalid data")
@@ -82,12 +92,151 @@ def file_events(root_hashes: dict[int, str], f: io.TextIOWrapper) -> t.Iterator[
             exit_with_error(f"failed to parse line {idx}: {str(e)}")
 
 
-def init_audit(token: str, domain: str, config_id: str = "") -> Audit:
-    config = PangeaConfig(domain=domain, config_id=config_id)
-    audit = Audit(token, config=config)
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw stream counting the bytes read from `source`"""
+
+    def __init__(self, source: t.BinaryIO):
+        self.source = source
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self.source.readinto(buffer)
+        self.bytes_read += size or 0
+        return size
+
+    def seekable(self) -> bool:
+        return self.source.seekable()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        self.bytes_read = self.source.seek(offset, whence)
+        return self.bytes_read
+
+    def tell(self) -> int:
+        return self.bytes_read
+
+
+class InputStream:
+    """
+    Text stream over an input file, or standard input if the path is "-",
+    read in a single pass. gzip and zstd (requires the zstandard package)
+    compressed inputs are detected and decompressed on the fly.
+
+    `offset` is the number of bytes read so far from the (compressed) input,
+    and `size` its total size, or None if unknown (i.e. when piped).
+    `position` is the number of decompressed bytes of the `lines` read so far.
+    """
+
+    def __init__(self, path: str):
+        if path == "-":
+            self.name = "<stdin>"
+            source = sys.stdin.buffer
+        else:
+            self.name = path
+            source = open(path, "rb")
+
+        self._source = source
+        self.size = self._file_size(source)
+        self._counter = _CountingReader(source)
+
+        buffered = io.BufferedReader(self._counter)
+        magic = buffered.peek(len(ZSTD_MAGIC))
+        self.compressed = True
+        if magic.startswith(GZIP_MAGIC):
+            self.stream = gzip.GzipFile(fileobj=buffered, mode="rb")  # type: ignore
+        elif magic.startswith(ZSTD_MAGIC):
+            try:
+                import zstandard
+            except ImportError:
+                raise Exception(f"{self.name} is zstd compressed, install the zstandard package to read it")
+            self.stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(buffered))  # type: ignore
+        else:
+            self.compressed = False
+            self.stream = buffered  # type: ignore
+
+        self.position = 0
+        self.lines = 0
+
+    @property
+    def offset(self) -> int:
+        return self._counter.bytes_read
+
+    def seek(self, position: int, lines: int = 0):
+        """
+        Moves to `position` in the decompressed input, before reading it. The data
+        is read and skipped if the input is compressed or cannot seek. `lines` is
+        the number of lines before `position`.
+        """
+        if not self.compressed and self._counter.seekable():
+            self.stream.seek(position)
+        else:
+            remaining = position - self.position
+            while remaining > 0:
+                chunk = self.stream.read(min(remaining, io.DEFAULT_BUFFER_SIZE * 16))
+                if not chunk:
+                    raise Exception(f"{self.name} is shorter than {position} bytes")
+                remaining -= len(chunk)
+        self.position = position
+        self.lines = lines
+
+    def __iter__(self) -> t.Iterator[str]:
+        for line in self.stream:
+            self.position += len(line)
+            self.lines += 1
+            yield line.decode("utf-8")
+
+    def close(self):
+        self.stream.close()
+        if self._source is not sys.stdin.buffer:
+            self._source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def _file_size(source: t.BinaryIO) -> t.Optional[int]:
+        try:
+            st = os.fstat(source.fileno())
+        except (OSError, ValueError):
+            return None
+        return st.st_size if stat.S_ISREG(st.st_mode) else None
+
+
+def init_audit(
+    token: str, domain: str, config_id: str = "", json_codec: str = "json", root_store: t.Optional[RootStore] = None
+) -> Audit:
+    config = PangeaConfig(domain=domain, config_id=config_id, json_codec=json_codec)
+    audit = Audit(token, config=config, root_store=root_store)
     return audit
 
 
+def add_json_codec_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--json-codec",
+        default=os.getenv("PANGEA_JSON_CODEC", "json"),
+        choices=available_codecs(),
+        help="JSON codec used to read and write events (default: env PANGEA_JSON_CODEC or json)",
+    )
+
+
+def add_root_store_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--root-store",
+        default=os.getenv("PANGEA_AUDIT_ROOT_STORE", ""),
+        metavar="PATH",
+        help="sqlite file caching the published roots across runs (default: env PANGEA_AUDIT_ROOT_STORE, in memory)",
+    )
+
+
 def make_aware_datetime(d: datetime) -> datetime:
     if d.tzinfo is None or d.tzinfo.utcoffset(d) is None:
         return d.replace(tzinfo=timezone.utc)
@@ -98,26 +247,67 @@ def make_aware_datetime(d: datetime) -> datetime:
 class SequenceFollower:
     """
     Follows an unordered sequence of integers, looking for holes
+
+    The numbers seen are kept as sorted runs of consecutive values, so memory
+    grows with the number of holes rather than with the number of values. New
+    numbers are buffered and merged into the runs in batches.
     """
 
+    # minimum number of buffered numbers before merging them
+    min_pending = 1024
+
     def __init__(self):
-        self.numbers = set()
+        # run i covers range(self.starts[i], self.ends[i])
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self._pending: list[int] = []
 
     def add(self, val: int):
-        self.numbers.add(val)
-        self._reduce()
+        self._pending.append(val)
+        if len(self._pending) >= max(self.min_pending, len(self.starts)):
+            self._merge()
 
-    def _reduce(self):
-        """remove consecutive numbers from the left"""
-        min_val = min(self.numbers)
-        while min_val + 1 in self.numbers:
-            self.numbers.remove(min_val)
-            min_val += 1
+    def _merge(self):
+        """merge the buffered numbers into the runs"""
+        if not self._pending:
+            return
 
-    def holes(self) -> list[int]:
-        if not self.numbers:
-            return []
+        values = [(val, val + 1) for val in sorted(set(self._pending))]
+        self._pending = []
+
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in heapq.merge(zip(self.starts, self.ends), values):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        self.starts = starts
+        self.ends = ends
 
-        min_val = min(self.numbers)
-        max_val = max(self.numbers)
-        return [val for val in range(min_val, max_val) if val not in self.numbers]
+    def runs(self) -> list[tuple[int, int]]:
+        """Returns the numbers seen as (start, end) ranges, end excluded"""
+        self._merge()
+        return list(zip(self.starts, self.ends))
+
+    @classmethod
+    def from_runs(cls, runs: t.Iterable[t.Sequence[int]]) -> "SequenceFollower":
+        """Creates a follower from the runs() of another one"""
+        follower = cls()
+        for start, end in runs:
+            follower.starts.append(start)
+            follower.ends.append(end)
+        return follower
+
+    def hole_ranges(self) -> list[tuple[int, int]]:
+        """Returns the holes as (first, last) ranges, both included"""
+        self._merge()
+        return [(end, start - 1) for end, start in zip(self.ends, self.starts[1:])]
+
+    def hole_count(self) -> int:
+        return sum(last - first + 1 for first, last in self.hole_ranges())
+
+    def holes(self) -> list[int]:
+        return [val for first, last in self.hole_ranges() for val in range(first, last + 1)]
@@ -0,0 +1,153 @@
+# Copyright 2022 Pangea Cyber Corporation
+# Author: Pangea Cyber Corporation
+
+import time
+import typing as t
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+from urllib3.exceptions import NewConnectionError
+
+from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+
+# requests that can be sent again after a read error, as urllib3 does
+_IDEMPOTENT_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+
+
+def capped_timeouts(timeouts: t.Tuple[float, float], expires_at: t.Optional[float]) -> t.Tuple[float, float]:
+    """Caps (connect, read) timeouts to the time left before a `time.monotonic()` expiry"""
+    if expires_at is None:
+        return timeouts
+
+    left = expires_at - time.monotonic()
+    if left <= 0:
+        raise PangeaTimeoutError("Deadline exceeded")
+
+    connect, read = timeouts
+    return min(connect, left), min(read, left)
+
+
+def retry_delay(backoff: float, retry: int) -> float:
+    """Seconds to wait before retry number `retry` (from 1), with the schedule of urllib3:
+    no wait before the first retry, then `backoff * 2^(retry - 1)`"""
+    if retry <= 1:
+        return 0
+    return min(backoff * 2 ** (retry - 1), Retry.DEFAULT_BACKOFF_MAX)
+
+
+def idempotent(method: str) -> bool:
+    """True if a request with this method can be sent again after it may have reached the server"""
+    return method.upper() in _IDEMPOTENT_METHODS
+
+
+class PangeaTransport(object):
+    """Pooled HTTP connections shared by Pangea service clients.
+
+    Wraps a `requests.Session` whose adapter keeps `pool_connections` per-host
+    pools of up to `pool_maxsize` kept-alive connections. Passing the same
+    transport to several clients (or using PangeaClient, which does it for you)
+    lets them reuse connections and TLS sessions instead of each opening its
+    own. The transport is safe to share across threads.
+
+    Requests sent with `request()` are retried with the `request_retries` and
+    `request_backoff` settings of the given PangeaConfig, within an optional
+    deadline. The session itself does not retry.
+
+    Examples:
+        from pangea.config import PangeaConfig
+        from pangea.services import Audit, Redact
+        from pangea.transport import PangeaTransport
+
+        config = PangeaConfig(domain="pangea.cloud", pool_maxsize=50)
+        transport = PangeaTransport(config)
+
+        audit = Audit(token=PANGEA_TOKEN, config=config, transport=transport)
+        redact = Redact(token=PANGEA_TOKEN, config=config, transport=transport)
+    """
+
+    def __init__(self, config: PangeaConfig = None):
+        self.config = config if config else PangeaConfig()
+        self.session = self._init_session()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: t.Tuple[float, float],
+        expires_at: t.Optional[float] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Sends a request, retrying the attempts that failed with exponential backoff.
+
+        Failures to connect are retried for every method, read errors only for
+        idempotent methods. With `expires_at`, the timeouts of each attempt are
+        capped to the time left and no retry is started past it.
+
+        Args:
+            method (str): HTTP method
+            url (str): request URL
+            timeout (tuple): (connect, read) timeouts of each attempt
+            expires_at (float, optional): `time.monotonic()` expiry of the whole call
+            **kwargs: passed to `requests.Session.request`
+
+        Raises:
+            PangeaTimeoutError: if the deadline is exceeded before an attempt
+            requests.exceptions.RequestException: the error of the last attempt
+        """
+        attempt = 0
+        while True:
+            try:
+                return self.session.request(method, url, timeout=capped_timeouts(timeout, expires_at), **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.config.request_retries or not _retryable(method, e):
+                    raise
+
+                attempt += 1
+                delay = self._backoff(attempt)
+                if expires_at is not None and time.monotonic() + delay >= expires_at:
+                    raise
+
+                time.sleep(delay)
+
+    def close(self):
+        """Closes all the pooled connections"""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _backoff(self, retry: int) -> float:
+        return retry_delay(self.config.request_backoff, retry)
+
+    def _init_session(self) -> requests.Session:
+        # retries are done by request(), where they can be bounded by a deadline
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            pool_block=self.config.pool_block,
+            max_retries=0,
+        )
+        session = requests.Session()
+
+        # mounted on both schemes, clients with different `insecure` settings can share it
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        return session
+
+
+def _connect_failed(error: requests.exceptions.RequestException) -> bool:
+    """True if the request failed before reaching the server (connection refused, DNS, connect timeout)"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _retryable(method: str, error: requests.exceptions.RequestException) -> bool:
+    return _connect_failed(error) or idempotent(method)
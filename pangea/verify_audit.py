@@ -10,27 +10,28 @@ In the latter case, all the events are verified.
 """
 
 import argparse
-import json
 import logging
 import sys
 import typing as t
 from base64 import b64decode
 
-
+from pangea.codec import get_codec, set_default_codec
 from pangea.services.audit_util import (
     canonicalize_json,
-    decode_consistency_proof,
+    decode_compact_consistency_proof,
     decode_hash,
     hash_bytes,
-    decode_membership_proof,
+    decode_compact_membership_proof,
     get_arweave_published_roots,
     verify_consistency_proof,
     verify_membership_proof,
 )
-from pangea.signing import Signing
+from pangea.services.root_store import RootStore, default_root_store
+from pangea.signing import verify_message
+from pangea.tools_util import add_json_codec_argument, add_root_store_argument
 
 logger = logging.getLogger("audit")
-pub_roots: t.Dict[int, dict] = {}
+root_store: RootStore = default_root_store()
 
 
 class VerifierLogFormatter(logging.Formatter):
@@ -100,9 +101,27 @@ def _verify_hash(data: dict, data_hash: str) -> t.Optional[bool]:
     return succeeded
 
 
-def _verify_membership_proof(tree_name: str, tree_size: int, node_hash: str, proof: t.Optional[str]) -> t.Optional[bool]:
-    global pub_roots
+def _published_roots(tree_name: str, tree_sizes: t.List[int]) -> t.Dict[int, dict]:
+    """Returns the published roots of the given sizes, from the root store or from Arweave"""
+    # roots given by the server are not trusted here
+    pub_roots = {
+        tree_size: root
+        for tree_size, root in root_store.get_many(tree_name, tree_sizes).items()
+        if root.get("source") == "arweave"
+    }
+    missing = [tree_size for tree_size in tree_sizes if tree_size not in pub_roots]
+    if missing:
+        logger.debug("Fetching published roots from Arweave")
+        arweave_roots = {
+            int(k): v | {"source": "arweave"} for k, v in get_arweave_published_roots(tree_name, missing).items()
+        }
+        root_store.put_many(tree_name, arweave_roots)
+        pub_roots |= arweave_roots
+
+    return pub_roots
+
 
+def _verify_membership_proof(tree_name: str, tree_size: int, node_hash: str, proof: t.Optional[str]) -> t.Optional[bool]:
     log_section("Checking membership proof")
 
     if proof is None:
@@ -110,16 +129,14 @@ def _verify_membership_proof(tree_name: str, tree_size: int, node_hash: str, pro
         logger.debug("Proof not found (event not published yet)")
     else:
         try:
-            logger.debug("Fetching published roots from Arweave")
-            if tree_size not in pub_roots:
-                pub_roots |= {int(k): v for k, v in get_arweave_published_roots(tree_name, [tree_size]).items()}
+            pub_roots = _published_roots(tree_name, [tree_size])
             if tree_size not in pub_roots:
                 raise ValueError("Published root could was not found")
 
             root_hash_dec = decode_hash(pub_roots[tree_size]["root_hash"])
             node_hash_dec = decode_hash(node_hash)
             logger.debug("Calculating the proof")
-            proof_dec = decode_membership_proof(proof)
+            proof_dec = decode_compact_membership_proof(proof)
             logger.debug("Comparing the root hash with the proof hash")
             succeeded = verify_membership_proof(node_hash_dec, root_hash_dec, proof_dec)
         except Exception as e:
@@ -132,8 +149,6 @@ def _verify_membership_proof(tree_name: str, tree_size: int, node_hash: str, pro
 
 
 def _verify_consistency_proof(tree_name: str, leaf_index: t.Optional[int]) -> t.Optional[bool]:
-    global pub_roots
-
     log_section("Checking consistency proof")
 
     if leaf_index is None:
@@ -145,10 +160,7 @@ def _verify_consistency_proof(tree_name: str, leaf_index: t.Optional[int]) -> t.
         logger.debug("Proof not found (event was published in the first leaf)")
     else:
         try:
-            logger.debug("Fetching published roots from Arweave")
-            pub_roots |= {
-                int(k): v for k, v in get_arweave_published_roots(tree_name, [leaf_index + 1, leaf_index]).items()
-            }
+            pub_roots = _published_roots(tree_name, [leaf_index + 1, leaf_index])
             if leaf_index + 1 not in pub_roots or leaf_index not in pub_roots:
                 raise ValueError("Published roots could not be retrieved")
 
@@ -157,7 +169,7 @@ def _verify_consistency_proof(tree_name: str, leaf_index: t.Optional[int]) -> t.
             curr_root_hash = decode_hash(curr_root["root_hash"])
             prev_root_hash = decode_hash(prev_root["root_hash"])
             logger.debug("Calculating the proof")
-            proof = decode_consistency_proof(curr_root["consistency_proof"])
+            proof = decode_compact_consistency_proof(curr_root["consistency_proof"])
             succeeded = verify_consistency_proof(curr_root_hash, prev_root_hash, proof)
 
         except Exception as e:
@@ -184,9 +196,8 @@ def _verify_signature(data: dict) -> t.Optional[bool]:
             sign_envelope = create_signed_envelope(data["event"])
             public_key_b64 = data["public_key"]
             public_key_bytes = b64decode(public_key_b64)
-            sign = Signing(hash_message=True)
             logger.debug("Checking the signature")
-            if not sign.verifyMessage(data["signature"], sign_envelope, public_key_bytes):
+            if not verify_message(data["signature"], sign_envelope, public_key_bytes, hash_message=True):
                 raise ValueError("Signature is invalid")                
             succeeded = True
         except Exception:
@@ -243,6 +254,8 @@ def verify_single(data: dict, counter: t.Optional[int] = None) -> t.Optional[boo
 
 
 def main():
+    global root_store
+
     handler = logging.StreamHandler()
     handler.setFormatter(formatter)
     logger.addHandler(handler)
@@ -257,9 +270,14 @@ def main():
         metavar="PATH",
         help="Input file (default: standard input).",
     )
+    add_json_codec_argument(parser)
+    add_root_store_argument(parser)
     args = parser.parse_args()
 
-    data = json.load(args.file)
+    set_default_codec(args.json_codec)
+    if args.root_store:
+        root_store = RootStore(args.root_store)
+    data = get_codec().loads(args.file.read())
     events = data.get("result", {}).get("events", [])
 
     logger.info("Pangea Audit - Verification Tool")
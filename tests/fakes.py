@@ -0,0 +1,119 @@
+import asyncio
+import hashlib
+import http
+import json
+import threading
+import typing as t
+from urllib.parse import urlparse
+
+import requests
+
+
+def fake_response(status_code: int, body: t.Any) -> requests.Response:
+    """A requests.Response with a JSON body, as returned by the transport"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.reason = http.HTTPStatus(status_code).phrase
+    response._content = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    return response
+
+
+class FakeServer(object):
+    """Stands in for `requests.Session.request`, answering with `handler(method, path, body)`.
+
+    The handler returns a (status_code, body) tuple or a requests.Response, or
+    raises to simulate a transport error. Calls are recorded in `calls` as
+    (method, path, decoded body) tuples.
+    """
+
+    def __init__(self, handler: t.Callable[[str, str, t.Any], t.Any]):
+        self.handler = handler
+        self.calls: t.List[t.Tuple[str, str, t.Any]] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, method, url, headers=None, timeout=None, data=None, **kwargs):
+        path = urlparse(url).path
+        body = json.loads(data) if data else kwargs.get("json")
+
+        with self.lock:
+            self.calls.append((method, path, body))
+
+        result = self.handler(method, path, body)
+        if isinstance(result, requests.Response):
+            return result
+
+        status_code, payload = result
+        return fake_response(status_code, payload)
+
+    def bodies(self, path: str) -> t.List[t.Any]:
+        with self.lock:
+            return [body for _, call_path, body in self.calls if call_path == path]
+
+
+def event_hash(record: dict) -> str:
+    return hashlib.sha256(record["event"]["message"].encode("utf-8")).hexdigest()
+
+
+def log_handler(method: str, path: str, body: t.Any):
+    """Audit `log` endpoint answering one result per event, with a hash of its message"""
+    results = [{"hash": event_hash(record)} for record in body["events"]]
+    return 200, {"request_id": "prq_log", "status": "Success", "result": {"results": results}}
+
+
+class FakeAsyncResponse(object):
+    """The subset of `aiohttp.ClientResponse` read by AsyncPangeaRequest"""
+
+    def __init__(self, status: int, content: bytes):
+        self.status = status
+        self.reason = http.HTTPStatus(status).phrase
+        self.content = content
+
+    async def read(self) -> bytes:
+        return self.content
+
+
+class _FakeAsyncRequest(object):
+    def __init__(self, session: "FakeAsyncSession", method: str, url: str, data: t.Optional[bytes]):
+        self.session = session
+        self.method = method
+        self.url = url
+        self.data = data
+
+    async def __aenter__(self) -> FakeAsyncResponse:
+        path = urlparse(self.url).path
+        body = json.loads(self.data) if self.data else None
+        self.session.calls.append((self.method, path, body))
+
+        result = self.session.handler(self.method, path, body)
+        if asyncio.iscoroutine(result):
+            result = await result
+
+        status_code, payload = result
+        return FakeAsyncResponse(status_code, payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+class FakeAsyncSession(object):
+    """Stands in for the `aiohttp.ClientSession` of an AsyncPangeaTransport, see FakeServer.
+
+    The handler may also be a coroutine function. The timeouts of the requests
+    are recorded in `timeouts`.
+    """
+
+    def __init__(self, handler: t.Callable[[str, str, t.Any], t.Any]):
+        self.handler = handler
+        self.calls: t.List[t.Tuple[str, str, t.Any]] = []
+        self.timeouts: list = []
+        self.closed = False
+
+    def request(self, method, url, headers=None, data=None, timeout=None, **kwargs) -> _FakeAsyncRequest:
+        self.timeouts.append(timeout)
+        return _FakeAsyncRequest(self, method, url, data)
+
+    async def close(self):
+        self.closed = True
+
+    def bodies(self, path: str) -> t.List[t.Any]:
+        return [body for _, call_path, body in self.calls if call_path == path]
@@ -0,0 +1,173 @@
+import re
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pangea.config import PangeaConfig
+from pangea.services.arweave import ArweaveClient
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeServer, fake_response
+
+
+def published_root(tree_size: int) -> dict:
+    return {"tree_name": "tree", "size": tree_size, "root_hash": f"{tree_size:064x}"}
+
+
+class ArweaveServer(object):
+    """Arweave GraphQL and transaction endpoints, answering `page_size` transactions per query page.
+
+    Each published size has one transaction `tx-{size}`, except the ones in
+    `republished`, which have a broken `tx-{size}-a` before it.
+    """
+
+    def __init__(self, published, page_size=2, pending=(), republished=()):
+        self.published = set(published)
+        self.page_size = page_size
+        self.pending = set(pending)
+        self.republished = set(republished)
+        self.queries = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def transactions(self, tree_sizes):
+        for tree_size in tree_sizes:
+            if tree_size in self.published:
+                if tree_size in self.republished:
+                    yield f"tx-{tree_size}-a", tree_size
+                yield f"tx-{tree_size}", tree_size
+
+    def __call__(self, method, path, body):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(0.005)
+            if path == "/graphql":
+                return self.graphql(body["query"])
+            return self.transaction(path.strip("/"))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def graphql(self, query):
+        tree_sizes = [
+            int(size) for size in re.search(r"values: \[([^\]]*)\]", query).group(1).replace('"', "").split(",")
+        ]
+        after = re.search(r'after: "([^"]*)"', query)
+        start = int(after.group(1)) + 1 if after else 0
+
+        with self.lock:
+            self.queries.append((tree_sizes, after.group(1) if after else None))
+
+        transactions = list(self.transactions(tree_sizes))
+        page = transactions[start : start + self.page_size]
+        edges = [
+            {
+                "cursor": str(start + i),
+                "node": {"id": trans_id, "tags": [{"name": "tree_size", "value": str(tree_size)}]},
+            }
+            for i, (trans_id, tree_size) in enumerate(page)
+        ]
+        has_next = start + self.page_size < len(transactions)
+        return 200, {"data": {"transactions": {"pageInfo": {"hasNextPage": has_next}, "edges": edges}}}
+
+    def transaction(self, trans_id):
+        if trans_id.endswith("-a"):
+            return 404, {}
+
+        tree_size = int(trans_id.split("-")[1])
+        if tree_size in self.pending:
+            return fake_response(200, b"Pending")
+        return 200, published_root(tree_size)
+
+
+class TestArweaveClient(unittest.TestCase):
+    def client(self, server, **kwargs) -> ArweaveClient:
+        transport = PangeaTransport(PangeaConfig(request_retries=0))
+        patcher = mock.patch.object(transport.session, "request", side_effect=FakeServer(server))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        client = ArweaveClient(transport=transport, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_chunking(self):
+        server = ArweaveServer(published=range(1, 9), page_size=100)
+        client = self.client(server, sizes_per_query=3)
+
+        roots = client.published_roots("tree", [8, 1, 2, 3, 4, 5, 6, 7, 2])
+
+        self.assertEqual(roots, {size: published_root(size) for size in range(1, 9)})
+        self.assertEqual(sorted(sizes for sizes, _ in server.queries), [[1, 2, 3], [4, 5, 6], [7, 8]])
+
+    def test_cursor_pagination(self):
+        server = ArweaveServer(published=range(1, 6), page_size=2)
+        client = self.client(server)
+
+        transactions = client.transactions("tree", [1, 2, 3, 4, 5])
+
+        self.assertEqual(transactions, {size: [f"tx-{size}"] for size in range(1, 6)})
+        # each page continues after the cursor of the last edge of the previous one
+        self.assertEqual([cursor for _, cursor in server.queries], [None, "1", "3"])
+
+    def test_query(self):
+        client = ArweaveClient()
+        self.addCleanup(client.close)
+
+        query = client._query('tree "1"', [1, 2], "cursor-1")
+        self.assertIn('values: ["1", "2"]', query)
+        self.assertIn('values: ["tree \\"1\\""]', query)
+        self.assertIn('after: "cursor-1"', query)
+        self.assertNotIn("after", client._query("tree", [1], None))
+
+    def test_missing_and_pending(self):
+        server = ArweaveServer(published=[1, 2, 3], pending=[2])
+        client = self.client(server)
+
+        roots = client.published_roots("tree", [1, 2, 3, 4])
+        self.assertEqual(sorted(roots), [1, 3])
+
+    def test_republished(self):
+        # the first transaction of size 2 cannot be fetched, the next one is used
+        server = ArweaveServer(published=[1, 2], republished=[2])
+        client = self.client(server)
+
+        self.assertEqual(client.transactions("tree", [1, 2]), {1: ["tx-1"], 2: ["tx-2-a", "tx-2"]})
+        self.assertEqual(client.published_roots("tree", [1, 2]), {1: published_root(1), 2: published_root(2)})
+
+    def test_concurrency(self):
+        server = ArweaveServer(published=range(1, 41), page_size=100)
+        client = self.client(server, max_workers=4, sizes_per_query=5)
+
+        roots = client.published_roots("tree", range(1, 41))
+        self.assertEqual(len(roots), 40)
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 4)
+
+    def test_query_error(self):
+        server = ArweaveServer(published=range(1, 6), page_size=2)
+        client = self.client(server)
+
+        graphql = server.graphql
+        server.graphql = lambda query: graphql(query) if not server.queries else (502, {})
+
+        # the transactions found before the error are kept
+        self.assertEqual(client.transactions("tree", [1, 2, 3, 4, 5]), {1: ["tx-1"], 2: ["tx-2"]})
+
+    def test_empty(self):
+        client = self.client(ArweaveServer(published=[]))
+        self.assertEqual(client.published_roots("tree", []), {})
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(Exception):
+            ArweaveClient(max_workers=0)
+        with self.assertRaises(Exception):
+            ArweaveClient(sizes_per_query=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
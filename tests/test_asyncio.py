@@ -0,0 +1,486 @@
+import asyncio
+import functools
+import time
+import unittest
+from unittest import mock
+
+import aiohttp
+from aiohttp import test_utils, web
+
+from pangea.asyncio.request import AsyncPangeaRequest
+from pangea.asyncio.services import (
+    AsyncAudit,
+    AsyncDomainIntel,
+    AsyncEmbargo,
+    AsyncFileIntel,
+    AsyncIpIntel,
+    AsyncRedact,
+    AsyncSecrets,
+    AsyncUrlIntel,
+)
+from pangea.asyncio.transport import AsyncPangeaTransport
+from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+from pangea.services import Audit, DomainIntel, Embargo, FileIntel, IpIntel, Redact, Secrets, UrlIntel
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeAsyncSession, FakeServer, log_handler
+from tests.test_audit_search import COUNT, SearchServer
+from tests.test_request import refusing_port
+
+
+def async_test(func):
+    """Runs an `async def` test method in a new event loop"""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return asyncio.run(func(self, *args, **kwargs))
+
+    return wrapper
+
+
+def connect_timeout() -> aiohttp.ServerTimeoutError:
+    # raised by aiohttp when no connection could be made in time
+    error_class = getattr(aiohttp, "ConnectionTimeoutError", aiohttp.ServerTimeoutError)
+    return error_class("Connection timeout to host https://test.pangea.test/v1/test")
+
+
+class TestAsyncRequestRetries(unittest.TestCase):
+    def request(self, handler=None, **kwargs) -> AsyncPangeaRequest:
+        config = PangeaConfig(domain="pangea.test", **kwargs)
+        request = AsyncPangeaRequest(config, "token", "v1", "test")
+        if handler is not None:
+            request.transport._session = FakeAsyncSession(handler)
+        return request
+
+    def failing(self, error: Exception, **kwargs) -> AsyncPangeaRequest:
+        def handler(method, path, body):
+            raise error
+
+        return self.request(handler, **kwargs)
+
+    def sleeps(self) -> list:
+        delays: list = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        patcher = mock.patch("pangea.asyncio.request.asyncio.sleep", side_effect=sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return delays
+
+    @async_test
+    async def test_post_not_resent_after_disconnect(self):
+        # the server may have received the POST, it is not sent again
+        request = self.failing(aiohttp.ServerDisconnectedError(), request_retries=3, request_backoff=0)
+
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await request.post("test", data={})
+        self.assertEqual(len(request.transport.session.calls), 1)
+
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await request.get("request", "prq_1")
+        self.assertEqual(len(request.transport.session.calls), 5)
+
+    @async_test
+    async def test_connection_refused(self):
+        config = PangeaConfig(
+            domain=f"127.0.0.1:{refusing_port()}", environment="local", request_retries=2, request_backoff=0
+        )
+        request = AsyncPangeaRequest(config, "token", "v1", "test")
+        session = request.transport.session
+        request.transport._session = mock.Mock(wraps=session, closed=False)
+
+        try:
+            with self.assertRaises(aiohttp.ClientConnectorError) as cm:
+                await request.post("test", data={})
+        finally:
+            await session.close()
+
+        self.assertNotIsInstance(cm.exception, PangeaTimeoutError)
+        # a refused connection never reached the server, the POST is retried
+        self.assertEqual(request.transport._session.request.call_count, 3)
+
+    @async_test
+    async def test_connect_timeout(self):
+        request = self.failing(connect_timeout(), request_retries=2, request_backoff=0)
+
+        with self.assertRaises(PangeaTimeoutError):
+            await request.post("test", data={})
+        self.assertEqual(len(request.transport.session.calls), 3)
+
+    @async_test
+    async def test_read_timeout(self):
+        request = self.failing(asyncio.TimeoutError(), request_retries=2, request_backoff=0)
+
+        with self.assertRaises(PangeaTimeoutError):
+            await request.post("test", data={})
+        self.assertEqual(len(request.transport.session.calls), 1)
+
+        with self.assertRaises(PangeaTimeoutError):
+            await request.get("request", "prq_1")
+        self.assertEqual(len(request.transport.session.calls), 4)
+
+    @async_test
+    async def test_backoff(self):
+        delays = self.sleeps()
+        request = self.failing(connect_timeout(), request_retries=4, request_backoff=1)
+
+        with self.assertRaises(PangeaTimeoutError):
+            await request.post("test", data={})
+
+        # same schedule as the blocking transport
+        self.assertEqual(delays, [0, 2, 4, 8])
+
+    @async_test
+    async def test_deadline_covers_retries(self):
+        delays = self.sleeps()
+        request = self.failing(aiohttp.ServerDisconnectedError(), request_retries=3, request_backoff=1)
+
+        start = time.monotonic()
+        with self.assertRaises(aiohttp.ServerDisconnectedError):
+            await request.get("request", "prq_1", deadline=1.0)
+
+        # the second retry would only start after 2 seconds
+        self.assertEqual(delays, [0])
+        self.assertEqual(len(request.transport.session.calls), 2)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+
+def ok_handler(method, path, body):
+    return 200, {"request_id": "prq_1", "status": "Success", "result": {"path": path}}
+
+
+class AsyncTestCase(unittest.TestCase):
+    config = PangeaConfig(domain="pangea.test")
+
+    def client(self, client_class, handler, **kwargs):
+        """A client of `client_class` whose requests are answered by `handler`"""
+        client = client_class("token", config=self.config, **kwargs)
+        client.request.transport._session = FakeAsyncSession(handler)
+        return client
+
+    def sleeps(self) -> list:
+        delays: list = []
+
+        async def sleep(delay):
+            delays.append(delay)
+
+        patcher = mock.patch("pangea.asyncio.request.asyncio.sleep", side_effect=sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return delays
+
+
+class TestAsyncRequest(AsyncTestCase):
+    @async_test
+    async def test_post_and_get(self):
+        redact = self.client(AsyncRedact, ok_handler)
+
+        response = await redact.redact("Jenny")
+        self.assertTrue(response.success)
+        self.assertEqual(response.result.path, "/v1/redact")
+
+        response = await redact.request.get("request", "prq_1")
+        self.assertEqual(response.result.path, "/v1/request/prq_1")
+
+        self.assertEqual(
+            redact.request.transport.session.calls,
+            [("POST", "/v1/redact", {"text": "Jenny", "debug": False}), ("GET", "/v1/request/prq_1", None)],
+        )
+
+    @async_test
+    async def test_error_response(self):
+        redact = self.client(AsyncRedact, lambda method, path, body: (400, {"status": "ValidationError"}))
+
+        response = await redact.redact("Jenny")
+        self.assertFalse(response.success)
+        self.assertEqual(response.code, 400)
+        self.assertEqual(response.status, "Bad Request")
+
+    @async_test
+    async def test_queued(self):
+        delays = self.sleeps()
+        progress = iter([202, 202, 200])
+
+        def handler(method, path, body):
+            if path == "/v1/redact":
+                return 202, {"request_id": "prq_1", "status": "Accepted"}
+            return next(progress), {"request_id": "prq_1", "result": {"redacted_text": "<PERSON>"}}
+
+        redact = self.client(AsyncRedact, handler)
+        response = await redact.redact("Jenny")
+
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.result.redacted_text, "<PERSON>")
+        self.assertEqual([path for _, path, _ in redact.request.transport.session.calls][1:], ["/v1/request/prq_1"] * 3)
+        # same progress check schedule as the blocking request
+        self.assertEqual(delays, [1, 4, 9])
+
+    @async_test
+    async def test_queued_deadline(self):
+        redact = self.client(AsyncRedact, lambda method, path, body: (202, {"request_id": "prq_1"}))
+
+        start = time.monotonic()
+        with self.assertRaises(PangeaTimeoutError):
+            await redact.redact("Jenny", deadline=0.5)
+
+        # the first progress check would be after the deadline, it is not waited for
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(len(redact.request.transport.session.calls), 1)
+
+    @async_test
+    async def test_timeouts_capped_to_deadline(self):
+        config = PangeaConfig(domain="pangea.test", request_timeout=5, connect_timeout=4)
+        request = AsyncPangeaRequest(config, "token", "v1", "test")
+        request.transport._session = FakeAsyncSession(ok_handler)
+
+        await request.post("test", data={}, deadline=0.5)
+        await request.post("test", data={})
+
+        capped, default = request.transport.session.timeouts
+        self.assertLessEqual(capped.total, 0.5)
+        self.assertLessEqual(capped.connect, 0.5)
+        self.assertLessEqual(capped.sock_read, 0.5)
+        self.assertEqual((default.total, default.connect, default.sock_read), (None, 4, 5))
+
+    @async_test
+    async def test_deadline_exceeded(self):
+        redact = self.client(AsyncRedact, ok_handler)
+
+        with self.assertRaises(PangeaTimeoutError):
+            await redact.redact("Jenny", deadline=0)
+        self.assertEqual(redact.request.transport.session.calls, [])
+
+
+class TestAsyncServer(unittest.TestCase):
+    """Requests to a local aiohttp server"""
+
+    async def start_server(self, delay: float = 0) -> test_utils.TestServer:
+        self.peers = set()
+
+        async def handle(request: web.Request) -> web.Response:
+            self.peers.add(request.transport.get_extra_info("peername"))
+            await request.read()
+            await asyncio.sleep(delay)
+            return web.json_response({"request_id": "prq_1", "status": "Success", "result": {"path": request.path}})
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handle)
+        server = test_utils.TestServer(app, host="127.0.0.1")
+        await server.start_server()
+        return server
+
+    @async_test
+    async def test_shared_connection(self):
+        server = await self.start_server()
+        try:
+            config = PangeaConfig(domain=f"127.0.0.1:{server.port}", environment="local", insecure=True)
+            async with AsyncPangeaTransport(config) as transport:
+                redact = AsyncRedact("token", config=config, transport=transport)
+                embargo = AsyncEmbargo("token", config=config, transport=transport)
+
+                for _ in range(3):
+                    self.assertEqual((await redact.redact("Jenny")).result.path, "/v1/redact")
+                    self.assertEqual((await embargo.ip_check("1.1.1.1")).result.path, "/v1/ip/check")
+        finally:
+            await server.close()
+
+        # six requests from two services over a single kept-alive connection
+        self.assertEqual(len(self.peers), 1)
+
+    @async_test
+    async def test_read_timeout(self):
+        server = await self.start_server(delay=1.0)
+        try:
+            config = PangeaConfig(
+                domain=f"127.0.0.1:{server.port}", environment="local", insecure=True, request_timeout=0.2
+            )
+            async with AsyncRedact("token", config=config) as redact:
+                start = time.monotonic()
+                with self.assertRaises(PangeaTimeoutError):
+                    await redact.redact("Jenny")
+                self.assertLess(time.monotonic() - start, 1.0)
+
+                with self.assertRaises(PangeaTimeoutError):
+                    await redact.redact("Jenny", deadline=0.1)
+        finally:
+            await server.close()
+
+
+class TestAsyncClose(AsyncTestCase):
+    @async_test
+    async def test_context_manager(self):
+        async with self.client(AsyncRedact, ok_handler) as redact:
+            session = redact.request.transport.session
+            await redact.redact("Jenny")
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(redact.request.transport._session)
+
+    @async_test
+    async def test_shared_transport_left_open(self):
+        async with AsyncPangeaTransport(self.config) as transport:
+            transport._session = session = FakeAsyncSession(ok_handler)
+
+            redact = AsyncRedact("token", config=self.config, transport=transport)
+            await redact.redact("Jenny")
+            await redact.close()
+            self.assertFalse(session.closed)
+
+            async with AsyncEmbargo("token", config=self.config, transport=transport) as embargo:
+                await embargo.ip_check("1.1.1.1")
+            self.assertFalse(session.closed)
+
+        self.assertTrue(session.closed)
+        self.assertEqual(len(session.calls), 2)
+
+    @async_test
+    async def test_session_created_again(self):
+        transport = AsyncPangeaTransport(self.config)
+        first = transport.session
+        self.assertIs(transport.session, first)
+
+        await transport.close()
+        self.assertTrue(first.closed)
+
+        second = transport.session
+        self.assertIsNot(second, first)
+        await transport.close()
+
+
+class TestAsyncServices(AsyncTestCase):
+    @async_test
+    async def test_same_requests_as_blocking_clients(self):
+        calls = [
+            (Redact, AsyncRedact, "redact", ("Jenny",)),
+            (Redact, AsyncRedact, "redact_structured", ({"name": "Jenny"},)),
+            (Embargo, AsyncEmbargo, "ip_check", ("1.1.1.1",)),
+            (Embargo, AsyncEmbargo, "iso_check", ("CU",)),
+            (
+                FileIntel,
+                AsyncFileIntel,
+                "lookup",
+                ("142b638c6a60b60c7f9928da4fb85a5a8e1422a9ffdc9ee49e17e56ccca9cf6e", "sha256"),
+            ),
+            (IpIntel, AsyncIpIntel, "lookup", ("93.231.182.110",)),
+            (UrlIntel, AsyncUrlIntel, "lookup", ("http://113.235.101.11:54384",)),
+            (DomainIntel, AsyncDomainIntel, "lookup", ("737updatesboeing.com",)),
+            (Secrets, AsyncSecrets, "get", ("secret-1",)),
+            (Secrets, AsyncSecrets, "add", ("secret-1", "value")),
+            (Secrets, AsyncSecrets, "update", ("secret-1", "value")),
+            (Audit, AsyncAudit, "log", ({"message": "hello", "actor": "me"},)),
+            (Audit, AsyncAudit, "root", ()),
+        ]
+
+        for client_class, async_class, method, args in calls:
+            with self.subTest(client=async_class.__name__, method=method):
+                transport = PangeaTransport(self.config)
+                server = FakeServer(ok_handler)
+                with mock.patch.object(transport.session, "request", side_effect=server):
+                    getattr(client_class("token", config=self.config, transport=transport), method)(*args)
+
+                async with self.client(async_class, ok_handler) as client:
+                    response = await getattr(client, method)(*args)
+                    self.assertTrue(response.success)
+                    self.assertEqual(client.request.transport.session.calls, server.calls)
+
+
+class AsyncSearchServer(SearchServer):
+    """`SearchServer` answering the result pages without blocking the event loop"""
+
+    async def __call__(self, method, path, body):
+        if path == "/v1/search":
+            return 200, {"request_id": "prq_search", "result": self.page(0, body["limit"])}
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # later pages are answered faster, so that they complete out of order
+            await asyncio.sleep(0.002 * (COUNT - body["offset"]))
+            if body["offset"] == self.fail_offset:
+                return 500, {"request_id": "prq_results", "status": "InternalError"}
+            return 200, {"request_id": "prq_results", "result": self.page(body["offset"], body["limit"])}
+        finally:
+            self.in_flight -= 1
+
+
+class TestAsyncAudit(AsyncTestCase):
+    def setUp(self):
+        self.search_server = AsyncSearchServer()
+        self.handler = self.search_server
+
+    def result_offsets(self, audit) -> list:
+        return [body["offset"] for body in audit.request.transport.session.bodies("/v1/results")]
+
+    @async_test
+    async def test_log(self):
+        async with self.client(AsyncAudit, log_handler) as audit:
+            response = await audit.log_bulk([{"message": f"event {i}"} for i in range(3)])
+            self.assertTrue(response.success)
+            self.assertEqual(len(response.result.results), 3)
+
+        async with self.client(AsyncAudit, ok_handler) as audit:
+            response = await audit.log({"message": "hello", "actor": "me"}, verbose=True)
+            self.assertTrue(response.success)
+            ((method, path, body),) = audit.request.transport.session.calls
+            self.assertEqual((method, path), ("POST", "/v1/log"))
+            self.assertEqual(body["event"], {"message": "hello", "actor": "me"})
+            self.assertTrue(body["verbose"])
+
+    @async_test
+    async def test_search_iter(self):
+        for prefetch in (0, 1, 3):
+            with self.subTest(prefetch=prefetch):
+                async with self.client(AsyncAudit, self.handler) as audit:
+                    events = [event async for event in audit.search_iter(page_size=5, prefetch=prefetch)]
+
+                    self.assertEqual(
+                        [event.envelope.event.message for event in events], [f"event {i}" for i in range(COUNT)]
+                    )
+                    self.assertEqual(sorted(self.result_offsets(audit)), [5, 10, 15, 20])
+
+    @async_test
+    async def test_search_iter_prefetch(self):
+        async with self.client(AsyncAudit, self.handler) as audit:
+            [event async for event in audit.search_iter(page_size=2, prefetch=4)]
+        self.assertGreater(self.search_server.max_in_flight, 1)
+        self.assertLessEqual(self.search_server.max_in_flight, 4)
+
+    @async_test
+    async def test_search_iter_page_error(self):
+        self.search_server.fail_offset = 10
+        received = []
+
+        async with self.client(AsyncAudit, self.handler) as audit:
+            with self.assertRaises(Exception):
+                async for event in audit.search_iter(page_size=5, prefetch=2):
+                    received.append(event.envelope.event.message)
+
+        # the pages before the failed one were yielded in full
+        self.assertEqual(received, [f"event {i}" for i in range(10)])
+
+    @async_test
+    async def test_results_all(self):
+        for concurrency in (1, 4):
+            with self.subTest(concurrency=concurrency):
+                self.search_server.max_in_flight = 0
+                async with self.client(AsyncAudit, self.handler) as audit:
+                    pages = audit.results_all("pas_1", COUNT, concurrency=concurrency, limit=3, offset=3)
+                    messages = [event.envelope.event.message async for page in pages for event in page.result.events]
+
+                    self.assertEqual(messages, [f"event {i}" for i in range(3, COUNT)])
+                    self.assertEqual(sorted(self.result_offsets(audit)), list(range(3, COUNT, 3)))
+                    self.assertLessEqual(self.search_server.max_in_flight, concurrency)
+
+        self.assertGreater(self.search_server.max_in_flight, 1)
+
+    @async_test
+    async def test_results_all_invalid_concurrency(self):
+        async with self.client(AsyncAudit, self.handler) as audit:
+            with self.assertRaises(Exception):
+                [page async for page in audit.results_all("pas_1", COUNT, concurrency=0)]
+
+
+if __name__ == "__main__":
+    unittest.main()
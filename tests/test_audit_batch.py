@@ -0,0 +1,146 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from pangea.config import PangeaConfig
+from pangea.services import Audit
+from pangea.services.audit_batch import AuditBatcher, _record_size
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeServer, event_hash, log_handler
+
+
+class TestAuditBatcher(unittest.TestCase):
+    def setUp(self):
+        config = PangeaConfig(domain="pangea.test")
+        self.transport = PangeaTransport(config)
+        self.audit = Audit("token", config=config, transport=self.transport)
+
+        self.server = FakeServer(log_handler)
+        patcher = mock.patch.object(self.transport.session, "request", side_effect=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.transport.close)
+
+    def batch_sizes(self):
+        return [len(body["events"]) for body in self.server.bodies("/v1/log")]
+
+    def test_flush_on_count(self):
+        batcher = AuditBatcher(self.audit, max_events=3, max_age=None)
+        futures = [batcher.add({"message": f"event {i}"}) for i in range(7)]
+
+        self.assertEqual(self.batch_sizes(), [3, 3])
+        self.assertFalse(futures[6].done())
+
+        batcher.flush()
+        self.assertEqual(self.batch_sizes(), [3, 3, 1])
+
+        # results are matched to their own event
+        for i, future in enumerate(futures):
+            self.assertEqual(future.result(timeout=1).hash, event_hash({"event": {"message": f"event {i}"}}))
+
+    def test_flush_on_bytes(self):
+        record = self.audit._log_record({"message": "event 0"}, signing=False)
+        batcher = AuditBatcher(self.audit, max_events=100, max_bytes=int(_record_size(record) * 2.5), max_age=None)
+
+        futures = [batcher.add({"message": f"event {i}"}) for i in range(5)]
+        # a third event would go over max_bytes, the batch is sent without it
+        self.assertEqual(self.batch_sizes(), [2, 2])
+
+        batcher.close()
+        self.assertEqual(self.batch_sizes(), [2, 2, 1])
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_flush_on_age(self):
+        batcher = AuditBatcher(self.audit, max_events=100, max_age=0.05)
+
+        start = time.monotonic()
+        futures = [batcher.add({"message": f"event {i}"}) for i in range(3)]
+        results = [future.result(timeout=5) for future in futures]
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(self.batch_sizes(), [3])
+        self.assertEqual(len(results), 3)
+
+        # the timer starts again with the next batch
+        batcher.add({"message": "event 3"}).result(timeout=5)
+        self.assertEqual(self.batch_sizes(), [3, 1])
+        batcher.close()
+
+    def test_timer_after_count_flush(self):
+        # the timer of a batch already sent on count must not send the next one early
+        batcher = AuditBatcher(self.audit, max_events=2, max_age=0.2)
+        batcher.add({"message": "event 0"})
+        batcher.add({"message": "event 1"})
+        future = batcher.add({"message": "event 2"})
+
+        time.sleep(0.1)
+        self.assertFalse(future.done())
+        future.result(timeout=5)
+        self.assertEqual(self.batch_sizes(), [2, 1])
+        batcher.close()
+
+    def test_concurrent_add(self):
+        batcher = AuditBatcher(self.audit, max_events=10, max_age=0.05)
+        futures = []
+        lock = threading.Lock()
+
+        def add(n):
+            for i in range(50):
+                future = batcher.add({"message": f"thread {n} event {i}"})
+                with lock:
+                    futures.append(future)
+
+        threads = [threading.Thread(target=add, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        batcher.close()
+
+        self.assertEqual(sum(self.batch_sizes()), 200)
+        self.assertTrue(all(size <= 10 for size in self.batch_sizes()))
+        self.assertEqual(len({future.result(timeout=1).hash for future in futures}), 200)
+
+    def test_error_response(self):
+        self.server.handler = lambda method, path, body: (500, {"status": "InternalError"})
+        batcher = AuditBatcher(self.audit, max_events=2, max_age=None)
+
+        futures = [batcher.add({"message": f"event {i}"}) for i in range(2)]
+        for future in futures:
+            with self.assertRaises(Exception):
+                future.result(timeout=1)
+
+    def test_transport_error(self):
+        def handler(method, path, body):
+            raise requests.exceptions.ConnectionError("down")
+
+        self.server.handler = handler
+        batcher = AuditBatcher(self.audit, max_events=2, max_age=None)
+
+        futures = [batcher.add({"message": f"event {i}"}) for i in range(2)]
+        for future in futures:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                future.result(timeout=1)
+
+    def test_closed(self):
+        batcher = AuditBatcher(self.audit, max_age=None)
+        with batcher:
+            future = batcher.add({"message": "event"})
+
+        self.assertTrue(future.done())
+        with self.assertRaises(Exception):
+            batcher.add({"message": "late"})
+
+    def test_invalid_event(self):
+        batcher = AuditBatcher(self.audit, max_age=None)
+        with self.assertRaises(Exception):
+            batcher.add({"actor": "no message"})
+        batcher.close()
+        self.assertEqual(self.batch_sizes(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pangea.config import PangeaConfig
+from pangea.services import Audit
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeServer
+
+COUNT = 23
+
+
+def stored_event(i: int) -> dict:
+    return {"envelope": {"event": {"message": f"event {i}"}}, "hash": f"{i:064x}", "leaf_index": i}
+
+
+class SearchServer(object):
+    """Audit `search` and `results` endpoints over COUNT stored events.
+
+    Pages further in the results are answered faster, so concurrent requests
+    complete out of order. The highest number of concurrent `results`
+    requests is kept in `max_in_flight`.
+    """
+
+    def __init__(self, fail_offset=None):
+        self.fail_offset = fail_offset
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def page(self, offset: int, limit: int) -> dict:
+        events = [stored_event(i) for i in range(offset, min(offset + limit, COUNT))]
+        return {"id": "pas_1", "count": COUNT, "events": events}
+
+    def __call__(self, method, path, body):
+        if path == "/v1/search":
+            return 200, {"request_id": "prq_search", "result": self.page(0, body["limit"])}
+
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(0.002 * (COUNT - body["offset"]))
+            if body["offset"] == self.fail_offset:
+                return 500, {"request_id": "prq_results", "status": "InternalError"}
+            return 200, {"request_id": "prq_results", "result": self.page(body["offset"], body["limit"])}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        config = PangeaConfig(domain="pangea.test")
+        self.transport = PangeaTransport(config)
+        self.audit = Audit("token", config=config, transport=self.transport)
+        self.search_server = SearchServer()
+        self.server = FakeServer(self.search_server)
+
+        patcher = mock.patch.object(self.transport.session, "request", side_effect=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.transport.close)
+
+    def result_offsets(self):
+        return [body["offset"] for body in self.server.bodies("/v1/results")]
+
+
+class TestSearchIter(SearchTestCase):
+    def test_order(self):
+        for prefetch in (0, 1, 3, 10):
+            with self.subTest(prefetch=prefetch):
+                self.server.calls.clear()
+                events = list(self.audit.search_iter("message:event", page_size=5, prefetch=prefetch))
+
+                self.assertEqual(
+                    [event.envelope.event.message for event in events], [f"event {i}" for i in range(COUNT)]
+                )
+                self.assertEqual(sorted(self.result_offsets()), [5, 10, 15, 20])
+
+    def test_prefetch(self):
+        list(self.audit.search_iter(page_size=2, prefetch=4))
+        self.assertGreater(self.search_server.max_in_flight, 1)
+        self.assertLessEqual(self.search_server.max_in_flight, 4)
+
+    def test_no_prefetch(self):
+        list(self.audit.search_iter(page_size=2, prefetch=0))
+        self.assertEqual(self.search_server.max_in_flight, 1)
+        self.assertEqual(self.result_offsets(), list(range(2, COUNT, 2)))
+
+    def test_max_buffered_events(self):
+        list(self.audit.search_iter(page_size=2, prefetch=8, max_buffered_events=4))
+        self.assertLessEqual(self.search_server.max_in_flight, 2)
+
+    def test_early_stop(self):
+        events = self.audit.search_iter(page_size=5, prefetch=2)
+        first = [next(events) for _ in range(7)]
+        events.close()
+
+        self.assertEqual([event.envelope.event.message for event in first], [f"event {i}" for i in range(7)])
+        # only the pages in the prefetch window were requested
+        self.assertLessEqual(len(self.result_offsets()), 3)
+
+    def test_page_error(self):
+        self.search_server.fail_offset = 10
+        events = self.audit.search_iter(page_size=5, prefetch=2)
+
+        received = []
+        with self.assertRaises(Exception):
+            for event in events:
+                received.append(event.envelope.event.message)
+
+        # the pages before the failed one were yielded in full
+        self.assertEqual(received, [f"event {i}" for i in range(10)])
+
+    def test_invalid_prefetch(self):
+        with self.assertRaises(Exception):
+            next(self.audit.search_iter(prefetch=-1))
+
+
+class TestResultsAll(SearchTestCase):
+    def test_order(self):
+        for concurrency in (1, 4, 8):
+            with self.subTest(concurrency=concurrency):
+                self.server.calls.clear()
+                pages = list(self.audit.results_all("pas_1", COUNT, concurrency=concurrency, limit=3, offset=3))
+
+                messages = [event.envelope.event.message for page in pages for event in page.result.events]
+                self.assertEqual(messages, [f"event {i}" for i in range(3, COUNT)])
+                self.assertEqual(sorted(self.result_offsets()), list(range(3, COUNT, 3)))
+
+    def test_concurrency(self):
+        list(self.audit.results_all("pas_1", COUNT, concurrency=3, limit=1))
+        self.assertGreater(self.search_server.max_in_flight, 1)
+        self.assertLessEqual(self.search_server.max_in_flight, 3)
+
+    def test_buffered_pages(self):
+        # pages ready ahead of the one being yielded are bounded by max_buffered_pages
+        pages = self.audit.results_all("pas_1", COUNT, concurrency=2, limit=1, max_buffered_pages=1)
+        next(pages)
+        time.sleep(0.2)
+        self.assertLessEqual(len(self.result_offsets()), 4)
+        pages.close()
+
+    def test_invalid_concurrency(self):
+        with self.assertRaises(Exception):
+            self.audit.results_all("pas_1", COUNT, concurrency=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
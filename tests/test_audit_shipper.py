@@ -0,0 +1,209 @@
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from pangea.audit_shipper import AuditShipper, BackpressurePolicy
+from pangea.audit_spool import AuditSpool
+from pangea.config import PangeaConfig
+from pangea.services import Audit
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeServer, log_handler
+
+
+class ShipperTestCase(unittest.TestCase):
+    def setUp(self):
+        config = PangeaConfig(domain="pangea.test")
+        self.transport = PangeaTransport(config)
+        self.audit = Audit("token", config=config, transport=self.transport)
+
+        self.server = FakeServer(log_handler)
+        patcher = mock.patch.object(self.transport.session, "request", side_effect=self.server)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.transport.close)
+
+    def shipper(self, **kwargs) -> AuditShipper:
+        kwargs.setdefault("linger", 0.01)
+        kwargs.setdefault("retry_backoff", 0.01)
+        shipper = AuditShipper(self.audit, **kwargs)
+        self.addCleanup(shipper.close, 5)
+        return shipper
+
+    def messages(self):
+        return [record["event"]["message"] for body in self.server.bodies("/v1/log") for record in body["events"]]
+
+    def blocking_handler(self):
+        """Makes the service hang until the returned event is set"""
+        release = threading.Event()
+
+        def handler(method, path, body):
+            release.wait(5)
+            return log_handler(method, path, body)
+
+        self.server.handler = handler
+        return release
+
+
+class TestAuditShipper(ShipperTestCase):
+    def test_flush(self):
+        shipper = self.shipper(batch_size=10)
+        for i in range(25):
+            self.assertTrue(shipper.enqueue({"message": f"event {i}"}))
+
+        self.assertTrue(shipper.flush(timeout=5))
+        self.assertEqual(shipper.pending(), 0)
+        self.assertEqual(shipper.sent, 25)
+        self.assertEqual(self.messages(), [f"event {i}" for i in range(25)])
+        self.assertTrue(all(len(body["events"]) <= 10 for body in self.server.bodies("/v1/log")))
+
+    def test_close(self):
+        shipper = self.shipper(batch_size=100, linger=10.0)
+        for i in range(5):
+            shipper.enqueue({"message": f"event {i}"})
+
+        # closing does not wait for the linger time, and sends what is queued
+        start = time.monotonic()
+        shipper.close(timeout=5)
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(shipper.sent, 5)
+        self.assertFalse(any(worker.is_alive() for worker in shipper._workers))
+
+        with self.assertRaises(Exception):
+            shipper.enqueue({"message": "late"})
+
+    def test_workers_survive_empty_batches(self):
+        shipper = self.shipper(workers=3, batch_size=1)
+
+        for round in range(3):
+            shipper.enqueue({"message": f"event {round}"})
+            # flushing wakes up every worker, only one of them gets the event
+            self.assertTrue(shipper.flush(timeout=5))
+            time.sleep(0.05)
+            self.assertTrue(all(worker.is_alive() for worker in shipper._workers))
+
+        self.assertEqual(shipper.sent, 3)
+
+    def test_block(self):
+        release = self.blocking_handler()
+        shipper = self.shipper(capacity=2, batch_size=1, block_timeout=0.1)
+
+        self.assertTrue(shipper.enqueue({"message": "event 0"}))
+        time.sleep(0.1)  # taken by the worker, which hangs on the service
+        self.assertTrue(shipper.enqueue({"message": "event 1"}))
+        self.assertTrue(shipper.enqueue({"message": "event 2"}))
+
+        start = time.monotonic()
+        self.assertFalse(shipper.enqueue({"message": "event 3"}))
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(shipper.dropped, 1)
+
+        release.set()
+        self.assertTrue(shipper.flush(timeout=5))
+        self.assertEqual(self.messages(), ["event 0", "event 1", "event 2"])
+
+    def test_drop_oldest(self):
+        release = self.blocking_handler()
+        shipper = self.shipper(capacity=2, batch_size=1, policy=BackpressurePolicy.DROP_OLDEST)
+
+        shipper.enqueue({"message": "event 0"})
+        time.sleep(0.1)
+        for i in range(1, 5):
+            self.assertTrue(shipper.enqueue({"message": f"event {i}"}))
+        self.assertEqual(shipper.dropped, 2)
+
+        release.set()
+        self.assertTrue(shipper.flush(timeout=5))
+        self.assertEqual(self.messages(), ["event 0", "event 3", "event 4"])
+
+    def test_spill(self):
+        release = self.blocking_handler()
+        with tempfile.TemporaryDirectory() as directory:
+            spool = AuditSpool(directory)
+            shipper = self.shipper(capacity=2, batch_size=2, policy=BackpressurePolicy.SPILL, spool=spool)
+
+            shipper.enqueue({"message": "event 0"})
+            time.sleep(0.1)
+            for i in range(1, 10):
+                self.assertTrue(shipper.enqueue({"message": f"event {i}"}))
+            self.assertEqual(shipper.dropped, 0)
+            self.assertGreater(shipper.pending(), 2)
+
+            release.set()
+            self.assertTrue(shipper.flush(timeout=5))
+            shipper.close(timeout=5)
+            spool.close()
+
+            # the spilled events are sent in order, and all acknowledged
+            self.assertEqual(self.messages(), [f"event {i}" for i in range(10)])
+            self.assertEqual(spool.acked_seq, 10)
+            self.assertEqual(len(spool), 0)
+
+
+class TestShipperRetries(ShipperTestCase):
+    def failing_handler(self, failures):
+        """Answers with each of `failures` (a status code or an exception) before succeeding"""
+        failures = list(failures)
+
+        def handler(method, path, body):
+            if failures:
+                failure = failures.pop(0)
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure, {"status": "Error"}
+            return log_handler(method, path, body)
+
+        self.server.handler = handler
+
+    def test_transient_failures(self):
+        for failure in (503, 429, requests.exceptions.ConnectionError("down")):
+            with self.subTest(failure=failure):
+                self.server.calls.clear()
+                self.failing_handler([failure, failure])
+                shipper = self.shipper(max_retries=3)
+
+                shipper.enqueue({"message": "event"})
+                self.assertTrue(shipper.flush(timeout=5))
+                shipper.close()
+
+                self.assertEqual(len(self.server.calls), 3)
+                self.assertEqual((shipper.sent, shipper.failed), (1, 0))
+
+    def test_retries_exhausted(self):
+        self.failing_handler([503] * 10)
+        shipper = self.shipper(max_retries=2)
+
+        shipper.enqueue({"message": "event"})
+        self.assertTrue(shipper.flush(timeout=5))
+
+        self.assertEqual(len(self.server.calls), 3)
+        self.assertEqual((shipper.sent, shipper.failed), (0, 1))
+
+    def test_rejected(self):
+        self.failing_handler([400])
+        shipper = self.shipper(max_retries=3)
+
+        shipper.enqueue({"message": "event"})
+        self.assertTrue(shipper.flush(timeout=5))
+
+        self.assertEqual(len(self.server.calls), 1)
+        self.assertEqual((shipper.sent, shipper.failed), (0, 1))
+
+    def test_backoff(self):
+        self.failing_handler([503, 503])
+        shipper = self.shipper(max_retries=2, retry_backoff=0.1)
+
+        start = time.monotonic()
+        shipper.enqueue({"message": "event"})
+        self.assertTrue(shipper.flush(timeout=5))
+
+        # 0.1 + 0.2 seconds between the attempts
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(shipper.sent, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pangea.audit_spool import AuditSpool
+from tests.fakes import log_handler
+from tests.test_audit_shipper import ShipperTestCase
+
+
+def record(i: int) -> dict:
+    return {"event": {"message": f"event {i}"}}
+
+
+class TestAuditSpool(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def spool(self, **kwargs) -> AuditSpool:
+        spool = AuditSpool(self.directory, **kwargs)
+        self.addCleanup(spool.close)
+        return spool
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.directory) if name.endswith(".seg"))
+
+    def test_replay_order(self):
+        spool = self.spool(max_segment_bytes=200)
+        seqs = [spool.append(record(i)) for i in range(20)]
+        self.assertEqual(seqs, list(range(1, 21)))
+        self.assertGreater(len(self.segments()), 2)
+
+        # sequential reads, and reads from any position
+        self.assertEqual(spool.read(0, 5), [(i + 1, record(i)) for i in range(5)])
+        self.assertEqual(spool.read(5, 100), [(i + 1, record(i)) for i in range(5, 20)])
+        self.assertEqual(spool.read(12, 3), [(i + 1, record(i)) for i in range(12, 15)])
+        spool.close()
+
+        # a new spool replays what was not acknowledged
+        spool = self.spool(max_segment_bytes=200)
+        spool.ack(range(1, 8))
+        spool.close()
+
+        spool = self.spool(max_segment_bytes=200)
+        self.assertEqual(spool.acked_seq, 7)
+        self.assertEqual(len(spool), 13)
+        self.assertEqual([seq for seq, _ in spool.read(0, 100)], list(range(8, 21)))
+        self.assertEqual(spool.append(record(20)), 21)
+
+    def test_ack_watermark(self):
+        spool = self.spool()
+        for i in range(10):
+            spool.append(record(i))
+
+        spool.ack([2, 3, 5])
+        self.assertEqual(spool.acked_seq, 0)
+        self.assertEqual(len(spool), 7)
+
+        spool.ack([1])
+        self.assertEqual(spool.acked_seq, 3)
+
+        spool.ack([4, 6, 7, 8, 9, 10])
+        self.assertEqual(spool.acked_seq, 10)
+        self.assertEqual(len(spool), 0)
+        self.assertEqual(spool._acked_ahead, set())
+
+    def test_compaction(self):
+        spool = self.spool(max_segment_bytes=200)
+        for i in range(20):
+            spool.append(record(i))
+        segments = self.segments()
+
+        # only the segments fully below the watermark are deleted
+        first_of_second = int(segments[1].split(".")[0])
+        spool.ack(range(1, first_of_second))
+        self.assertEqual(self.segments(), segments[1:])
+
+        spool.ack(range(1, 21))
+        # the active segment stays until closed
+        self.assertEqual(self.segments(), segments[-1:])
+        spool.close()
+        self.assertEqual(self.segments(), [])
+
+    def test_torn_record(self):
+        spool = self.spool()
+        for i in range(5):
+            spool.append(record(i))
+        spool.close()
+
+        with open(os.path.join(self.directory, self.segments()[-1]), "ab") as file:
+            file.write(b'[6, {"event": {"mess')
+
+        spool = self.spool()
+        self.assertEqual(spool.last_seq, 5)
+        self.assertEqual([seq for seq, _ in spool.read(0, 100)], [1, 2, 3, 4, 5])
+
+        self.assertEqual(spool.append(record(5)), 6)
+        self.assertEqual(spool.read(5, 100), [(6, record(5))])
+
+    def test_torn_first_record_of_segment(self):
+        spool = self.spool(max_segment_bytes=200)
+        for i in range(10):
+            spool.append(record(i))
+        spool.close()
+
+        # a crash while writing the first record of a new segment
+        segment = f"{11:020d}.seg"
+        with open(os.path.join(self.directory, segment), "wb") as file:
+            file.write(b'[11, {"ev')
+
+        spool = self.spool(max_segment_bytes=200)
+        self.assertEqual(spool.last_seq, 10)
+
+        # the truncated segment is reused for the next record, and listed once
+        self.assertEqual(spool.append(record(10)), 11)
+        self.assertEqual(len(spool._segments), len(set(spool._segments)))
+        self.assertEqual([seq for seq, _ in spool.read(0, 100)], list(range(1, 12)))
+
+        spool.ack(range(1, 12))
+        spool.close()
+        self.assertEqual(self.segments(), [])
+
+
+class TestShipperSpool(ShipperTestCase):
+    def test_failed_batches_are_sent_again(self):
+        failures = [503] * 5
+
+        def handler(method, path, body):
+            if failures:
+                return failures.pop(0), {"status": "Error"}
+            return log_handler(method, path, body)
+
+        self.server.handler = handler
+        with tempfile.TemporaryDirectory() as directory:
+            spool = AuditSpool(directory)
+            shipper = self.shipper(spool=spool, batch_size=2, max_retries=1)
+
+            for i in range(4):
+                shipper.enqueue({"message": f"event {i}"})
+            self.assertTrue(shipper.flush(timeout=5))
+            shipper.close(timeout=5)
+            spool.close()
+
+            # retried past max_retries instead of being dropped, so the spool is fully acknowledged
+            self.assertEqual(len(self.server.calls), 7)
+            self.assertEqual(self.messages()[-4:], [f"event {i}" for i in range(4)])
+            self.assertEqual((shipper.sent, shipper.failed), (4, 0))
+            self.assertEqual(spool.acked_seq, 4)
+            self.assertEqual(os.listdir(directory), ["ack"])
+
+    def test_replay_after_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spool = AuditSpool(directory)
+            for i in range(3):
+                spool.append(self.audit._log_record({"message": f"event {i}"}, signing=False))
+            spool.close()
+
+            spool = AuditSpool(directory)
+            shipper = self.shipper(spool=spool)
+            shipper.enqueue({"message": "event 3"})
+            self.assertTrue(shipper.flush(timeout=5))
+            shipper.close(timeout=5)
+            spool.close()
+
+            self.assertEqual(self.messages(), [f"event {i}" for i in range(4)])
+            self.assertEqual(spool.acked_seq, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import datetime
+import enum
+import json
+import os
+import unittest
+import uuid
+
+from pangea.codec import JSONCodec, available_codecs, get_codec
+from pangea.response import JSONObject
+from pangea.services.audit_util import canonicalize_json
+
+
+class Color(enum.Enum):
+    RED = 1
+
+
+class Format(str, enum.Enum):
+    JSON = "json"
+
+
+CANONICAL_CASES = [
+    {"b": 1, "a": [1, 2, {"z": None, "y": True, "x": False}]},
+    {"text": 'ünïcödé   \x7f\x00\x1f"\\\n\t\b\f\r/ \U0001f600 ￿'},
+    {"E": 3, "e": 2, "é": 1, "\U0001f600": 4, "￿": 5, "": 0},
+    {"int64": 2**63 - 1, "uint64": 2**64 - 1, "neg": -(2**63), "huge": 2**70},
+    {"floats": [1e16, 0.1, 1e-07, 3.0, -0.0, 123456789.123]},
+    {"when": datetime.datetime(2022, 7, 6, 23, 46, 57, tzinfo=datetime.timezone.utc)},
+    {"enum": Color.RED, "str_enum": Format.JSON, "uuid": uuid.UUID(int=5)},
+    {1: "int key", 2: "other key"},
+    {"tuple": (1, "2", None)},
+    JSONObject({"nested": {"deep": [{"k": "v"}]}}),
+    [],
+    {},
+    "string",
+    42,
+    None,
+]
+
+# values that are not JSON types, stringified before canonicalizing
+CANONICAL_EXPECTED = [
+    ({"floats": [1e16, 0.1, 1e-07, 3.0, -0.0]}, b'{"floats":[1e+16,0.1,1e-07,3.0,-0.0]}'),
+    (
+        {"when": datetime.datetime(2022, 7, 6, 23, 46, 57, tzinfo=datetime.timezone.utc)},
+        b'{"when":"2022-07-06 23:46:57+00:00"}',
+    ),
+    (
+        {"enum": Color.RED, "str_enum": Format.JSON, "uuid": uuid.UUID(int=5)},
+        b'{"enum":"Color.RED","str_enum":"json","uuid":"00000000-0000-0000-0000-000000000005"}',
+    ),
+    ({1: "int key", 2: "other key"}, b'{"1":"int key","2":"other key"}'),
+    ({"tuple": (1, "2", None)}, b'{"tuple":[1,"2",null]}'),
+]
+
+# (input, canonical JSON) pairs, the canonical form being hashed and signed it must never change
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "canonical_corpus.jsonl")
+
+
+class TestCodec(unittest.TestCase):
+    def test_default_codec(self):
+        self.assertIsInstance(get_codec(), JSONCodec)
+        self.assertEqual(get_codec().name, "json")
+
+    def test_unknown_codec(self):
+        with self.assertRaises(Exception):
+            get_codec("nope")
+
+    def test_canonical(self):
+        self.assertEqual(canonicalize_json({"b": 1, "a": "ü"}), '{"a":"ü","b":1}'.encode("utf-8"))
+
+    def test_canonical_identical(self):
+        reference = get_codec("json")
+        for name in available_codecs():
+            codec = get_codec(name)
+            for case in CANONICAL_CASES:
+                with self.subTest(codec=name, case=case):
+                    self.assertEqual(codec.canonical(case), reference.canonical(case))
+
+    def test_canonical_expected(self):
+        for name in available_codecs():
+            codec = get_codec(name)
+            for case, expected in CANONICAL_EXPECTED:
+                with self.subTest(codec=name, case=case):
+                    self.assertEqual(codec.canonical(case), expected)
+
+    def test_canonical_corpus(self):
+        with open(CORPUS_PATH, encoding="utf-8") as f:
+            corpus = [json.loads(line) for line in f]
+        self.assertGreater(len(corpus), 200)
+
+        for name in available_codecs():
+            codec = get_codec(name)
+            for i, item in enumerate(corpus):
+                with self.subTest(codec=name, line=i + 1):
+                    expected = item["canonical"].encode("utf-8")
+                    self.assertEqual(codec.canonical(item["input"]), expected)
+                    self.assertEqual(canonicalize_json(item["input"], codec), expected)
+
+    def test_round_trip(self):
+        data = {"message": "hello", "new": {"list": [1, 2.5, None, True]}}
+        for name in available_codecs():
+            codec = get_codec(name)
+            with self.subTest(codec=name):
+                self.assertEqual(codec.loads(codec.dumps(data)), data)
+
+
+if __name__ == "__main__":
+    unittest.main()
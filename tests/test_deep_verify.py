@@ -0,0 +1,133 @@
+import contextlib
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from pangea import deep_verify
+from pangea.services.audit_util import canonicalize_json, encode_hash, hash_bytes
+from pangea.tools_util import InputStream
+from tests.test_membership_proofs import encode_proof, tree_proof, tree_root
+
+
+def make_dump(path: str, buffers: int = 40, seed: int = 1):
+    """Writes a dump of `buffers` buffers, with a missing buffer, a missing event, a bad hash and a hot event"""
+    rnd = random.Random(seed)
+    hashed = []
+    for b in range(buffers):
+        envelopes = [{"event": {"message": f"b{b} e{i}"}} for i in range(rnd.randint(1, 30))]
+        hashed.append([(envelope, hash_bytes(canonicalize_json(envelope))) for envelope in envelopes])
+
+    buffer_roots = [tree_root([node for _, node in events]) for events in hashed]
+    events = []
+    for b, buffer in enumerate(hashed):
+        if b == 7:
+            continue
+        nodes = [node for _, node in buffer]
+        for i, (envelope, node) in enumerate(buffer):
+            if b == 3 and i == 1:
+                continue
+            proof = encode_proof(tree_proof(nodes, i) + tree_proof(buffer_roots, b))
+            if b == 10 and i == 0:
+                envelope = {"event": {"message": "tampered"}}
+            events.append(
+                {
+                    "envelope": envelope,
+                    "hash": encode_hash(node),
+                    "leaf_index": b,
+                    "membership_proof": proof,
+                    "tree_size": buffers,
+                }
+            )
+
+    events.append({"envelope": {"event": {"message": "hot"}}, "hash": "00", "tree_size": buffers})
+    events[0]["root"] = {"size": buffers, "root_hash": encode_hash(tree_root(buffer_roots)), "tree_name": "tree"}
+
+    with open(path, "w") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+class TestVerifyBuffers(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "dump.jsonl")
+        make_dump(self.path)
+
+        # small batches, so that the buffers are spread over several tasks
+        for patcher in (mock.patch.object(deep_verify, "BATCH_EVENTS", 50), mock.patch.dict(deep_verify.root_hashes)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def verified_buffers(self, workers: int) -> list:
+        deep_verify.root_hashes.clear()
+        with InputStream(self.path) as file:
+            return list(deep_verify.verify_buffers(deep_verify.buffer_jobs(None, file), workers))
+
+    def deep_verify(self, workers: int, checkpoint_path: str = ""):
+        deep_verify.root_hashes.clear()
+        out = io.StringIO()
+        with InputStream(self.path) as file, contextlib.redirect_stdout(out):
+            errors = deep_verify.deep_verify(None, file, workers, checkpoint_path)
+        # the progress bar depends on how far the input was read ahead, only the reported errors are kept
+        lines = out.getvalue().replace("\r", "\n").splitlines()
+        return errors, [line for line in lines if line.strip() and "Verifying" not in line]
+
+    def test_workers_match_serial(self):
+        serial = self.verified_buffers(1)
+        self.assertEqual(len(serial), 40)
+
+        for workers in (2, 3):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.verified_buffers(workers), serial)
+
+    def test_deep_verify_workers_match_serial(self):
+        errors, output = self.deep_verify(1)
+        self.assertEqual((errors["hash"], errors["not_persisted"], errors["buffer_missing"]), (1, 1, 1))
+        self.assertGreater(errors["missing"], 0)
+        self.assertIn("1 buffer(s) missing", output[-1])
+
+        self.assertEqual(self.deep_verify(2), (errors, output))
+
+    def test_resume_from_checkpoint(self):
+        gzip_path = f"{self.path}.gz"
+        with open(self.path, "rb") as f, gzip.open(gzip_path, "wb") as out:
+            out.write(f.read())
+
+        verify_buffers = deep_verify.verify_buffers
+
+        # stops after the buffers with errors, which must be carried over by the checkpoint
+        def interrupted(jobs, workers):
+            for i, result in enumerate(verify_buffers(jobs, workers)):
+                if i == 15:
+                    raise KeyboardInterrupt()
+                yield result
+
+        for path in (self.path, gzip_path):
+            for workers in (1, 2):
+                with self.subTest(path=os.path.basename(path), workers=workers):
+                    self.path = path
+                    errors, _ = self.deep_verify(workers)
+
+                    checkpoint_path = f"{path}.{workers}.checkpoint"
+                    with mock.patch.object(deep_verify, "CHECKPOINT_INTERVAL", 0):
+                        with mock.patch.object(deep_verify, "verify_buffers", side_effect=interrupted):
+                            with self.assertRaises(KeyboardInterrupt):
+                                self.deep_verify(workers, checkpoint_path)
+
+                        with InputStream(path) as file:
+                            checkpoint = deep_verify.load_checkpoint(checkpoint_path, file)
+                        self.assertGreater(checkpoint["events"], 0)
+                        resumed, output = self.deep_verify(workers, checkpoint_path)
+
+                    self.assertIn("Resuming from checkpoint", output[0])
+                    self.assertEqual(resumed, errors)
+
+
+if __name__ == "__main__":
+    unittest.main()
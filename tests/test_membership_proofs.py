@@ -0,0 +1,186 @@
+import random
+import unittest
+from hashlib import sha256
+
+from pangea.config import PangeaConfig
+from pangea.response import JSONObject
+from pangea.services import Audit
+from pangea.services.audit_util import (
+    CompactProof,
+    MembershipProofItem,
+    compact_membership_proof,
+    decode_compact_consistency_proof,
+    decode_compact_membership_proof,
+    decode_consistency_proof,
+    decode_membership_proof,
+    encode_hash,
+    hash_pair,
+    verify_consistency_proof,
+    verify_membership_proof,
+    verify_membership_proofs,
+)
+
+
+def left_size(size: int) -> int:
+    """size of the left subtree: the largest power of two smaller than `size`"""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def tree_root(leaves: list) -> bytes:
+    if len(leaves) == 1:
+        return leaves[0]
+    split = left_size(len(leaves))
+    return hash_pair(tree_root(leaves[:split]), tree_root(leaves[split:]))
+
+
+def tree_proof(leaves: list, index: int) -> list:
+    """membership proof of leaves[index], from the leaf to the root"""
+    if len(leaves) == 1:
+        return []
+    split = left_size(len(leaves))
+    if index < split:
+        return tree_proof(leaves[:split], index) + [MembershipProofItem("right", tree_root(leaves[split:]))]
+    else:
+        return tree_proof(leaves[split:], index - split) + [MembershipProofItem("left", tree_root(leaves[:split]))]
+
+
+def encode_proof(proof: list) -> str:
+    return ",".join(("l:" if item.side == "left" else "r:") + encode_hash(item.node_hash) for item in proof)
+
+
+def consistency_proof(leaves: list, prev_size: int) -> list:
+    """encoded consistency proof from the tree of the first `prev_size` leaves to the tree of all `leaves`"""
+    # the old tree is made of full subtrees, each of them is a node of the new tree
+    items = []
+    start = 0
+    while start < prev_size:
+        size = 1 << ((prev_size - start).bit_length() - 1)
+        subtree = leaves[start : start + size]
+        proof = node_proof(leaves, start, size)
+        items.append(f"x:{encode_hash(tree_root(subtree))},{encode_proof(proof)}")
+        start += size
+    return list(reversed(items))
+
+
+def node_proof(leaves: list, start: int, size: int) -> list:
+    """membership proof of the full subtree of `size` leaves starting at `start`"""
+    if len(leaves) == size:
+        return []
+    split = left_size(len(leaves))
+    if start < split:
+        return node_proof(leaves[:split], start, size) + [MembershipProofItem("right", tree_root(leaves[split:]))]
+    else:
+        return node_proof(leaves[split:], start - split, size) + [
+            MembershipProofItem("left", tree_root(leaves[:split]))
+        ]
+
+
+class TestMembershipProofs(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(1234)
+
+    def make_tree(self, size: int):
+        leaves = [sha256(str(i).encode()).digest() for i in range(size)]
+        return leaves, tree_root(leaves)
+
+    def test_batch_matches_single(self):
+        for size in (1, 2, 3, 7, 8, 33, 100):
+            leaves, root = self.make_tree(size)
+            items = [(leaves[i], tree_proof(leaves, i)) for i in range(size)]
+            expected = [verify_membership_proof(node, root, proof) for node, proof in items]
+
+            self.assertTrue(all(expected))
+            self.assertEqual(verify_membership_proofs(root, items), expected)
+
+    def test_tampered(self):
+        leaves, root = self.make_tree(50)
+        other_leaves, _ = self.make_tree(51)
+        bogus = sha256(b"bogus").digest()
+
+        items = []
+        for i in self.random.sample(range(50), 30) * 2:
+            node, proof = leaves[i], tree_proof(leaves, i)
+            kind = self.random.randrange(5)
+            if kind == 1:
+                node = bogus
+            elif kind == 2 and proof:
+                # same positions, wrong sibling
+                j = self.random.randrange(len(proof))
+                proof[j] = MembershipProofItem(proof[j].side, bogus)
+            elif kind == 3 and proof:
+                j = self.random.randrange(len(proof))
+                proof[j] = MembershipProofItem("left" if proof[j].side == "right" else "right", proof[j].node_hash)
+            elif kind == 4:
+                proof = tree_proof(other_leaves, i)
+            items.append((node, proof))
+
+        expected = [verify_membership_proof(node, root, proof) for node, proof in items]
+
+        self.assertIn(True, expected)
+        self.assertIn(False, expected)
+        self.assertEqual(verify_membership_proofs(root, items), expected)
+
+    def test_compact(self):
+        leaves, root = self.make_tree(37)
+        for i in range(37):
+            encoded = encode_proof(tree_proof(leaves, i))
+            proof = decode_membership_proof(encoded)
+            compact = decode_compact_membership_proof(encoded)
+
+            self.assertEqual(compact, compact_membership_proof(proof))
+            self.assertEqual(compact.to_membership_proof(), proof)
+            self.assertTrue(verify_membership_proof(leaves[i], root, compact))
+            self.assertFalse(verify_membership_proof(leaves[(i + 1) % 37], root, compact))
+
+        items = [(leaves[i], decode_compact_membership_proof(encode_proof(tree_proof(leaves, i)))) for i in range(37)]
+        self.assertEqual(verify_membership_proofs(root, items), [True] * 37)
+
+        self.assertEqual(decode_compact_membership_proof(""), CompactProof(b"", 0, 0))
+        with self.assertRaises(ValueError):
+            decode_compact_membership_proof("l:abcd,r:ef01")
+
+    def test_compact_consistency(self):
+        leaves, root = self.make_tree(45)
+        for prev_size in (1, 2, 5, 16, 30, 44):
+            prev_root = tree_root(leaves[:prev_size])
+            encoded = consistency_proof(leaves, prev_size)
+            compact = decode_compact_consistency_proof(encoded)
+
+            self.assertTrue(verify_consistency_proof(root, prev_root, decode_consistency_proof(encoded)))
+            self.assertTrue(verify_consistency_proof(root, prev_root, compact))
+            self.assertFalse(verify_consistency_proof(root, leaves[0] if prev_size > 1 else leaves[1], compact))
+
+    def test_empty(self):
+        self.assertEqual(verify_membership_proofs(b"root", []), [])
+
+
+class TestAuditMembershipProofs(unittest.TestCase):
+    def setUp(self):
+        self.audit = Audit("token", config=PangeaConfig(domain="pangea.test"))
+        self.addCleanup(self.audit.request.transport.close)
+
+        leaves = [sha256(str(i).encode()).digest() for i in range(6)]
+        self.root = JSONObject({"root_hash": encode_hash(tree_root(leaves)), "source": "arweave"})
+        self.events = [
+            JSONObject({"hash": encode_hash(leaves[i]), "membership_proof": encode_proof(tree_proof(leaves, i))})
+            for i in range(6)
+        ]
+
+    def test_malformed_proof(self):
+        events = list(self.events)
+        events[1] = JSONObject({"hash": events[1].hash, "membership_proof": "l:abcd,r:ef01"})
+        events[3] = JSONObject({"hash": "not a hash", "membership_proof": events[3].membership_proof})
+        events[4] = JSONObject({"hash": events[4].hash})
+
+        # only the events with a malformed hash or proof fail
+        self.assertEqual(
+            self.audit._verify_membership_proofs(self.root, events), ["pass", "fail", "pass", "fail", "none", "pass"]
+        )
+        self.assertEqual(
+            [self.audit.verify_membership_proof(self.root, event) for event in events if event.membership_proof],
+            [True, False, True, False, True],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
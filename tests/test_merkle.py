@@ -0,0 +1,112 @@
+import math
+import random
+import unittest
+
+from pangea import merkle
+
+
+# implementations replaced by pangea.merkle, using floating point arithmetic
+def legacy_tree_size_left(tree_size: int) -> int:
+    if tree_size <= 1:
+        return 0
+    return 2 ** (math.ceil(math.log2(tree_size)) - 1)
+
+
+def legacy_path2index(tree_size: int, path: str) -> int:
+    ans = 0
+    for side in reversed(path):
+        size_left = legacy_tree_size_left(tree_size)
+        size_right = tree_size - size_left
+        if side == "l":
+            ans += size_left
+            tree_size = size_right
+        else:
+            tree_size = size_left
+    return ans
+
+
+def legacy_index2path(tree_size: int, leaf_index: int) -> str:
+    revpath = []
+    while tree_size > 1:
+        size_left = legacy_tree_size_left(tree_size)
+        size_right = tree_size - size_left
+        if leaf_index < size_left:
+            revpath.append("r")
+            tree_size = size_left
+        else:
+            revpath.append("l")
+            tree_size = size_right
+            leaf_index -= size_left
+    return "".join(reversed(revpath))
+
+
+def legacy_get_proof_path(proof: str) -> str:
+    return "".join(elem[0] for elem in proof.split(","))
+
+
+class TestMerkle(unittest.TestCase):
+    def setUp(self):
+        self.random = random.Random(2022)
+
+    def sizes(self):
+        # exhaustive for small trees, random up to 2^40 leaves
+        yield from range(1, 130)
+        for _ in range(300):
+            yield self.random.randint(1, 2**40)
+
+    def test_tree_size_left(self):
+        for tree_size in list(self.sizes()) + [0, -1]:
+            self.assertEqual(merkle.tree_size_left(tree_size), legacy_tree_size_left(tree_size), tree_size)
+
+    def test_index_to_sides(self):
+        for tree_size in self.sizes():
+            for leaf_index in {0, tree_size - 1, self.random.randrange(tree_size)}:
+                sides, length = merkle.index_to_sides(tree_size, leaf_index)
+                path = legacy_index2path(tree_size, leaf_index)
+
+                self.assertEqual(merkle.sides_to_path(sides, length), path)
+                self.assertEqual(merkle.path_to_sides(path), (sides, length))
+                self.assertEqual(merkle.path_length(tree_size, leaf_index), len(path))
+                self.assertEqual(merkle.sides_to_index(tree_size, sides, length), leaf_index)
+
+    def test_sides_to_index(self):
+        for tree_size in self.sizes():
+            # any path, even longer or shorter than the leaf paths
+            length = self.random.randint(0, 45)
+            sides = self.random.getrandbits(length) if length else 0
+            path = merkle.sides_to_path(sides, length)
+            self.assertEqual(merkle.sides_to_index(tree_size, sides, length), legacy_path2index(tree_size, path))
+
+    def test_proof_sides(self):
+        for length in range(1, 70):
+            path = "".join(self.random.choice("lr") for _ in range(length))
+            proof = ",".join(f"{side}:{self.random.getrandbits(256):064x}" for side in path)
+            sides = merkle.proof_sides(proof)
+            self.assertEqual(merkle.sides_to_path(*sides), legacy_get_proof_path(proof))
+
+        self.assertEqual(merkle.proof_sides(""), (0, 0))
+
+    def test_split_sides(self):
+        for length in range(0, 20):
+            path = "".join(self.random.choice("lr") for _ in range(length))
+            sides = merkle.path_to_sides(path)
+            for upper in range(0, length + 1):
+                lower_sides, upper_sides = merkle.split_sides(*sides, upper)
+                self.assertEqual(merkle.sides_to_path(*lower_sides), path[: length - upper])
+                self.assertEqual(merkle.sides_to_path(*upper_sides), path[length - upper :])
+
+    def test_large_trees(self):
+        # beyond 2^53 leaves floating point results are wrong
+        tree_size = 2**53 + 1
+        self.assertEqual(merkle.tree_size_left(tree_size), 2**53)
+        self.assertNotEqual(legacy_tree_size_left(tree_size), 2**53)
+
+        for tree_size in (2**64 + 3, 2**100 - 1, 3 * 2**70):
+            for leaf_index in (0, tree_size // 3, tree_size - 1):
+                sides, length = merkle.index_to_sides(tree_size, leaf_index)
+                self.assertEqual(length, merkle.path_length(tree_size, leaf_index))
+                self.assertEqual(merkle.sides_to_index(tree_size, sides, length), leaf_index)
+
+
+if __name__ == "__main__":
+    unittest.main()
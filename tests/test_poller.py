@@ -0,0 +1,184 @@
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from unittest import mock
+
+import requests
+
+from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+from pangea.poller import QueuedRequestPoller, _resolve
+from pangea.response import PangeaResponse
+from pangea.services import Redact
+from pangea.transport import PangeaTransport
+from tests.fakes import fake_response
+
+
+class FakeRequest(object):
+    """Answers the progress checks of queued requests from a script of status codes"""
+
+    def __init__(self, codes, queued_retries=4, on_get=None):
+        self.codes = list(codes)
+        self.queued_retries = queued_retries
+        self.on_get = on_get
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get(self, endpoint, path, deadline=None):
+        with self.lock:
+            self.calls.append((endpoint, path))
+            code = self.codes.pop(0) if len(self.codes) > 1 else self.codes[0]
+
+        if self.on_get:
+            self.on_get(path)
+
+        return PangeaResponse(fake_response(code, {"request_id": path, "result": {"code": code}}))
+
+
+class TestQueuedRequestPoller(unittest.TestCase):
+    def setUp(self):
+        self.poller = QueuedRequestPoller(max_workers=4)
+        # keep the tests fast, the schedule itself is tested in test_backoff
+        self.poller._delay = lambda attempt: 0.01
+
+    def tearDown(self):
+        self.poller.close()
+
+    def test_backoff(self):
+        poller = QueuedRequestPoller(max_delay=10.0)
+        try:
+            for attempt in range(1, 6):
+                base = min(attempt * attempt, 10.0)
+                for _ in range(20):
+                    delay = poller._delay(attempt)
+                    self.assertGreaterEqual(delay, base / 2)
+                    self.assertLessEqual(delay, base)
+        finally:
+            poller.close()
+
+    def test_resolves_completed_request(self):
+        request = FakeRequest([202, 202, 200])
+        future = self.poller.watch(request, "prq_1")
+
+        response = future.result(timeout=5)
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.result.code, 200)
+        self.assertEqual(request.calls, [("request", "prq_1")] * 3)
+        self.assertEqual(self.poller.pending(), 0)
+
+    def test_retries_exhausted(self):
+        # like PangeaRequest.post, the last 202 is returned once queued_retries is reached
+        request = FakeRequest([202], queued_retries=2)
+        response = self.poller.watch(request, "prq_1").result(timeout=5)
+
+        self.assertEqual(response.code, 202)
+        self.assertEqual(len(request.calls), 3)
+
+    def test_poll_error(self):
+        request = FakeRequest([200])
+        request.get = mock.Mock(side_effect=requests.exceptions.ConnectionError("down"))
+
+        future = self.poller.watch(request, "prq_1")
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            future.result(timeout=5)
+
+    def test_deadline(self):
+        self.poller._delay = lambda attempt: 0.2
+        request = FakeRequest([202], queued_retries=100)
+
+        future = self.poller.watch(request, "prq_1", deadline=0.5)
+        with self.assertRaises(PangeaTimeoutError):
+            future.result(timeout=5)
+        self.assertLessEqual(len(request.calls), 3)
+
+    def test_concurrent_polls(self):
+        # every due request is polled in the same batch, each poll waits for all the others
+        barrier = threading.Barrier(4, timeout=5)
+        request = FakeRequest([200], on_get=lambda path: barrier.wait())
+
+        futures = [self.poller.watch(request, f"prq_{i}") for i in range(4)]
+        responses = [future.result(timeout=10) for future in futures]
+
+        self.assertEqual([r.result.code for r in responses], [200] * 4)
+        self.assertEqual(sorted(path for _, path in request.calls), [f"prq_{i}" for i in range(4)])
+
+    def test_cancelled_request_is_not_polled(self):
+        self.poller._delay = lambda attempt: 0.2
+        request = FakeRequest([200])
+
+        future = self.poller.watch(request, "prq_1")
+        future.cancel()
+        time.sleep(0.4)
+
+        self.assertEqual(request.calls, [])
+
+    def test_close_cancels_pending(self):
+        self.poller._delay = lambda attempt: 60.0
+        future = self.poller.watch(FakeRequest([200]), "prq_1")
+
+        self.poller.close()
+        self.assertTrue(future.cancelled())
+
+    def test_resolve_done_future(self):
+        cancelled = Future()
+        cancelled.cancel()
+        _resolve(cancelled, "result")
+        self.assertTrue(cancelled.cancelled())
+
+        finished = Future()
+        _resolve(finished, "first")
+        _resolve(finished, exception=Exception("second"))
+        self.assertEqual(finished.result(), "first")
+
+
+class TestQueuedServiceCall(unittest.TestCase):
+    def setUp(self):
+        self.config = PangeaConfig(domain="pangea.test")
+        self.transport = PangeaTransport(self.config)
+        self.redact = Redact("token", config=self.config, transport=self.transport)
+        self.poller = QueuedRequestPoller()
+        self.poller._delay = lambda attempt: 0.01
+
+    def tearDown(self):
+        self.poller.close()
+        self.transport.close()
+
+    def test_queued(self):
+        responses = [
+            fake_response(202, {"request_id": "prq_1", "status": "Accepted"}),
+            fake_response(202, {"request_id": "prq_1", "status": "Accepted"}),
+            fake_response(200, {"request_id": "prq_1", "result": {"redacted_text": "<PERSON>"}}),
+        ]
+
+        with mock.patch.object(self.transport.session, "request", side_effect=responses) as request, mock.patch(
+            "pangea.request.get_default_poller", return_value=self.poller
+        ):
+            future = self.redact.redact("Jenny", queued=True)
+            self.assertIsInstance(future, Future)
+            response = future.result(timeout=5)
+
+        self.assertEqual(response.result.redacted_text, "<PERSON>")
+        urls = [call[0][1] for call in request.call_args_list]
+        self.assertEqual(
+            urls,
+            [
+                "https://redact.pangea.test/v1/redact",
+                "https://redact.pangea.test/v1/request/prq_1",
+                "https://redact.pangea.test/v1/request/prq_1",
+            ],
+        )
+
+    def test_not_queued(self):
+        body = {"request_id": "prq_1", "result": {"redacted_text": "<PERSON>"}}
+        with mock.patch.object(self.transport.session, "request", return_value=fake_response(200, body)):
+            future = self.redact.redact("Jenny", queued=True)
+            self.assertTrue(future.done())
+            self.assertEqual(future.result().result.redacted_text, "<PERSON>")
+
+            response = self.redact.redact("Jenny")
+            self.assertEqual(response.result.redacted_text, "<PERSON>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import socket
+import time
+import unittest
+from unittest import mock
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+from pangea.config import PangeaConfig
+from pangea.exceptions import PangeaTimeoutError
+from pangea.request import PangeaRequest
+from tests.fakes import FakeServer
+
+
+def refusing_port() -> int:
+    """A local port with nothing listening on it"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestRequestRetries(unittest.TestCase):
+    def request(self, **kwargs) -> PangeaRequest:
+        config = PangeaConfig(domain=f"127.0.0.1:{refusing_port()}", environment="local", insecure=True, **kwargs)
+        request = PangeaRequest(config, "token", "v1", "test")
+        self.addCleanup(request.transport.close)
+        return request
+
+    def attempts(self, request: PangeaRequest, error: Exception) -> mock.Mock:
+        def fail(*args, **kwargs):
+            raise error
+
+        patcher = mock.patch.object(request.transport.session, "request", side_effect=fail)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def test_deadline_covers_retries(self):
+        request = self.request(request_retries=3, request_backoff=1)
+
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            request.post("test", data={}, deadline=1.0)
+
+        # the second retry would only start after 2 seconds
+        self.assertLess(time.monotonic() - start, 1.0)
+
+    def test_retries_within_deadline(self):
+        request = self.request(request_retries=3, request_backoff=1)
+        session_request = mock.patch.object(
+            request.transport.session, "request", wraps=request.transport.session.request
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            request.post("test", data={}, deadline=3.0)
+        elapsed = time.monotonic() - start
+
+        # attempts at 0s, 0s and 2s, the next one would be at 6s
+        self.assertEqual(session_request.call_count, 3)
+        self.assertGreaterEqual(elapsed, 2.0)
+        self.assertLess(elapsed, 3.0)
+
+    def test_connection_refused(self):
+        request = self.request(request_retries=1, request_backoff=0)
+
+        with self.assertRaises(requests.exceptions.ConnectionError) as cm:
+            request.post("test", data={})
+
+        self.assertNotIsInstance(cm.exception, PangeaTimeoutError)
+        self.assertIsInstance(cm.exception.args[0].reason, NewConnectionError)
+
+    def test_connect_timeout(self):
+        request = self.request(request_retries=2, request_backoff=0)
+        session_request = self.attempts(request, requests.exceptions.ConnectTimeout("connect timeout"))
+
+        with self.assertRaises(PangeaTimeoutError):
+            request.post("test", data={})
+        self.assertEqual(session_request.call_count, 3)
+
+    def test_read_timeout(self):
+        request = self.request(request_retries=2, request_backoff=0)
+        session_request = self.attempts(request, requests.exceptions.ReadTimeout("read timeout"))
+
+        # the server may have received a POST, it is not sent again
+        with self.assertRaises(PangeaTimeoutError):
+            request.post("test", data={})
+        self.assertEqual(session_request.call_count, 1)
+
+        with self.assertRaises(PangeaTimeoutError):
+            request.get("request", "prq_1")
+        self.assertEqual(session_request.call_count, 4)
+
+    def test_timeouts_capped_to_deadline(self):
+        request = self.request(request_timeout=5, connect_timeout=5)
+        server = FakeServer(lambda method, path, body: (200, {"request_id": "prq_1", "result": {}}))
+
+        with mock.patch.object(request.transport.session, "request", side_effect=server) as session_request:
+            request.post("test", data={}, deadline=0.5)
+            request.post("test", data={})
+
+        connect, read = session_request.call_args_list[0][1]["timeout"]
+        self.assertLessEqual(connect, 0.5)
+        self.assertLessEqual(read, 0.5)
+        self.assertEqual(session_request.call_args_list[1][1]["timeout"], (5, 5))
+
+    def test_deadline_exceeded(self):
+        request = self.request()
+        session_request = self.attempts(request, AssertionError("no attempt expected"))
+
+        with self.assertRaises(PangeaTimeoutError):
+            request.post("test", data={}, deadline=0)
+        self.assertEqual(session_request.call_count, 0)
+
+    def test_retried_timeout_reason(self):
+        request = self.request(request_retries=0)
+        reason = MaxRetryError(None, "/v1/test", reason=NewConnectionError(None, "refused"))
+        self.attempts(request, requests.exceptions.ConnectionError(reason))
+
+        with self.assertRaises(requests.exceptions.ConnectionError) as cm:
+            request.post("test", data={})
+        self.assertNotIsInstance(cm.exception, PangeaTimeoutError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import unittest
+from unittest import mock
+
+from pangea.codec import JSONCodec
+from pangea.response import JSONObject, PangeaResponse
+from tests.fakes import fake_response
+
+BODY = {
+    "request_id": "prq_1",
+    "status": "Success",
+    "result": {
+        "events": [{"envelope": {"event": {"message": "hello", "ip.address": "1.1.1.1"}}, "hash": "abc"}],
+        "count": 1,
+    },
+}
+
+
+class CountingCodec(JSONCodec):
+    def __init__(self):
+        self.loads_calls = 0
+
+    def loads(self, data):
+        self.loads_calls += 1
+        return super().loads(data)
+
+
+class TestPangeaResponse(unittest.TestCase):
+    def setUp(self):
+        self.codec = CountingCodec()
+        self.http_response = fake_response(200, BODY)
+        self.response = PangeaResponse(self.http_response, codec=self.codec)
+
+    def test_not_decoded_until_read(self):
+        self.assertEqual(self.response.code, 200)
+        self.assertEqual(self.response.status, "OK")
+        self.assertTrue(self.response.success)
+        self.assertIs(self.response.response, self.http_response)
+        self.assertEqual(self.codec.loads_calls, 0)
+
+    def test_raw_bytes(self):
+        self.assertIs(self.response.raw_bytes, self.http_response.content)
+        self.assertEqual(self.codec.loads_calls, 0)
+
+        # reading fields does not change the raw body
+        self.assertEqual(self.response.result.count, 1)
+        self.assertIs(self.response.raw_bytes, self.http_response.content)
+
+    def test_decoded_once(self):
+        self.assertEqual(self.response.request_id, "prq_1")
+        self.assertEqual(self.response.result.count, 1)
+        self.assertIs(self.response.result, self.response.result)
+        self.assertEqual(self.codec.loads_calls, 1)
+
+    def test_default_codec(self):
+        with mock.patch("pangea.response.get_codec", return_value=self.codec) as get_codec:
+            response = PangeaResponse(fake_response(200, BODY))
+            self.assertEqual(get_codec.call_count, 0)
+            self.assertEqual(response.result.count, 1)
+
+        self.assertEqual(self.codec.loads_calls, 1)
+
+    def test_error_response(self):
+        response = PangeaResponse(fake_response(400, {"request_id": "prq_2", "status": "ValidationError"}))
+        self.assertFalse(response.success)
+        self.assertEqual(response.code, 400)
+        self.assertEqual(response.status, "Bad Request")
+        self.assertIsNone(response.result)
+        self.assertEqual(response.request_id, "prq_2")
+
+
+class TestJSONObject(unittest.TestCase):
+    def test_wrapped_on_access(self):
+        obj = JSONObject(BODY)
+
+        # nested values are left as they are until read
+        self.assertIs(type(dict.__getitem__(obj, "result")), dict)
+
+        result = obj.result
+        self.assertIsInstance(result, JSONObject)
+        self.assertIs(dict.__getitem__(obj, "result"), result)
+        self.assertIs(obj.result, result)
+        self.assertIs(obj["result"], result)
+
+        event = result.events[0].envelope.event
+        self.assertIsInstance(event, JSONObject)
+        self.assertEqual(event.message, "hello")
+        self.assertIs(result.events, result.events)
+
+    def test_dotted_keys(self):
+        event = JSONObject(BODY).result.events[0].envelope.event
+        self.assertEqual(event.ip_address, "1.1.1.1")
+        self.assertIsNone(event.missing)
+
+    def test_dotted_key_aliases_not_stored(self):
+        # the underscore aliases are only attributes, the dict keeps the keys as received
+        obj = JSONObject(BODY)
+        event = obj.result.events[0].envelope.event
+        self.assertEqual(event.ip_address, "1.1.1.1")
+
+        self.assertNotIn("ip_address", event)
+        self.assertEqual(list(event), ["message", "ip.address"])
+        self.assertEqual(dict(event), {"message": "hello", "ip.address": "1.1.1.1"})
+        self.assertEqual(json.dumps(obj), json.dumps(BODY))
+
+    def test_values_and_items(self):
+        obj = JSONObject({"a": {"b": 1}, "c": [{"d": 2}], "e": 3})
+
+        self.assertIsInstance(dict(obj.items())["a"], JSONObject)
+        values = list(obj.values())
+        self.assertIsInstance(values[0], JSONObject)
+        self.assertIsInstance(values[1][0], JSONObject)
+        self.assertEqual(values[2], 3)
+        self.assertEqual(obj.get("missing", "default"), "default")
+
+    def test_set_attribute(self):
+        obj = JSONObject({"a": 1})
+        obj.b = {"c": 2}
+        self.assertEqual(obj["b"].c, 2)
+
+    def test_equal_to_plain_dict(self):
+        obj = JSONObject(BODY)
+        obj.result.events[0].envelope.event
+        self.assertEqual(obj, BODY)
+
+
+if __name__ == "__main__":
+    unittest.main()
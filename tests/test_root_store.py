@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from pangea.config import PangeaConfig
+from pangea.response import JSONObject
+from pangea.services import Audit
+from pangea.services.root_store import RootStore
+
+
+def make_root(tree_size: int, source: str = "arweave") -> dict:
+    return {"size": tree_size, "root_hash": f"{tree_size:064x}", "consistency_proof": [], "source": source}
+
+
+class TestRootStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "roots.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_memory_lru(self):
+        store = RootStore(max_size=2)
+        store.put("tree", 1, make_root(1))
+        store.put("tree", 2, make_root(2))
+        self.assertEqual(store.get("tree", 1)["size"], 1)
+
+        # 2 is the least recently used
+        store.put("tree", 3, make_root(3))
+        self.assertEqual(len(store), 2)
+        self.assertIsNone(store.get("tree", 2))
+        self.assertEqual(store.get_many("tree", [1, 2, 3]).keys(), {1, 3})
+        self.assertIsNone(store.get("other_tree", 1))
+
+    def test_sqlite_shared(self):
+        writer = RootStore(self.path)
+        writer.put_many("tree", {size: make_root(size) for size in range(1, 1200)})
+        writer.close()
+
+        reader = RootStore(self.path, max_size=10)
+        roots = reader.get_many("tree", range(1, 1300))
+        self.assertEqual(len(roots), 1199)
+        self.assertEqual(roots[700], make_root(700))
+        self.assertEqual(len(reader), 10)
+        reader.close()
+
+    def test_arweave_precedence(self):
+        store = RootStore(self.path)
+        store.put("tree", 5, make_root(5, "pangea"))
+        store.put("tree", 5, make_root(5, "arweave"))
+        store.put("tree", 5, make_root(5, "pangea"))
+        self.assertEqual(store.get("tree", 5)["source"], "arweave")
+        store.close()
+
+        self.assertEqual(RootStore(self.path).get("tree", 5)["source"], "arweave")
+
+    def test_audit_uses_store(self):
+        store = RootStore()
+        store.put_many("tree", {size: make_root(size) for size in (3, 4, 10)})
+        audit = Audit("token", config=PangeaConfig(domain="pangea.cloud"), root_store=store)
+
+        # every root needed is stored, nothing is requested
+        result = JSONObject({"root": {"tree_name": "tree", "size": 10}, "events": [{"leaf_index": 3}]})
+        audit.update_published_roots(audit.pub_roots, result)
+        self.assertEqual(audit.pub_roots.keys(), {3, 4, 10})
+        self.assertEqual(audit.pub_roots[4].root_hash, f"{4:064x}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,350 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from base64 import b64encode
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+from pangea.audit_shipper import AuditShipper
+from pangea.config import PangeaConfig
+from pangea.response import JSONObject
+from pangea.services import Audit
+from pangea.services.audit_batch import AuditBatcher
+from pangea.signing import Signing, load_public_key, signed_bytes, verify_message, verify_messages
+
+
+def new_key():
+    private_key = ed25519.Ed25519PrivateKey.generate()
+    public_bytes = private_key.public_key().public_bytes(
+        encoding=serialization.Encoding.OpenSSH, format=serialization.PublicFormat.OpenSSH
+    )
+    return private_key, public_bytes
+
+
+def sign(private_key, message, hash_message=True) -> str:
+    return b64encode(private_key.sign(signed_bytes(message, hash_message))).decode("ascii")
+
+
+class TestVerifyMessage(unittest.TestCase):
+    def setUp(self):
+        load_public_key.cache_clear()
+
+    def test_verify(self):
+        private_key, public_bytes = new_key()
+        message = {"message": "hello", "actor": "me", "status": None}
+        signature = sign(private_key, message)
+
+        self.assertTrue(verify_message(signature, message, public_bytes, hash_message=True))
+        self.assertFalse(verify_message(signature, message, public_bytes, hash_message=False))
+        self.assertFalse(verify_message(signature, {**message, "actor": "you"}, public_bytes, hash_message=True))
+        self.assertFalse(verify_message(signature, message, new_key()[1], hash_message=True))
+        self.assertFalse(verify_message("not base64!", message, public_bytes, hash_message=True))
+        self.assertFalse(verify_message(signature, message, b"ssh-ed25519 bogus", hash_message=True))
+
+        for message in ("hello", b"hello"):
+            self.assertTrue(verify_message(sign(private_key, message, False), message, public_bytes))
+
+    def test_key_parsed_once(self):
+        keys = [new_key() for _ in range(3)]
+        items = [
+            (sign(private_key, {"n": i}), {"n": i}, public_bytes)
+            for i in range(30)
+            for private_key, public_bytes in keys
+        ]
+
+        with mock.patch(
+            "pangea.signing.serialization.load_ssh_public_key", wraps=serialization.load_ssh_public_key
+        ) as load:
+            for signature, message, public_bytes in items:
+                self.assertTrue(verify_message(signature, message, public_bytes, hash_message=True))
+
+        self.assertEqual(load.call_count, 3)
+
+    def test_signing_keeps_own_key(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {"PRIVATE_KEY": os.path.join(tmp, "key"), "PUBLIC_KEY": os.path.join(tmp, "key.pub")}
+            with mock.patch.dict(os.environ, env):
+                signing = Signing(hash_message=True)
+                own_key = signing.getPublicKey()
+
+                private_key, public_bytes = new_key()
+                message = {"message": "hello"}
+                self.assertTrue(signing.verifyMessage(sign(private_key, message), message, public_bytes))
+                self.assertIs(signing.getPublicKey(), own_key)
+
+                signature = signing.signMessage(message)
+                self.assertTrue(signing.verifyMessage(signature, message))
+                self.assertTrue(verify_message(signature, message, signing.getPublicKeyBytes(), hash_message=True))
+
+
+class TestInMemoryKeys(unittest.TestCase):
+    def test_private_key(self):
+        private_key, public_bytes = new_key()
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption(),
+        )
+        message = {"message": "hello"}
+
+        with mock.patch.dict(os.environ, clear=True), mock.patch("builtins.open") as open_file:
+            for key in (private_key, pem):
+                signing = Signing(hash_message=True, private_key=key)
+                signature = signing.signMessage(message)
+
+                self.assertTrue(verify_message(signature, message, public_bytes, hash_message=True))
+                self.assertEqual(signing.getPublicKeyBytes(), public_bytes)
+
+        open_file.assert_not_called()
+
+    def test_key_provider(self):
+        private_key, public_bytes = new_key()
+        provider = mock.Mock(return_value=private_key)
+        signing = Signing(hash_message=True, key_provider=provider)
+
+        signatures = {}
+
+        def sign_events(n: int):
+            for i in range(50):
+                signatures[(n, i)] = signing.signMessage({"n": n, "i": i})
+
+        threads = [threading.Thread(target=sign_events, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        provider.assert_called_once_with()
+        self.assertEqual(len(signatures), 400)
+        for (n, i), signature in signatures.items():
+            self.assertTrue(verify_message(signature, {"n": n, "i": i}, public_bytes, hash_message=True))
+
+    def test_bad_key(self):
+        signing = Signing(key_provider=lambda: b"not a key")
+        with self.assertRaisesRegex(Exception, "Failed loading private key"):
+            signing.signMessage("hello")
+
+    def test_audit_signer(self):
+        private_key, public_bytes = new_key()
+        audit = Audit(
+            "token", config=PangeaConfig(domain="localhost"), signer=Signing(hash_message=True, private_key=private_key)
+        )
+        self.assertTrue(audit.enable_signing)
+
+        record = audit._process_log_event({"message": "hello", "actor": "me"}, signing=True)
+        envelope = JSONObject({"envelope": dict(record, event=dict(record["event"]))})
+        self.assertTrue(audit.verify_signature(envelope))
+        self.assertEqual(record["public_key"], b64encode(public_bytes).decode("ascii"))
+
+    def test_audit_signer_default_hash(self):
+        # the signer does not choose, the messages are hashed as the Audit client verifies them
+        private_key, _ = new_key()
+        signer = Signing(private_key=private_key)
+        audit = Audit("token", config=PangeaConfig(domain="localhost"), signer=signer)
+        self.assertTrue(audit.hash_message)
+        self.assertTrue(signer.hash_message)
+
+        record = audit._process_log_event({"message": "hello", "actor": "me"}, signing=True)
+        envelope = JSONObject({"envelope": dict(record, event=dict(record["event"]))})
+        self.assertTrue(audit.verify_signature(envelope))
+
+        response = mock.Mock(result=JSONObject({"events": [{"envelope": dict(record, event=dict(record["event"]))}]}))
+        audit._verify_signatures(response)
+        self.assertEqual(response.result.events[0].envelope.signature_verification, "pass")
+
+    @unittest.skipIf(sys.version_info < (3, 9), "the command line tools need Python 3.9+")
+    def test_verify_audit_signer_default_hash(self):
+        from pangea import verify_audit
+
+        audit = Audit("token", config=PangeaConfig(domain="localhost"), signer=Signing(private_key=new_key()[0]))
+        record = audit._process_log_event({"message": "hello", "actor": "me"}, signing=True)
+        self.assertTrue(verify_audit._verify_signature(record))
+
+    def test_audit_signer_hash_mismatch(self):
+        private_key, _ = new_key()
+        config = PangeaConfig(domain="localhost")
+
+        audit = Audit("token", config=config, signer=Signing(hash_message=False, private_key=private_key))
+        self.assertFalse(audit.hash_message)
+
+        with self.assertRaisesRegex(Exception, "hash_message"):
+            Audit(
+                "token", config=config, signer=Signing(hash_message=False, private_key=private_key), hash_message=True
+            )
+
+
+class TestBatchSigning(unittest.TestCase):
+    def setUp(self):
+        self.private_key, self.public_bytes = new_key()
+        self.signing = Signing(hash_message=True, private_key=self.private_key)
+        self.audit = Audit("token", config=PangeaConfig(domain="localhost"), signer=self.signing, signature_workers=4)
+        self.addCleanup(self.signing.close)
+        self.addCleanup(self.audit.close)
+
+    def assert_signed(self, records: list):
+        public_key = b64encode(self.public_bytes).decode("ascii")
+        for record in records:
+            self.assertEqual(record["public_key"], public_key)
+            sign_envelope = self.audit.create_signed_envelope(record["event"])
+            self.assertTrue(verify_message(record["signature"], sign_envelope, self.public_bytes, hash_message=True))
+
+    def mock_post(self):
+        def post(endpoint, data, **kwargs):
+            results = [{"hash": str(i)} for i, _ in enumerate(data["events"])]
+            return mock.Mock(success=True, result=JSONObject({"results": results}))
+
+        self.audit.request = mock.Mock()
+        self.audit.request.post.side_effect = post
+        return self.audit.request.post
+
+    def test_sign_many(self):
+        messages = [{"n": i} for i in range(100)] + ["text", b"bytes"]
+        expected = [self.signing.signMessage(message) for message in messages]
+
+        self.assertEqual(self.signing.sign_many(messages), expected)
+        self.assertEqual(self.signing.sign_many(messages, workers=4), expected)
+
+    def test_pool_reused(self):
+        messages = [{"n": i} for i in range(100)]
+        signatures = self.signing.sign_many(messages)
+        items = [(signature, message, self.public_bytes) for signature, message in zip(signatures, messages)]
+
+        with mock.patch("pangea.signing.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor_class:
+            for _ in range(3):
+                self.assertEqual(self.signing.sign_many(messages, workers=4), signatures)
+                self.assertEqual(self.signing.verify_many(items, workers=4), [True] * 100)
+            self.assertEqual(executor_class.call_count, 1)
+
+            # a new pool after close()
+            self.signing.close()
+            self.signing.sign_many(messages, workers=4)
+            self.assertEqual(executor_class.call_count, 2)
+
+    def test_audit_pool_reused(self):
+        events = [{"message": f"event {i}", "actor": "me"} for i in range(50)]
+
+        with mock.patch("pangea.services.audit.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor_class:
+            for _ in range(3):
+                data = self.audit._prepare_log_bulk(events, signing=True, verbose=False)
+                self.assert_signed(data["events"])
+
+                response = mock.Mock(result=JSONObject({"events": [{"envelope": e} for e in data["events"]]}))
+                self.audit._verify_signatures(response)
+                statuses = {audit.envelope.signature_verification for audit in response.result.events}
+                self.assertEqual(statuses, {"pass"})
+            self.assertEqual(executor_class.call_count, 1)
+
+        # the pool of the signer is not used
+        self.assertEqual(self.signing._executors, {})
+
+    def test_public_key_bytes_cached(self):
+        public_bytes = self.signing.getPublicKeyBytes()
+        self.assertEqual(public_bytes, self.public_bytes)
+        self.assertIs(self.signing.getPublicKeyBytes(), public_bytes)
+
+    def test_log_bulk(self):
+        events = [{"message": f"event {i}", "actor": "me", "new": {"n": i}} for i in range(50)]
+        data = self.audit._prepare_log_bulk(events, signing=True, verbose=False)
+        self.assertEqual(len(data["events"]), 50)
+        self.assert_signed(data["events"])
+
+    def test_batcher(self):
+        post = self.mock_post()
+        with AuditBatcher(self.audit, max_events=40, max_age=None, signing=True) as batcher:
+            futures = [batcher.add({"message": f"event {i}"}) for i in range(100)]
+
+        self.assertEqual([future.result().hash for future in futures], [str(i % 40) for i in range(100)])
+        for call in post.call_args_list:
+            self.assert_signed(call[1]["data"]["events"])
+
+    def test_shipper(self):
+        post = self.mock_post()
+        shipper = AuditShipper(self.audit, batch_size=40, linger=0.01, signing=True)
+        for i in range(100):
+            shipper.enqueue({"message": f"event {i}"})
+        self.assertTrue(shipper.flush(10))
+        shipper.close()
+
+        self.assertEqual(shipper.sent, 100)
+        for call in post.call_args_list:
+            self.assert_signed(call[1]["data"]["events"])
+
+
+class TestVerifyMessages(unittest.TestCase):
+    def make_items(self, count: int):
+        keys = [new_key() for _ in range(3)]
+        items = []
+        for i in range(count):
+            private_key, public_bytes = keys[i % 3]
+            message = {"n": i}
+            items.append((sign(private_key, message), message, public_bytes))
+
+        # a few failures: wrong message, wrong key, bad signature
+        items[5] = (items[5][0], {"n": -1}, items[5][2])
+        items[17] = (items[17][0], items[17][1], keys[(17 + 1) % 3][1])
+        items[40] = ("AAAA", items[40][1], items[40][2])
+        return items
+
+    def test_matches_single(self):
+        items = self.make_items(100)
+        expected = [verify_message(*item, hash_message=True) for item in items]
+        self.assertEqual(expected.count(False), 3)
+
+        self.assertEqual(verify_messages(items, hash_message=True), expected)
+        self.assertEqual(verify_messages(iter(items), hash_message=True, workers=3), expected)
+        self.assertEqual(verify_messages(items, hash_message=True, workers=2, processes=True), expected)
+        self.assertEqual(verify_messages([], workers=4), [])
+
+    def test_audit_statuses(self):
+        private_key, public_bytes = new_key()
+        events = []
+        for i in range(40):
+            event = {"message": f"event {i}", "actor": "me"}
+            envelope = {"event": event, "received_at": "2022-10-14T22:43:07Z"}
+            if i != 3:
+                envelope["signature"] = sign(private_key, event)
+                envelope["public_key"] = b64encode(public_bytes).decode("ascii")
+            if i == 7:
+                envelope["signature"] = sign(private_key, {"message": "other"})
+            events.append({"envelope": envelope})
+
+        audit = Audit("token", config=PangeaConfig(domain="localhost"), signature_workers=2)
+        response = mock.Mock(result=JSONObject({"events": events}))
+
+        # the unsigned event is not counted as failed
+        with self.assertRaisesRegex(Exception, "1 of 40"):
+            audit._verify_signatures(response)
+
+        statuses = [audit.envelope.signature_verification for audit in response.result.events]
+        self.assertEqual(statuses[3], "none")
+        self.assertEqual(statuses[7], "fail")
+        self.assertEqual(statuses.count("pass"), 38)
+
+    def test_audit_unsigned_events(self):
+        private_key, public_bytes = new_key()
+        events = []
+        for i in range(10):
+            event = {"message": f"event {i}", "actor": "me"}
+            envelope = {"event": event, "received_at": "2022-10-14T22:43:07Z"}
+            if i % 3:
+                envelope["signature"] = sign(private_key, event)
+                envelope["public_key"] = b64encode(public_bytes).decode("ascii")
+            events.append({"envelope": envelope})
+
+        audit = Audit("token", config=PangeaConfig(domain="localhost"), signature_workers=2)
+        response = mock.Mock(result=JSONObject({"events": events}))
+
+        # a page mixing signed and unsigned events passes
+        audit._verify_signatures(response)
+
+        statuses = [audit.envelope.signature_verification for audit in response.result.events]
+        self.assertEqual(statuses, ["none" if i % 3 == 0 else "pass" for i in range(10)])
+
+
+if __name__ == "__main__":
+    unittest.main()
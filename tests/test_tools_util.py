@@ -0,0 +1,159 @@
+import gzip
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from pangea.tools_util import ZSTD_MAGIC, InputStream, SequenceFollower
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def naive_holes(numbers: set) -> list:
+    if not numbers:
+        return []
+    return [val for val in range(min(numbers), max(numbers)) if val not in numbers]
+
+
+class TestSequenceFollower(unittest.TestCase):
+    def test_empty(self):
+        follower = SequenceFollower()
+        self.assertEqual(follower.holes(), [])
+        self.assertEqual(follower.hole_ranges(), [])
+        self.assertEqual(follower.hole_count(), 0)
+
+    def test_ranges(self):
+        follower = SequenceFollower()
+        for val in (5, 1, 2, 9, 3, 12, 10, 2):
+            follower.add(val)
+
+        self.assertEqual(follower.hole_ranges(), [(4, 4), (6, 8), (11, 11)])
+        self.assertEqual(follower.holes(), [4, 6, 7, 8, 11])
+        self.assertEqual(follower.hole_count(), 5)
+
+        for val in (4, 6, 7, 8, 11):
+            follower.add(val)
+        self.assertEqual(follower.hole_ranges(), [])
+        self.assertEqual((follower.starts, follower.ends), ([1], [13]))
+
+    def test_merges(self):
+        follower = SequenceFollower()
+        follower.min_pending = 4
+        values = list(range(100))
+        random.Random(7).shuffle(values)
+        for val in values:
+            if val != 50:
+                follower.add(val)
+            # buffered numbers are merged in batches, runs stay bounded
+            self.assertLessEqual(len(follower._pending), max(4, len(follower.starts)))
+
+        self.assertEqual(follower.hole_ranges(), [(50, 50)])
+        self.assertEqual((follower.starts, follower.ends), ([0, 51], [50, 100]))
+
+    def test_matches_naive(self):
+        rnd = random.Random(42)
+        for _ in range(50):
+            follower = SequenceFollower()
+            numbers = set()
+            for _ in range(rnd.randint(1, 200)):
+                val = rnd.randint(-20, 300)
+                follower.add(val)
+                numbers.add(val)
+
+            self.assertEqual(follower.holes(), naive_holes(numbers))
+            self.assertEqual(follower.hole_count(), len(naive_holes(numbers)))
+
+    def test_runs(self):
+        follower = SequenceFollower()
+        for val in (5, 1, 2, 9, 3):
+            follower.add(val)
+
+        runs = follower.runs()
+        self.assertEqual(runs, [(1, 4), (5, 6), (9, 10)])
+
+        restored = SequenceFollower.from_runs(runs)
+        restored.add(4)
+        self.assertEqual(restored.hole_ranges(), [(6, 8)])
+
+    def test_large_gap(self):
+        follower = SequenceFollower()
+        follower.add(0)
+        follower.add(10**12)
+        self.assertEqual(follower.hole_ranges(), [(1, 10**12 - 1)])
+        self.assertEqual(follower.hole_count(), 10**12 - 1)
+
+
+class TestInputStream(unittest.TestCase):
+    def setUp(self):
+        self.lines = [f'{{"line": {i}}}\n'.encode() for i in range(100)]
+        self.data = b"".join(self.lines)
+
+    def write(self, data: bytes) -> str:
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_read(self):
+        for data in (self.data, gzip.compress(self.data)):
+            with InputStream(self.write(data)) as stream:
+                self.assertEqual(stream.size, len(data))
+                self.assertEqual("".join(stream), self.data.decode())
+                self.assertEqual(stream.offset, len(data))
+                self.assertEqual((stream.position, stream.lines), (len(self.data), 100))
+
+    def test_seek(self):
+        position = sum(len(line) for line in self.lines[:40])
+        for data in (self.data, gzip.compress(self.data)):
+            with InputStream(self.write(data)) as stream:
+                stream.seek(position, 40)
+                self.assertEqual("".join(stream), b"".join(self.lines[40:]).decode())
+                self.assertEqual((stream.position, stream.lines), (len(self.data), 100))
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_zstd(self):
+        data = zstandard.ZstdCompressor().compress(self.data)
+        position = sum(len(line) for line in self.lines[:40])
+
+        with InputStream(self.write(data)) as stream:
+            self.assertTrue(stream.compressed)
+            self.assertEqual(stream.size, len(data))
+            self.assertEqual("".join(stream), self.data.decode())
+            self.assertEqual(stream.offset, len(data))
+            self.assertEqual((stream.position, stream.lines), (len(self.data), 100))
+
+        with InputStream(self.write(data)) as stream:
+            stream.seek(position, 40)
+            self.assertEqual("".join(stream), b"".join(self.lines[40:]).decode())
+            self.assertEqual((stream.position, stream.lines), (len(self.data), 100))
+
+    def test_zstd_not_installed(self):
+        path = self.write(ZSTD_MAGIC + b"\0" * 16)
+        with mock.patch.dict(sys.modules, {"zstandard": None}):
+            with self.assertRaisesRegex(Exception, "install the zstandard package"):
+                InputStream(path)
+
+    def test_stdin(self):
+        for data in (self.data, gzip.compress(self.data)):
+            stdin = io.BytesIO(data)
+            with mock.patch("sys.stdin", mock.Mock(buffer=stdin)):
+                with InputStream("-") as stream:
+                    self.assertEqual(stream.name, "<stdin>")
+                    self.assertIsNone(stream.size)
+                    self.assertEqual("".join(stream), self.data.decode())
+                    self.assertEqual(stream.offset, len(data))
+                    self.assertEqual((stream.position, stream.lines), (len(self.data), 100))
+
+            # standard input is left open
+            self.assertFalse(stdin.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
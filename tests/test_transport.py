@@ -0,0 +1,106 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from pangea.client import PangeaClient
+from pangea.config import PangeaConfig
+from pangea.services import Embargo, Redact
+from pangea.transport import PangeaTransport
+from tests.fakes import FakeServer
+
+SERVICES = ["audit", "redact", "embargo", "file_intel", "ip_intel", "url_intel", "domain_intel", "secrets"]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.connections.add(self.client_address)
+
+        body = json.dumps({"request_id": "prq_1", "status": "Success", "result": {}}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSharedTransport(unittest.TestCase):
+    def test_client_services_share_transport(self):
+        client = PangeaClient(token="token", config=PangeaConfig(domain="pangea.test"))
+        self.addCleanup(client.transport.close)
+
+        for name in SERVICES:
+            service = getattr(client, name)
+            self.assertIs(service.request.transport, client.transport, name)
+            self.assertIs(service.request.request, client.transport.session, name)
+            # the service clients are created once
+            self.assertIs(getattr(client, name), service, name)
+
+    def test_client_transport(self):
+        transport = PangeaTransport(PangeaConfig(domain="pangea.test"))
+        self.addCleanup(transport.close)
+
+        client = PangeaClient(token="token", config=transport.config, transport=transport)
+        self.assertIs(client.redact.request.transport, transport)
+
+        other = PangeaClient(token="token", config=PangeaConfig(domain="pangea.test"))
+        self.addCleanup(other.transport.close)
+        self.assertIsNot(other.transport, client.transport)
+
+    def test_requests_use_shared_session(self):
+        client = PangeaClient(token="token", config=PangeaConfig(domain="pangea.test"))
+        self.addCleanup(client.transport.close)
+
+        server = FakeServer(lambda method, path, body: (200, {"request_id": "prq_1", "result": {}}))
+        with mock.patch.object(client.transport.session, "request", side_effect=server) as request:
+            client.redact.redact("Jenny")
+            client.embargo.ip_check("1.1.1.1")
+
+        urls = [call[0][1] for call in request.call_args_list]
+        self.assertEqual(urls, ["https://redact.pangea.test/v1/redact", "https://embargo.pangea.test/v1/ip/check"])
+
+    def test_pool_settings(self):
+        config = PangeaConfig(domain="pangea.test", pool_connections=3, pool_maxsize=7, pool_block=True)
+        transport = PangeaTransport(config)
+        self.addCleanup(transport.close)
+
+        for prefix in ("http://", "https://"):
+            adapter = transport.session.get_adapter(prefix + "redact.pangea.test")
+            self.assertEqual(adapter._pool_connections, 3)
+            self.assertEqual(adapter._pool_maxsize, 7)
+            self.assertTrue(adapter._pool_block)
+            # retries are done by PangeaTransport.request, within the deadline of each call
+            self.assertEqual(adapter.max_retries.total, 0)
+
+        self.assertIs(transport.session.get_adapter("http://a"), transport.session.get_adapter("https://b"))
+
+    def test_connections_reused_across_services(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        server.connections = set()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        config = PangeaConfig(domain=f"127.0.0.1:{server.server_address[1]}", environment="local", insecure=True)
+        with PangeaTransport(config) as transport:
+            redact = Redact("token", config=config, transport=transport)
+            embargo = Embargo("token", config=config, transport=transport)
+
+            for _ in range(3):
+                self.assertTrue(redact.redact("Jenny").success)
+                self.assertTrue(embargo.ip_check("1.1.1.1").success)
+
+        # six requests from two services over a single kept-alive connection
+        self.assertEqual(len(server.connections), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()